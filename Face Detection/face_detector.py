@@ -1,11 +1,32 @@
 import time
 import cv2
 import mediapipe as mp
+import numpy as np
+import sys
+from pathlib import Path
+
+# Modules every demo uses (pipeline, frames, instrumentation, ...) live in Shared/
+SHARED_DIR = str(Path(__file__).resolve().parent.parent / "Shared")
+if SHARED_DIR not in sys.path:
+    sys.path.insert(0, SHARED_DIR)
+
+from frame_cache import FrameCache
+from frames import FramePool, RGBConverter
+from instrumentation import PROFILER, profiling, timer
+from pipeline import FramePipeline
 
 class FaceDetector():
-    def __init__(self, min_detection_confidence=0.5, model_selection=0) -> None:
+    # BlazeFace keypoints: eyes, nose tip, mouth center and ear tragions
+    NUM_KEYPOINTS = 6
+
+    def __init__(self, min_detection_confidence=0.5, model_selection=0, cache=None, 
+                 inference_size=None) -> None:
         self.min_detection_confidence = min_detection_confidence
         self.model_selection = model_selection
+        # Longest side of the image given to MediaPipe; boxes stay in full-frame pixels
+        self.inference_size = inference_size
+        self._rgb = RGBConverter()  # Reused RGB buffer for process()
+        self.results = None
 
         self.mp_draws = mp.solutions.drawing_utils
         self.mp_faces = mp.solutions.face_detection
@@ -13,11 +34,25 @@ class FaceDetector():
             min_detection_confidence=min_detection_confidence, 
             model_selection=model_selection
         )
+        # Optional FrameCache that skips inference while the scene is unchanged
+        self.cache = cache
+
+    def process_rgb(self, img_rgb):
+        with timer.stage("face.process"):
+            self.results = self.faces.process(img_rgb)
+        return self.results
+
+    def process(self, image):
+        # Convert the image to RGB (MediaPipe works with RGB images), downscaled if needed
+        with timer.stage("face.bgr2rgb"):
+            img_rgb = self._rgb.convert(image, self.inference_size)
+        return self.process_rgb(img_rgb)
 
     def face_detection(self, image, draw=True):
-        # Convert the image to RGB (MediaPipe works with RGB images)
-        img_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        results = self.faces.process(img_rgb)
+        if self.cache is not None:
+            results = self.results = self.cache.get(image, lambda: self.process(image))
+        else:
+            results = self.process(image)
         lst_box = list()
 
         if results.detections:
@@ -31,10 +66,39 @@ class FaceDetector():
                 lst_box.append([id, bbox, score])
                 
                 if draw:
-                    self.draw_box_detection(image, bbox, score)
+                    with timer.stage("face.draw"):
+                        self.draw_box_detection(image, bbox, score)
                     # self.mp_draws.draw_detection(image, detection)
         return lst_box
 
+    def landmark_array(self, image=None, pixel=False):
+        """
+        Return the keypoints of every face found by the last face_detection call.
+
+        Args:
+            image: Frame passed to face_detection. Only needed when pixel is True.
+            pixel: If True, scale x and y from [0, 1] to pixel coordinates.
+
+        Returns:
+            numpy.ndarray: float32 array of shape (num_faces, 6, 4) holding x, y, 0 and the
+            detection score for the eyes, nose tip, mouth and ear tragions.
+        """
+        detections = []
+        if self.results is not None and self.results.detections:
+            detections = self.results.detections
+
+        landmarks = np.zeros((len(detections), self.NUM_KEYPOINTS, 4), dtype=np.float32)
+        with timer.stage("face.landmarks"):
+            for i, detection in enumerate(detections):
+                landmarks[i, :, :2] = [(point.x, point.y) for point in
+                                       detection.location_data.relative_keypoints]
+                landmarks[i, :, 3] = detection.score[0]
+
+        if pixel:
+            h, w = image.shape[:2]
+            landmarks[..., :2] *= (w, h)
+        return landmarks
+
     def draw_box_detection(self, image, bbox, score):
         xmin, ymin = bbox[0], bbox[1]
         h, w, c = image.shape
@@ -55,17 +119,14 @@ class FaceDetector():
 
 def main():
     capture = cv2.VideoCapture(0)
-    face_detector = FaceDetector()
+    frames = FramePool()
+    face_detector = FaceDetector(cache=FrameCache.from_env())
     prev_time = 0
     fps_list = []  # For averaging FPS
 
-    while True:
-        success, frame = capture.read()
-        if not success:
-            break
+    def render_frame(frame, lst_position):
+        nonlocal prev_time
 
-        # Detect faces in the frame
-        lst_position = face_detector.face_detection(frame)
         if len(lst_position) != 0:
             print(lst_position[0])
 
@@ -87,12 +148,21 @@ def main():
                     (0, 255, 255), thickness=2)
 
         # Display video window
-        cv2.imshow("Video Display", frame)
-        
-        # Exit the loop if 'q' is pressed
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+        with timer.stage("display"):
+            cv2.imshow("Video Display", frame)
+            
+            # Exit the loop if 'q' is pressed
+            return cv2.waitKey(1) & 0xFF != ord('q')
+
+    # Detect faces on the inference thread while the next frame is captured
+    # (serially when profiling, since the profilers only follow one thread)
+    pipeline = FramePipeline(lambda: frames.read(capture), face_detector.face_detection, render_frame, 
+                             threaded=not PROFILER, release=frames.release)
+    with profiling():
+        pipeline.run()
 
+    if face_detector.cache is not None:
+        print(face_detector.cache.report())
     capture.release()
     cv2.destroyAllWindows()
 
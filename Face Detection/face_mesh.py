@@ -1,16 +1,45 @@
 import cv2
 import time
 import mediapipe as mp
+import numpy as np
+import sys
+from pathlib import Path
+
+# Modules every demo uses (pipeline, frames, instrumentation, ...) live in Shared/
+SHARED_DIR = str(Path(__file__).resolve().parent.parent / "Shared")
+if SHARED_DIR not in sys.path:
+    sys.path.insert(0, SHARED_DIR)
+
+from filters import LandmarkFilterBank
+from frame_cache import FrameCache
+from frames import FramePool, RGBConverter
+from instrumentation import PROFILER, profiling, timer
+from pipeline import FramePipeline
 
 class FaceMesh:
+    # Landmarks per face, without and with the refined iris landmarks
+    NUM_LANDMARKS = 468
+    NUM_REFINED_LANDMARKS = 478
+
     def __init__(self, static_image_mode=False, max_num_faces=1, 
                  refine_landmarks=False, 
-                 min_detection_confidence=0.5, min_tracking_confidence=0.5) -> None:
+                 min_detection_confidence=0.5, min_tracking_confidence=0.5, 
+                 cache=None, inference_size=None, 
+                 smoothing=None, smoothing_params=None) -> None:
         self.static_image_mode = static_image_mode
         self.max_num_faces = max_num_faces
         self.refine_landmarks = refine_landmarks
         self.min_detection_confidence = min_detection_confidence
         self.min_tracking_confidence = min_tracking_confidence
+        # Longest side of the image given to MediaPipe; landmarks stay in full-frame space
+        self.inference_size = inference_size
+        self._rgb = RGBConverter()  # Reused RGB buffer for process()
+        # Optional temporal filter ("one_euro", "ema" or "kalman", see filters.py)
+        # applied to draw_mesh and landmark_array, one track per face
+        self.smoother = None
+        if smoothing:
+            self.smoother = LandmarkFilterBank(smoothing, max_tracks=max_num_faces, 
+                                               **(smoothing_params or {}))
 
         self.mp_draws = mp.solutions.drawing_utils
         self.mp_face_mesh = mp.solutions.face_mesh
@@ -21,39 +50,99 @@ class FaceMesh:
             min_detection_confidence=self.min_detection_confidence,
             min_tracking_confidence=self.min_tracking_confidence
         )
+        self.results = None
+        # Optional FrameCache that skips inference while the scene is unchanged
+        self.cache = cache
+
+        # Reused by landmark_array: x, y, z, visibility for every landmark of every face
+        num_landmarks = self.NUM_REFINED_LANDMARKS if refine_landmarks else self.NUM_LANDMARKS
+        self._landmarks = np.zeros((max_num_faces, num_landmarks, 4), dtype=np.float32)
+        self._smoothed = None
+        self._smoothed_results = None
+        self.timestamp = None  # When the current results were computed
 
-    def draw_mesh(self, image, thickness=1, circle_radius=1, color=(0, 255, 0)):
+    def process_rgb(self, img_rgb):
+        with timer.stage("mesh.process"):
+            self.results = self.face_mesh.process(img_rgb)
+        self.timestamp = time.perf_counter()
+        return self.results
+
+    def process(self, image):
+        with timer.stage("mesh.bgr2rgb"):
+            img_rgb = self._rgb.convert(image, self.inference_size)
+        return self.process_rgb(img_rgb)
+
+    def draw_mesh(self, image, thickness=1, circle_radius=1, color=(0, 255, 0), draw=True):
         draw_spec = self.mp_draws.DrawingSpec(thickness=thickness, circle_radius=circle_radius, color=color)
-        img_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        results = self.face_mesh.process(img_rgb)
+        if self.cache is not None:
+            results = self.results = self.cache.get(image, lambda: self.process(image))
+        else:
+            results = self.results = self.process(image)
         landmarks_list = []
 
         if results.multi_face_landmarks:
-            h, w, c = image.shape
-            for face_id, landmarks in enumerate(results.multi_face_landmarks):
-                # Draw the mesh with the oval connections for the face
-                self.mp_draws.draw_landmarks(image, landmarks, 
-                                             self.mp_face_mesh.FACEMESH_FACE_OVAL, draw_spec)
-                # Store landmarks coordinates in a list
-                for id, mark in enumerate(landmarks.landmark):
-                    cx, cy = int(mark.x * w), int(mark.y * h)
-                    landmarks_list.append([face_id, id, cx, cy])
+            if draw:
+                with timer.stage("mesh.draw"):
+                    for landmarks in results.multi_face_landmarks:
+                        # Draw the mesh with the oval connections for the face
+                        self.mp_draws.draw_landmarks(image, landmarks, 
+                                                     self.mp_face_mesh.FACEMESH_FACE_OVAL, draw_spec)
+            # Store landmarks coordinates in a list (smoothed if enabled)
+            faces = self.landmark_array(image, pixel=True)
+            with timer.stage("mesh.landmark_list"):
+                for face_id, face in enumerate(faces[..., :2].astype(int).tolist()):
+                    for id, (cx, cy) in enumerate(face):
+                        landmarks_list.append([face_id, id, cx, cy])
 
         return landmarks_list
 
+    def landmark_array(self, image=None, pixel=False):
+        """
+        Return the landmarks of every face found by the last draw_mesh call as one array.
+
+        Args:
+            image: Frame passed to draw_mesh. Only needed when pixel is True.
+            pixel: If True, scale x and y from [0, 1] to pixel coordinates.
+
+        Returns:
+            numpy.ndarray: float32 array of shape (num_faces, 468, 4), or 478 landmarks with
+            refine_landmarks, holding x, y, z and visibility, smoothed over time if the
+            mesh was created with smoothing. It is a view of a buffer the next call
+            overwrites, so copy it to keep it across frames.
+        """
+        faces = []
+        if self.results is not None and self.results.multi_face_landmarks:
+            faces = self.results.multi_face_landmarks[:self.max_num_faces]
+
+        with timer.stage("mesh.landmarks"):
+            for i, face in enumerate(faces):
+                self._landmarks[i] = [(mark.x, mark.y, mark.z, mark.visibility)
+                                      for mark in face.landmark]
+        landmarks = self._landmarks[:len(faces)]
+
+        if self.smoother is not None:
+            # Filter each frame once, however often its landmarks are read
+            if self._smoothed_results is not self.results:
+                with timer.stage("mesh.smooth"):
+                    self._smoothed = self.smoother(landmarks, self.timestamp)
+                self._smoothed_results = self.results
+            landmarks[:] = self._smoothed
+
+        if pixel:
+            h, w = image.shape[:2]
+            landmarks[..., :2] *= (w, h)
+        return landmarks
+
 
 def main():
     capture = cv2.VideoCapture(0)
-    face_mesh = FaceMesh()
+    frames = FramePool()
+    face_mesh = FaceMesh(cache=FrameCache.from_env())
     prev_time = 0
     fps_list = []  # To average FPS
 
-    while True:
-        success, frame = capture.read()
-        if not success:
-            break
-        
-        landmarks_list = face_mesh.draw_mesh(frame)
+    def render_frame(frame, landmarks_list):
+        nonlocal prev_time
 
         # Calculate FPS
         current_time = time.time()
@@ -72,12 +161,21 @@ def main():
                     cv2.FONT_HERSHEY_PLAIN, 1.5, (0, 255, 255), thickness=2)
 
         # Display video window with the face mesh drawn on it
-        cv2.imshow("Video Display", frame)
-        
-        # Exit the loop if 'q' is pressed
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+        with timer.stage("display"):
+            cv2.imshow("Video Display", frame)
+            
+            # Exit the loop if 'q' is pressed
+            return cv2.waitKey(1) & 0xFF != ord('q')
+
+    # Run the mesh on the inference thread while the next frame is captured
+    # (serially when profiling, since the profilers only follow one thread)
+    pipeline = FramePipeline(lambda: frames.read(capture), face_mesh.draw_mesh, render_frame, 
+                             threaded=not PROFILER, release=frames.release)
+    with profiling():
+        pipeline.run()
 
+    if face_mesh.cache is not None:
+        print(face_mesh.cache.report())
     capture.release()
     cv2.destroyAllWindows()
 
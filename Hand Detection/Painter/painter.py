@@ -1,9 +1,31 @@
+import argparse
 import cv2
+import sys
 import time
-import numpy as np
 from pathlib import Path
-from PIL import Image, ImageDraw, ImageFont
+from PIL import ImageFont
+
+# The hand detector and its helpers live in Hand Detection/, the modules every
+# demo uses (pipeline, frames, instrumentation, ...) in Shared/
+for directory in (Path(__file__).resolve().parent.parent,
+                  Path(__file__).resolve().parent.parent.parent / "Shared"):
+    if str(directory) not in sys.path:
+        sys.path.insert(0, str(directory))
+
 from hand_detector import HandDetector
+from hand_tracker import HandTracker
+from inference_scheduler import InferenceScheduler
+from instrumentation import PROFILER, profiling, timer
+from landmark_recording import LandmarkReader, LandmarkRecorder
+from canvas import CanvasCompositor
+from frames import FramePool, is_live_source, open_source
+from gestures import fingers_up
+from pipeline import FramePipeline
+from strokes import StrokeLog
+from text_overlay import TextOverlay
+
+# Assets are looked up next to this file so the app runs from any directory
+APP_DIR = Path(__file__).resolve().parent
 
 
 class PainterApp:
@@ -30,25 +52,49 @@ class PainterApp:
         'eraser': (512, 640, 80)
     }
     
-    def __init__(self):
-        """Initialize the Painter application."""
+    def __init__(self, threaded=True, max_interval=3, record=None, source=0, fps=None, 
+                 headless=False):
+        """
+        Initialize the Painter application.
+        
+        Args:
+            threaded: Run capture, inference and rendering on separate threads
+            max_interval: Largest number of frames between hand detections; the
+                          landmarks are predicted in between (1 detects every frame)
+            record: Optional path of a landmark recording to append the hands to
+            source: Camera index, video file, image directory or "synthetic"
+                    (see frames.open_source)
+            fps: Pace the source to this frame rate, or None for as fast as it delivers
+            headless: Skip the window and keyboard, e.g. to benchmark on recorded input
+        """
+        self.threaded = threaded
+        self.max_interval = max_interval
+        self.record = record
+        self.source = source
+        self.fps = fps
+        self.headless = headless
+        self.recorder = None
         self.menu = None
         self.capture = None
+        self.frames = FramePool()
         self.width = 0
         self.height = 0
-        self.draw_canvas = None
+        self.canvas = None
+        self.strokes = None
         self.detector = None
+        self.scheduler = None
         self.prev_time = 0
-        self.xp, self.yp = None, None
+        self.pens = {}  # Hand track ID -> stroke that hand is drawing
         self.current_color = self.COLORS['green']
         self.brush_thickness = 4
         self.font_regular = None
         self.font_bold = None
+        self.text_overlay = TextOverlay()
         
     def load_fonts(self):
         """Load custom fonts from assets directory."""
         try:
-            font_dir = Path("assets/fonts")
+            font_dir = APP_DIR / "assets" / "fonts"
             regular_font = font_dir / "iosevka-regular.ttf"
             bold_font = font_dir / "iosevka-bold.ttf"
             
@@ -72,49 +118,67 @@ class PainterApp:
             self.font_bold = ImageFont.load_default()
     
     def put_text_pil(self, img, text, position, font, color=(255, 255, 255)):
-        """Put text on image using PIL for better font rendering."""
-        # Convert BGR to RGB
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        pil_img = Image.fromarray(img_rgb)
-        draw = ImageDraw.Draw(pil_img)
-        
-        # Draw text
-        draw.text(position, text, font=font, fill=color[::-1])  # Reverse BGR to RGB
-        
-        # Convert back to BGR
-        img_bgr = cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
-        img[:] = img_bgr
+        """Put text on image using cached PIL-rendered sprites for better font rendering."""
+        with timer.stage("painter.text"):
+            self.text_overlay.draw(img, text, position, font, color)
         
     def initialize(self):
         """Initialize all components."""
         # Load fonts
         self.load_fonts()
         
-        # Load menu image
-        self.menu = cv2.imread("menu.png")
-        if self.menu is None:
-            print("[ERROR] Failed to load menu.png")
+        # Set up video capture (or any other frame source)
+        self.capture = open_source(self.source, fps=self.fps)
+        if not self.capture.isOpened():
+            print(f"[ERROR] Failed to open source: {self.source}")
             return False
+            
+        width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        print(f"[INFO] Video resolution: {width} x {height}")
         
-        # Set up video capture
-        self.capture = cv2.VideoCapture(0)
-        if not self.capture.isOpened():
-            print("[ERROR] Failed to open camera")
+        if not self.setup_canvas(width, height):
             return False
+        
+        # Initialize hand detector
+        self.detector = HandDetector(detect_confidence=0.75, track_confidence=0.5, 
+                                     smoothing="one_euro")
+        self.scheduler = InferenceScheduler(self.detect_hands, max_interval=self.max_interval,
+                                            track_ids=lambda: self.detector.hand_ids)
+        
+        if self.record:
+            self.recorder = LandmarkRecorder(self.record, 
+                                             {"hand": (self.detector.max_hands, self.detector.NUM_LANDMARKS)}, 
+                                             metadata={"width": width, "height": height})
+            print(f"[INFO] Recording landmarks to {self.record}")
+        
+        return True
+    
+    def setup_canvas(self, width, height):
+        """
+        Load the menu and allocate the drawing canvas for a frame size.
+        
+        Args:
+            width: Frame width
+            height: Frame height
             
-        self.width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
-        self.height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        self.draw_canvas = np.zeros((self.height, self.width, 3), dtype="uint8")
+        Returns:
+            bool: False if the menu image could not be loaded
+        """
+        # Load menu image
+        self.menu = cv2.imread(str(APP_DIR / "menu.png"))
+        if self.menu is None:
+            print("[ERROR] Failed to load menu.png")
+            return False
         
-        print(f"[INFO] Video resolution: {self.width} x {self.height}")
+        self.width = width
+        self.height = height
+        self.canvas = CanvasCompositor(self.width, self.height)
+        self.strokes = StrokeLog(self.width, self.height)
         
         # Resize menu image
         self.menu = cv2.resize(self.menu, (self.width, self.menu.shape[0]))
         print(f"[INFO] Menu shape: {self.menu.shape}")
-        
-        # Initialize hand detector
-        self.detector = HandDetector(detect_confidence=0.75, track_confidence=0.5)
-        
         return True
     
     def get_mode_from_fingers(self, up_fingers):
@@ -131,16 +195,17 @@ class PainterApp:
         else:
             return "IDLE"
     
-    def handle_selection(self, x, y, frame):
-        """Handle selection mode interactions."""
-        # Reset drawing position
-        self.xp, self.yp = None, None
+    def handle_selection(self, x, y, frame=None, hand_id=0):
+        """Handle selection mode interactions (help is only shown when a frame is given)."""
+        # Lift this hand's pen
+        self.end_stroke(hand_id)
         
         # Check which region was selected
         for region_name, (x_min, x_max, y_max) in self.MENU_REGIONS.items():
             if x_min <= x <= x_max and y <= y_max:
                 if region_name == 'help':
-                    self.show_help(frame)
+                    if frame is not None:
+                        self.show_help(frame)
                 elif region_name == 'green':
                     self.current_color = self.COLORS['green']
                 elif region_name == 'red':
@@ -160,7 +225,8 @@ class PainterApp:
             "Other: IDLE mode",
             "",
             "Menu: Help | Green | Red | Blue | Eraser",
-            "Keys: +/- (brush) | c (clear) | q (quit)"
+            "Keys: +/- (brush) | c (clear) | q (quit)",
+            "      u/r (undo/redo) | s (save session)"
         ]
         
         # Calculate help box dimensions
@@ -174,12 +240,11 @@ class PainterApp:
         box_x = 150
         box_y = menu_height + 50
         
-        # Draw semi-transparent background
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (box_x - padding, box_y - padding), 
-                     (box_x + box_width, box_y + box_height), 
-                     (40, 40, 40), -1)
-        cv2.addWeighted(overlay, 0.7, frame, 0.3, 0, frame)
+        # Draw semi-transparent background: blend the box region in place
+        # (70% dark gray over 30% frame) instead of copying the whole frame
+        box = frame[max(box_y - padding, 0):box_y + box_height + 1, 
+                    max(box_x - padding, 0):box_x + box_width + 1]
+        cv2.addWeighted(box, 0.3, box, 0, 0.7 * 40, dst=box)
         
         # Draw border
         cv2.rectangle(frame, (box_x - padding, box_y - padding), 
@@ -192,20 +257,97 @@ class PainterApp:
             self.put_text_pil(frame, line, (box_x, y_offset), self.font_regular, (255, 255, 255))
             y_offset += line_height
     
-    def handle_drawing(self, x, y):
-        """Handle drawing mode."""
-        if self.xp is None or self.yp is None:
-            self.xp, self.yp = x, y
+    def handle_drawing(self, x, y, hand_id=0):
+        """Handle drawing mode for one hand; every hand draws its own stroke."""
+        pen = self.pens.setdefault(hand_id, {"points": []})
+        if pen["points"] and (pen["color"] != self.current_color 
+                              or pen["thickness"] != self.brush_thickness):
+            # The new color or size starts a new stroke where the old one ended
+            last = pen["points"][-1]
+            self.end_stroke(hand_id)
+            pen = self.pens.setdefault(hand_id, {"points": [last]})
+            pen["color"], pen["thickness"] = self.current_color, self.brush_thickness
+        if not pen["points"]:
+            pen["color"], pen["thickness"] = self.current_color, self.brush_thickness
         else:
-            cv2.line(self.draw_canvas, (self.xp, self.yp), (x, y), 
-                    self.current_color, thickness=self.brush_thickness)
-            self.xp, self.yp = x, y
+            self.canvas.draw_line(pen["points"][-1], (x, y), pen["color"], pen["thickness"])
+        pen["points"].append((x, y))
+    
+    def end_stroke(self, hand_id):
+        """
+        Lift a hand's pen and log its stroke.
+        
+        Strokes are logged when they end rather than segment by segment, so
+        two hands drawing at once give two whole strokes for undo instead of
+        interleaved fragments.
+        """
+        pen = self.pens.pop(hand_id, None)
+        if pen is None:
+            return
+        points = pen["points"]
+        for start, end in zip(points, points[1:]):
+            self.strokes.add_segment(start, end, pen["color"], pen["thickness"])
+        self.strokes.end_stroke()
+    
+    def end_strokes(self):
+        """Lift every pen, e.g. before undo or saving."""
+        for hand_id in list(self.pens):
+            self.end_stroke(hand_id)
     
     def clear_canvas(self):
         """Clear the drawing canvas."""
-        self.draw_canvas = np.zeros((self.height, self.width, 3), dtype="uint8")
+        self.end_strokes()
+        self.canvas.clear()
+        self.strokes.clear()
         print("[INFO] Canvas cleared")
     
+    def redraw_canvas(self):
+        """Rebuild the canvas pixels from the stroke log."""
+        self.canvas.clear()
+        self.strokes.rasterize(self.width, self.height, self.canvas.canvas)
+        self.canvas.invalidate()
+    
+    def undo(self):
+        """Undo the last stroke or clear."""
+        self.end_strokes()
+        if self.strokes.undo():
+            self.redraw_canvas()
+    
+    def redo(self):
+        """Redo the last undone stroke or clear."""
+        self.end_strokes()
+        if self.strokes.redo():
+            self.redraw_canvas()
+    
+    def save_session(self, path="painter_session.strokes"):
+        """Save the strokes so the drawing can be reloaded or rendered at any size."""
+        self.end_strokes()
+        self.strokes.save(path)
+        print(f"[INFO] Session saved to {path} ({len(self.strokes)} strokes)")
+    
+    def load_session(self, path):
+        """Replace the drawing with a session saved by save_session."""
+        self.strokes = StrokeLog.load(path)
+        # Points and thickness are stored relative to the canvas size
+        self.strokes.width, self.strokes.height = self.width, self.height
+        self.redraw_canvas()
+        print(f"[INFO] Session loaded from {path} ({len(self.strokes)} strokes)")
+    
+    def merge_canvas(self, frame):
+        """
+        Composite the drawing canvas and the menu over a camera frame.
+        
+        Returns:
+            numpy array: The composited frame
+        """
+        with timer.stage("painter.composite"):
+            # Copy inked canvas pixels over the frame (only where strokes were drawn)
+            frame = self.canvas.composite(frame)
+            
+            # Overlay menu
+            frame[0:self.menu.shape[0], 0:self.width] = self.menu
+        return frame
+    
     def draw_ui(self, frame, fps, mode):
         """Draw UI elements on frame."""
         menu_height = self.menu.shape[0]  # Get menu height (80px)
@@ -223,7 +365,9 @@ class PainterApp:
         
         # Mode indicator - below menu on right
         mode_text = f"Mode: {mode}"
-        self.put_text_pil(frame, mode_text, (self.width - 200, menu_height + 10), 
+        # Several hands make the text longer: keep it inside the frame
+        mode_x = min(self.width - 200, self.width - 11 * len(mode_text) - 10)
+        self.put_text_pil(frame, mode_text, (mode_x, menu_height + 10), 
                          self.font_regular, (0, 255, 255))
         
         # Brush thickness indicator - below mode on right
@@ -231,6 +375,119 @@ class PainterApp:
         self.put_text_pil(frame, thickness_text, (self.width - 200, menu_height + 40), 
                          self.font_regular, (255, 255, 255))
     
+    def read_frame(self):
+        """Capture stage: read and mirror the next camera frame."""
+        # Read into a recycled buffer; the pipeline releases it after rendering
+        success, frame = self.frames.read(self.capture)
+        if not success:
+            print("[WARNING] Failed to capture frame")
+            return False, None
+        
+        # Flip frame for mirror effect
+        with timer.stage("flip"):
+            cv2.flip(frame, 1, dst=frame)
+            return True, frame
+    
+    def detect_hands(self, frame):
+        """Run the hand detector and return normalized landmarks."""
+        self.detector.find_hand(frame, draw=False)
+        return self.detector.landmark_array()
+    
+    def process_frame(self, frame):
+        """Inference stage: detect or predict the hands and return them with their track IDs."""
+        # The scheduler returns a new array, so it is safe to hand to the render thread.
+        # Predicted frames keep the rows of the last detection, so its IDs still apply.
+        hands = self.scheduler.update(frame)
+        if self.recorder is not None:
+            self.recorder.write(self.recorder.frames, time.time(), hand=hands)
+        return hands, list(self.detector.hand_ids)
+    
+    def apply_gestures(self, hands, frame=None, ids=None):
+        """
+        Turn the hand landmarks of one frame into drawing and menu actions.
+        
+        Args:
+            hands: Normalized landmarks, shape (num_hands, 21, 4)
+            frame: Frame to draw the cursors and help on, or None when replaying
+            ids: Track ID of every hand (default: the row index); each ID has
+                 its own pen, so two hands can paint at the same time
+            
+        Returns:
+            str: The mode of every hand, e.g. "DRAWING" or "DRAWING | IDLE"
+        """
+        ids = list(range(len(hands))) if ids is None else ids
+        modes = []
+        
+        for hand_id, landmarks in zip(ids, hands):
+            # Get index finger tip position
+            x1 = int(landmarks[8, 0] * self.width)
+            y1 = int(landmarks[8, 1] * self.height)
+            
+            # Get finger status
+            up_fingers = fingers_up(landmarks).tolist()
+            mode = self.get_mode_from_fingers(up_fingers)
+            modes.append(mode)
+            
+            # Draw cursor
+            if mode != "IDLE" and frame is not None:
+                cv2.circle(frame, (x1, y1), 10, (255, 0, 255), cv2.FILLED)
+            
+            # Handle modes
+            if mode == "SELECTION":
+                self.handle_selection(x1, y1, frame, hand_id)
+            elif mode == "DRAWING":
+                self.handle_drawing(x1, y1, hand_id)
+            else:
+                self.end_stroke(hand_id)
+        
+        # Hands that left the frame lift their pens
+        for hand_id in set(self.pens) - set(ids):
+            self.end_stroke(hand_id)
+        return " | ".join(modes) or "IDLE"
+    
+    def render_frame(self, frame, result):
+        """
+        Render stage: apply gestures, composite the canvas and show the frame.
+        
+        Returns:
+            bool: False when the user asked to quit
+        """
+        hands, ids = result
+        mode = self.apply_gestures(hands, frame, ids)
+        frame = self.merge_canvas(frame)
+        
+        # Calculate FPS
+        current_time = time.time()
+        fps = 1 / (current_time - self.prev_time) if self.prev_time > 0 else 0
+        self.prev_time = current_time
+        
+        # Draw UI
+        self.draw_ui(frame, fps, mode)
+        
+        # Display frame
+        if self.headless:
+            return True
+        with timer.stage("display"):
+            cv2.imshow("Air Painter", frame)
+            
+            # Handle keyboard input
+            key = cv2.waitKey(1) & 0xFF
+        if key == ord('q'):
+            return False
+        elif key == ord('+') or key == ord('='):
+            self.brush_thickness = min(20, self.brush_thickness + 1)
+        elif key == ord('-') or key == ord('_'):
+            self.brush_thickness = max(1, self.brush_thickness - 1)
+        elif key == ord('c'):
+            self.clear_canvas()
+        elif key == ord('u'):
+            self.undo()
+        elif key == ord('r'):
+            self.redo()
+        elif key == ord('s'):
+            self.save_session()
+        return True
+    
     def run(self):
         """Main application loop."""
         if not self.initialize():
@@ -238,80 +495,17 @@ class PainterApp:
         
         print("[INFO] Starting Painter application...")
         print("[INFO] Press 'q' to quit, '+'/'-' to adjust brush size")
+        print("[INFO] Press 'u'/'r' to undo/redo, 's' to save the session")
         
+        # Profilers only follow one thread, so run serially while profiling
+        pipeline = FramePipeline(self.read_frame, self.process_frame, self.render_frame, 
+                                 threaded=self.threaded and not PROFILER, 
+                                 release=self.frames.release, 
+                                 lossless=self.fps is None and not is_live_source(self.source))
         try:
-            while True:
-                # Capture frame
-                success, frame = self.capture.read()
-                if not success:
-                    print("[WARNING] Failed to capture frame")
-                    break
-                
-                # Flip frame for mirror effect
-                frame = cv2.flip(frame, 1)
-                
-                # Detect hand
-                self.detector.find_hand(frame, draw=False)
-                landmarks = self.detector.find_position(frame)
-                
-                mode = "IDLE"
-                
-                if len(landmarks) != 0:
-                    # Get index finger tip position
-                    x1 = int(landmarks[8][1] * self.width)
-                    y1 = int(landmarks[8][2] * self.height)
-                    
-                    # Get finger status
-                    up_fingers = self.detector.fingerUp(landmarks)
-                    mode = self.get_mode_from_fingers(up_fingers)
-                    
-                    # Draw cursor
-                    if mode != "IDLE":
-                        cv2.circle(frame, (x1, y1), 10, (255, 0, 255), cv2.FILLED)
-                    
-                    # Handle modes
-                    if mode == "SELECTION":
-                        self.handle_selection(x1, y1, frame)
-                    elif mode == "DRAWING":
-                        self.handle_drawing(x1, y1)
-                    else:
-                        self.xp, self.yp = None, None
-                else:
-                    self.xp, self.yp = None, None
-                
-                # Merge drawing canvas with frame
-                gray = cv2.cvtColor(self.draw_canvas, cv2.COLOR_BGR2GRAY)
-                _, inv_mask = cv2.threshold(gray, 10, 255, cv2.THRESH_BINARY)
-                inv_mask = cv2.cvtColor(inv_mask, cv2.COLOR_GRAY2BGR)
-                
-                frame = cv2.bitwise_and(frame, cv2.bitwise_not(inv_mask))
-                frame = cv2.bitwise_or(frame, self.draw_canvas)
-                
-                # Overlay menu
-                frame[0:self.menu.shape[0], 0:self.width] = self.menu
-                
-                # Calculate FPS
-                current_time = time.time()
-                fps = 1 / (current_time - self.prev_time) if self.prev_time > 0 else 0
-                self.prev_time = current_time
-                
-                # Draw UI
-                self.draw_ui(frame, fps, mode)
-                
-                # Display frame
-                cv2.imshow("Air Painter", frame)
-                
-                # Handle keyboard input
-                key = cv2.waitKey(1) & 0xFF
-                if key == ord('q'):
-                    break
-                elif key == ord('+') or key == ord('='):
-                    self.brush_thickness = min(20, self.brush_thickness + 1)
-                elif key == ord('-') or key == ord('_'):
-                    self.brush_thickness = max(1, self.brush_thickness - 1)
-                elif key == ord('c'):
-                    self.clear_canvas()
-                    
+            with profiling():
+                pipeline.run()
+            print(f"[INFO] {pipeline.report()}")
         except KeyboardInterrupt:
             print("\n[INFO] Application interrupted by user")
         except Exception as e:
@@ -323,13 +517,57 @@ class PainterApp:
         """Clean up resources."""
         if self.capture is not None:
             self.capture.release()
-        cv2.destroyAllWindows()
+        if self.recorder is not None:
+            self.recorder.close()
+        if not self.headless:
+            cv2.destroyAllWindows()
         print("[INFO] Application closed")
+    
+    def replay(self, path, output="drawing.png"):
+        """
+        Redraw a landmark recording without a camera or a model.
+        
+        Args:
+            path: Recording written with record=...
+            output: Image file for the finished canvas; the strokes are saved
+                    next to it with a .strokes suffix
+            
+        Returns:
+            bool: False if the recording could not be replayed
+        """
+        reader = LandmarkReader(path)
+        if not self.setup_canvas(reader.metadata["width"], reader.metadata["height"]):
+            return False
+        
+        # Recordings hold no track IDs, so hands are matched again
+        tracker = HandTracker()
+        for _, _, hands in reader.iter_frames("hand"):
+            hands = hands.astype("float32")
+            self.apply_gestures(hands, ids=tracker.update(hands))
+        self.end_strokes()
+        
+        cv2.imwrite(output, self.canvas.canvas)
+        self.save_session(str(Path(output).with_suffix(".strokes")))
+        print(f"[INFO] Replayed {len(reader)} frames into {output}")
+        return True
 
 
 def main():
     """Entry point for the application."""
-    app = PainterApp()
+    parser = argparse.ArgumentParser(description="Draw in the air with your index finger.")
+    parser.add_argument("--record", help="append the hand landmarks to this recording")
+    parser.add_argument("--replay", help="redraw a recording instead of using the camera")
+    parser.add_argument("--output", default="drawing.png", help="canvas image written by --replay")
+    parser.add_argument("--source", default="0", 
+                        help="camera index, video file, image directory or synthetic[:WxH[:N]]")
+    parser.add_argument("--fps", type=float, default=None, help="pace the source to this frame rate")
+    parser.add_argument("--headless", action="store_true", help="run without a window")
+    args = parser.parse_args()
+    
+    app = PainterApp(record=args.record, source=args.source, fps=args.fps, headless=args.headless)
+    if args.replay:
+        app.replay(args.replay, args.output)
+        return
     app.run()
 
 
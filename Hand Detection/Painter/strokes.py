@@ -0,0 +1,229 @@
+"""
+Vector stroke log for the Painter.
+
+Strokes are recorded as they are drawn instead of only existing as canvas
+pixels. Points live in one growable float32 array, normalized to [0, 1] so
+the log does not depend on the capture resolution, and every stroke is a
+row of a small structured array holding its point range, color and
+thickness. This makes undo/redo a matter of moving a counter, lets a session
+be saved or sent to another process as a few kilobytes, and lets the drawing
+be rasterized again at any resolution.
+
+Usage:
+    python strokes.py session.strokes drawing.png --width 3840 --height 2160
+"""
+import argparse
+import struct
+
+import cv2
+import numpy as np
+
+STROKE_DTYPE = np.dtype([
+    ("start", "<u4"),       # First point index
+    ("end", "<u4"),         # One past the last point index
+    ("color", "u1", 3),     # BGR
+    ("kind", "u1"),         # KIND_DRAW or KIND_CLEAR
+    ("thickness", "<f4"),   # Fraction of the canvas height
+])
+
+KIND_DRAW = 0
+KIND_CLEAR = 1
+
+# magic, version, width, height, stroke count, point count
+HEADER = struct.Struct("<4sHIIII")
+MAGIC = b"PSTK"
+VERSION = 1
+
+
+class StrokeLog:
+    """Array-backed list of strokes with undo/redo and binary serialization."""
+
+    def __init__(self, width, height):
+        """
+        Initialize an empty log.
+
+        Args:
+            width: Width of the canvas the strokes are drawn on
+            height: Height of the canvas the strokes are drawn on
+        """
+        self.width = width
+        self.height = height
+        self.points = np.empty((256, 2), dtype=np.float32)
+        self.strokes = np.empty(32, dtype=STROKE_DTYPE)
+        self.num_points = 0
+        self.num_strokes = 0    # Strokes currently applied
+        self.total_strokes = 0  # Applied strokes plus the ones that can be redone
+        self.open = False       # Whether the last stroke can still be extended
+
+    def __len__(self):
+        return self.num_strokes
+
+    def _append_stroke(self, color, thickness, kind):
+        """Start a new stroke row, dropping anything that could be redone."""
+        if self.num_strokes == len(self.strokes):
+            self.strokes = np.resize(self.strokes, 2 * len(self.strokes))
+        self.num_points = self.strokes[self.num_strokes - 1]["end"] if self.num_strokes else 0
+        stroke = self.strokes[self.num_strokes]
+        stroke["start"] = stroke["end"] = self.num_points
+        stroke["color"] = color
+        stroke["kind"] = kind
+        stroke["thickness"] = thickness / self.height
+        self.num_strokes += 1
+        self.total_strokes = self.num_strokes
+        return stroke
+
+    def _append_point(self, x, y):
+        """Add a point to the last stroke."""
+        if self.num_points == len(self.points):
+            self.points = np.resize(self.points, (2 * len(self.points), 2))
+        self.points[self.num_points] = (x / self.width, y / self.height)
+        self.num_points += 1
+        self.strokes[self.num_strokes - 1]["end"] = self.num_points
+
+    def add_segment(self, start, end, color, thickness):
+        """
+        Record a line segment drawn by the Painter.
+
+        The segment extends the current stroke when it continues from the
+        stroke's last point with the same color and thickness, and starts a
+        new stroke otherwise.
+
+        Args:
+            start: (x, y) of the segment start in canvas pixels
+            end: (x, y) of the segment end in canvas pixels
+            color: BGR color
+            thickness: Line thickness in canvas pixels
+        """
+        if self.open and self.num_strokes == self.total_strokes:
+            last = self.strokes[self.num_strokes - 1]
+            last_point = self.points[last["end"] - 1] * (self.width, self.height)
+            if (tuple(np.rint(last_point).astype(int)) == tuple(start)
+                    and tuple(last["color"]) == tuple(color)
+                    and round(float(last["thickness"]) * self.height) == thickness):
+                self._append_point(*end)
+                return
+
+        self._append_stroke(color, thickness, KIND_DRAW)
+        self._append_point(*start)
+        self._append_point(*end)
+        self.open = True
+
+    def end_stroke(self):
+        """Make the next segment start a new stroke."""
+        self.open = False
+
+    def clear(self):
+        """Record a clear, which undo can bring the drawing back from."""
+        self._append_stroke((0, 0, 0), 0, KIND_CLEAR)
+        self.open = False
+
+    def undo(self):
+        """Hide the last stroke. Returns False if there is nothing to undo."""
+        if self.num_strokes == 0:
+            return False
+        self.num_strokes -= 1
+        self.open = False
+        return True
+
+    def redo(self):
+        """Restore the last undone stroke. Returns False if there is none."""
+        if self.num_strokes == self.total_strokes:
+            return False
+        self.num_strokes += 1
+        return True
+
+    def rasterize(self, width=None, height=None, canvas=None):
+        """
+        Draw the applied strokes at any resolution.
+
+        Args:
+            width: Output width (defaults to the recorded width)
+            height: Output height (defaults to the recorded height)
+            canvas: BGR image to draw into instead of a new black one
+
+        Returns:
+            numpy array: The canvas
+        """
+        width = width or self.width
+        height = height or self.height
+        if canvas is None:
+            canvas = np.zeros((height, width, 3), dtype=np.uint8)
+
+        # Nothing before the last clear is visible
+        strokes = self.strokes[:self.num_strokes]
+        clears = np.flatnonzero(strokes["kind"] == KIND_CLEAR)
+        if len(clears):
+            canvas[:] = 0
+            strokes = strokes[clears[-1] + 1:]
+
+        scale = np.array([width, height], dtype=np.float32)
+        for stroke in strokes:
+            points = np.rint(self.points[stroke["start"]:stroke["end"]] * scale).astype(np.int32)
+            if len(points) < 2:
+                continue
+            thickness = max(1, int(round(float(stroke["thickness"]) * height)))
+            cv2.polylines(canvas, [points], False, tuple(int(c) for c in stroke["color"]),
+                          thickness=thickness)
+        return canvas
+
+    def to_bytes(self):
+        """
+        Serialize the applied strokes.
+
+        Points are stored as uint16 fractions of the canvas size, four bytes
+        per point, which keeps sub-pixel precision even at 4K.
+        """
+        strokes = self.strokes[:self.num_strokes].copy()
+        num_points = int(strokes[-1]["end"]) if len(strokes) else 0
+        points = np.rint(np.clip(self.points[:num_points], 0.0, 1.0) * 65535).astype("<u2")
+        header = HEADER.pack(MAGIC, VERSION, self.width, self.height, len(strokes), num_points)
+        return header + strokes.tobytes() + points.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Rebuild a log serialized by to_bytes."""
+        magic, version, width, height, num_strokes, num_points = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a Painter stroke log")
+
+        offset = HEADER.size
+        strokes = np.frombuffer(data, dtype=STROKE_DTYPE, count=num_strokes, offset=offset)
+        offset += strokes.nbytes
+        points = np.frombuffer(data, dtype="<u2", count=2 * num_points, offset=offset)
+
+        log = cls(width, height)
+        log.strokes = np.resize(strokes, max(num_strokes, len(log.strokes)))
+        log.points = np.resize(points.reshape(-1, 2).astype(np.float32) / 65535,
+                               (max(num_points, len(log.points)), 2))
+        log.num_strokes = log.total_strokes = num_strokes
+        log.num_points = num_points
+        return log
+
+    def save(self, path):
+        """Write the applied strokes to a file."""
+        with open(path, "wb") as output:
+            output.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        """Read a log written by save."""
+        with open(path, "rb") as source:
+            return cls.from_bytes(source.read())
+
+
+def main():
+    """Rasterize a saved Painter session to an image."""
+    parser = argparse.ArgumentParser(description="Render a saved Painter session.")
+    parser.add_argument("session", help="file written with the Painter's 's' key")
+    parser.add_argument("output", help="image to write, e.g. drawing.png")
+    parser.add_argument("--width", type=int, help="output width (default: recorded width)")
+    parser.add_argument("--height", type=int, help="output height (default: recorded height)")
+    args = parser.parse_args()
+
+    log = StrokeLog.load(args.session)
+    cv2.imwrite(args.output, log.rasterize(args.width, args.height))
+    print(f"[INFO] Rendered {len(log)} strokes to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Cached text overlay renderer for the Painter UI.
+
+PIL gives much nicer text than cv2.putText, but drawing through it means
+converting the whole frame to RGB and back for every string. This renderer
+rasterizes each (text, font, color) combination once into a small BGRA
+sprite and alpha-blends only the sprite's region of the frame afterwards.
+Sprites are kept in an LRU cache so strings that change every frame, such
+as the FPS counter, cannot grow it without bound.
+"""
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+
+class TextOverlay:
+    """Draw PIL-rendered text onto BGR frames through cached sprites."""
+
+    def __init__(self, max_sprites=128):
+        """
+        Initialize the renderer.
+
+        Args:
+            max_sprites: Number of rendered strings kept before the least
+                         recently used one is evicted
+        """
+        self.max_sprites = max_sprites
+        self.sprites = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text, font, color):
+        """
+        Rasterize a string into a BGRA sprite.
+
+        Args:
+            text: String to render
+            font: PIL font
+            color: Text color in BGR
+
+        Returns:
+            tuple: (BGRA sprite, (dx, dy) offset of the sprite from the text
+            position, matching where ImageDraw.text would have drawn it)
+        """
+        left, top, right, bottom = font.getbbox(text)
+        width, height = max(right - left, 1), max(bottom - top, 1)
+
+        # Antialiased coverage of the glyphs becomes the alpha channel
+        mask = Image.new("L", (width, height), 0)
+        ImageDraw.Draw(mask).text((-left, -top), text, font=font, fill=255)
+
+        sprite = np.empty((height, width, 4), dtype=np.uint8)
+        sprite[..., :3] = color
+        sprite[..., 3] = np.asarray(mask)
+        return sprite, (left, top)
+
+    def get_sprite(self, text, font, color):
+        """Return the cached blend terms for a string, rendering it on a miss."""
+        key = (text, font, tuple(color))
+        entry = self.sprites.get(key)
+        if entry is not None:
+            self.sprites.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        sprite, offset = self.render(text, font, color)
+        alpha = sprite[..., 3:4].astype(np.float32) / 255.0
+        # Precompute color * alpha and 1 - alpha so a blend is one multiply-add
+        entry = (sprite[..., :3] * alpha, 1.0 - alpha, offset)
+        self.sprites[key] = entry
+        if len(self.sprites) > self.max_sprites:
+            self.sprites.popitem(last=False)
+        return entry
+
+    def draw(self, frame, text, position, font, color=(255, 255, 255)):
+        """
+        Draw text onto a BGR frame in place.
+
+        Args:
+            frame: BGR image
+            text: String to draw
+            position: (x, y) of the text origin, as for ImageDraw.text
+            font: PIL font
+            color: Text color in BGR
+        """
+        if not text:
+            return
+        premultiplied, inverse_alpha, (dx, dy) = self.get_sprite(text, font, color)
+        h, w = inverse_alpha.shape[:2]
+        x, y = position[0] + dx, position[1] + dy
+
+        # Clip the sprite to the frame
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, frame.shape[1]), min(y + h, frame.shape[0])
+        if x0 >= x1 or y0 >= y1:
+            return
+        sx, sy = x0 - x, y0 - y
+        sprite_region = (slice(sy, sy + y1 - y0), slice(sx, sx + x1 - x0))
+
+        roi = frame[y0:y1, x0:x1]
+        blended = roi * inverse_alpha[sprite_region] + premultiplied[sprite_region]
+        np.rint(blended, out=blended)
+        roi[:] = blended
@@ -2,10 +2,24 @@
 Robust Finger Counting Application
 Works with various hand orientations and positions
 """
+import argparse
 import time
 import cv2
 import numpy as np
+import sys
+from pathlib import Path
+
+# Modules every demo uses (pipeline, frames, instrumentation, ...) live in Shared/
+SHARED_DIR = str(Path(__file__).resolve().parent.parent / "Shared")
+if SHARED_DIR not in sys.path:
+    sys.path.insert(0, SHARED_DIR)
+
+import gestures
+from frames import FramePool, is_live_source, open_source
 from hand_detector import HandDetector
+from instrumentation import PROFILER, profiling, timer
+from landmark_recording import LandmarkReader, LandmarkRecorder
+from pipeline import FramePipeline
 
 
 class FingerCounter:
@@ -13,7 +27,8 @@ class FingerCounter:
     
     def __init__(self):
         """Initialize the finger counter."""
-        self.detector = HandDetector(detect_confidence=0.75, track_confidence=0.5)
+        self.detector = HandDetector(detect_confidence=0.75, track_confidence=0.5, 
+                                     smoothing="one_euro")
         self.finger_tips = [4, 8, 12, 16, 20]  # Thumb, Index, Middle, Ring, Pinky
         self.finger_pips = [2, 6, 10, 14, 18]  # PIP joints (one below tip)
         
@@ -22,90 +37,57 @@ class FingerCounter:
         Determine if hand is vertical (palm facing camera) or horizontal.
         
         Args:
-            landmarks: Hand landmarks
+            landmarks: Hand landmarks, shape (21, 2+) with normalized x, y first
             
         Returns:
             bool: True if hand is vertical
         """
-        # Compare wrist (0) to middle finger MCP (9)
-        wrist_y = landmarks[0][2]
-        middle_mcp_y = landmarks[9][2]
-        
-        # If middle MCP is significantly above wrist, hand is vertical
-        return abs(middle_mcp_y - wrist_y) > 0.1
+        # Middle finger MCP (9) well above or below the wrist (0)
+        return bool(gestures.is_vertical(landmarks))
     
     def get_hand_orientation(self, landmarks):
         """
         Determine hand orientation (left/right).
         
         Args:
-            landmarks: Hand landmarks
+            landmarks: Hand landmarks, shape (21, 2+) with normalized x, y first
             
         Returns:
             str: 'left' or 'right'
         """
-        # Compare thumb and pinky positions
-        thumb_x = landmarks[4][1]
-        pinky_x = landmarks[20][1]
-        
-        # If thumb is to the left of pinky, it's a right hand (in mirror view)
-        return 'right' if thumb_x < pinky_x else 'left'
+        # Thumb left of pinky is a right hand (in mirror view)
+        return 'right' if gestures.is_right_hand(landmarks) else 'left'
     
     def count_fingers_robust(self, landmarks):
         """
         Count fingers with robust orientation handling.
         
         Args:
-            landmarks: Hand landmarks
+            landmarks: Hand landmarks, shape (21, 2+) with normalized x, y first
             
         Returns:
             int: Number of fingers up
         """
         if len(landmarks) == 0:
             return 0
+        return int(gestures.count_fingers(landmarks))
+    
+    @staticmethod
+    def count_recording(reader, start=None, stop=None):
+        """
+        Count the fingers of the first hand in every frame of a recording.
         
-        fingers_up = []
-        orientation = self.get_hand_orientation(landmarks)
-        is_vertical = self.is_hand_vertical(landmarks)
-        
-        # Thumb detection (special case)
-        thumb_tip = landmarks[4]
-        thumb_ip = landmarks[3]
-        thumb_mcp = landmarks[2]
-        
-        if is_vertical:
-            # Vertical hand: check if thumb is extended sideways
-            if orientation == 'right':
-                # Right hand: thumb extends to the left
-                fingers_up.append(1 if thumb_tip[1] < thumb_ip[1] else 0)
-            else:
-                # Left hand: thumb extends to the right
-                fingers_up.append(1 if thumb_tip[1] > thumb_ip[1] else 0)
-        else:
-            # Horizontal hand: check if thumb is above
-            fingers_up.append(1 if thumb_tip[2] < thumb_mcp[2] else 0)
-        
-        # Other four fingers
-        for i in range(1, 5):
-            tip_idx = self.finger_tips[i]
-            pip_idx = self.finger_pips[i]
-            
-            tip = landmarks[tip_idx]
-            pip = landmarks[pip_idx]
+        Args:
+            reader: LandmarkReader of a recording with a "hand" stream
+            start, stop: Range of records to count (default all)
             
-            if is_vertical:
-                # Vertical hand: finger is up if tip is above PIP
-                fingers_up.append(1 if tip[2] < pip[2] else 0)
-            else:
-                # Horizontal hand: check based on orientation
-                if orientation == 'right':
-                    # Fingers extend to the right
-                    fingers_up.append(1 if tip[1] > pip[1] else 0)
-                else:
-                    # Fingers extend to the left
-                    fingers_up.append(1 if tip[1] < pip[1] else 0)
-        
-        return sum(fingers_up)
+        Returns:
+            numpy array: Fingers up per frame, 0 where no hand was found
+        """
+        hands, counts = reader.stream("hand", start, stop)
+        # One vectorized pass over the whole range, no per-frame Python loop
+        fingers = gestures.count_fingers(hands[:, 0].astype(np.float32))
+        return np.where(counts > 0, fingers, 0).astype(int)
     
     def draw_finger_indicators(self, frame, landmarks, count, width, height):
         """
@@ -113,7 +95,7 @@ class FingerCounter:
         
         Args:
             frame: Video frame
-            landmarks: Hand landmarks
+            landmarks: Hand landmarks, shape (21, 2+) with normalized x, y first
             count: Number of fingers up
             width: Frame width
             height: Frame height
@@ -122,8 +104,8 @@ class FingerCounter:
         colors = [(0, 255, 0), (0, 255, 255), (255, 255, 0), (255, 0, 255), (255, 0, 0)]
         
         for i, tip_idx in enumerate(self.finger_tips):
-            x = int(landmarks[tip_idx][1] * width)
-            y = int(landmarks[tip_idx][2] * height)
+            x = int(landmarks[tip_idx, 0] * width)
+            y = int(landmarks[tip_idx, 1] * height)
             cv2.circle(frame, (x, y), 10, colors[i], cv2.FILLED)
             cv2.circle(frame, (x, y), 12, (255, 255, 255), 2)
 
@@ -131,10 +113,27 @@ class FingerCounter:
 class FingerCountApp:
     """Finger counting application."""
     
-    def __init__(self):
-        """Initialize the application."""
+    def __init__(self, threaded=True, record=None, source=0, fps=None, headless=False):
+        """
+        Initialize the application.
+        
+        Args:
+            threaded: Run capture, inference and rendering on separate threads
+            record: Optional path of a landmark recording to append the hands to
+            source: Camera index, video file, image directory or "synthetic"
+                    (see frames.open_source)
+            fps: Pace the source to this frame rate, or None for as fast as it delivers
+            headless: Skip the window and keyboard, e.g. to benchmark on recorded input
+        """
+        self.threaded = threaded
+        self.record = record
+        self.source = source
+        self.fps = fps
+        self.headless = headless
+        self.recorder = None
         self.counter = FingerCounter()
         self.capture = None
+        self.frames = FramePool()
         self.width = 0
         self.height = 0
         self.prev_time = 0
@@ -184,64 +183,100 @@ class FingerCountApp:
                        cv2.FONT_HERSHEY_PLAIN, 1.2, (255, 255, 255), 1)
             y_offset += 25
     
+    def read_frame(self):
+        """Capture stage: read and mirror the next camera frame."""
+        # Read into a recycled buffer; the pipeline releases it after rendering
+        success, frame = self.frames.read(self.capture)
+        if not success:
+            print("[WARNING] Failed to capture frame")
+            return False, None
+        
+        # Flip frame for mirror effect
+        with timer.stage("flip"):
+            cv2.flip(frame, 1, dst=frame)
+            return True, frame
+    
+    def process_frame(self, frame):
+        """Inference stage: detect the hand and return its landmarks."""
+        self.counter.detector.find_hand(frame, draw=True)
+        # Copy: the detector reuses its landmark buffer on the next frame
+        hands = self.counter.detector.landmark_array().copy()
+        if self.recorder is not None:
+            self.recorder.write(self.recorder.frames, time.time(), hand=hands)
+        return hands
+    
+    def render_frame(self, frame, hands):
+        """
+        Render stage: count fingers, draw the overlays and show the frame.
+        
+        Returns:
+            bool: False when the user asked to quit
+        """
+        if len(hands) != 0:
+            landmarks = hands[0]
+            
+            # Count fingers
+            count = self.counter.count_fingers_robust(landmarks)
+            
+            # Draw visual indicators
+            self.counter.draw_finger_indicators(frame, landmarks, count, 
+                                               self.width, self.height)
+            
+            # Draw count display
+            self.draw_count_display(frame, count)
+        else:
+            # Show instructions when no hand detected
+            self.draw_instructions(frame)
+        
+        # Calculate and display FPS
+        current_time = time.time()
+        fps = 1 / (current_time - self.prev_time) if self.prev_time > 0 else 0
+        self.prev_time = current_time
+        
+        cv2.putText(frame, f"FPS: {int(fps)}", (self.width - 100, 30), 
+                   cv2.FONT_HERSHEY_PLAIN, 1.6, (0, 255, 255), 2)
+        
+        # Display frame
+        if self.headless:
+            return True
+        with timer.stage("display"):
+            cv2.imshow("Robust Finger Counter", frame)
+            
+            # Handle keyboard input
+            return cv2.waitKey(1) & 0xFF != ord('q')
+    
     def run(self):
         """Main application loop."""
-        # Initialize camera
-        self.capture = cv2.VideoCapture(0)
+        # Initialize camera (or any other frame source)
+        self.capture = open_source(self.source, fps=self.fps)
         if not self.capture.isOpened():
-            print("[ERROR] Failed to open camera")
+            print(f"[ERROR] Failed to open source: {self.source}")
             return
         
         self.width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
         self.height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
         
         print(f"[INFO] Camera resolution: {self.width} x {self.height}")
+        
+        if self.record:
+            detector = self.counter.detector
+            self.recorder = LandmarkRecorder(self.record, 
+                                             {"hand": (detector.max_hands, detector.NUM_LANDMARKS)}, 
+                                             metadata={"width": self.width, "height": self.height})
+            print(f"[INFO] Recording landmarks to {self.record}")
+        
         print("[INFO] Starting Finger Counter...")
         print("[INFO] Show your hand in any orientation")
         
+        # Profilers only follow one thread, so run serially while profiling
+        pipeline = FramePipeline(self.read_frame, self.process_frame, self.render_frame, 
+                                 threaded=self.threaded and not PROFILER, 
+                                 release=self.frames.release, 
+                                 lossless=self.fps is None and not is_live_source(self.source))
         try:
-            while True:
-                success, frame = self.capture.read()
-                if not success:
-                    print("[WARNING] Failed to capture frame")
-                    break
-                
-                # Flip frame for mirror effect
-                frame = cv2.flip(frame, 1)
-                
-                # Detect hand
-                self.counter.detector.find_hand(frame, draw=True)
-                landmarks = self.counter.detector.find_position(frame)
-                
-                if len(landmarks) != 0:
-                    # Count fingers
-                    count = self.counter.count_fingers_robust(landmarks)
-                    
-                    # Draw visual indicators
-                    self.counter.draw_finger_indicators(frame, landmarks, count, 
-                                                       self.width, self.height)
-                    
-                    # Draw count display
-                    self.draw_count_display(frame, count)
-                else:
-                    # Show instructions when no hand detected
-                    self.draw_instructions(frame)
-                
-                # Calculate and display FPS
-                current_time = time.time()
-                fps = 1 / (current_time - self.prev_time) if self.prev_time > 0 else 0
-                self.prev_time = current_time
-                
-                cv2.putText(frame, f"FPS: {int(fps)}", (self.width - 100, 30), 
-                           cv2.FONT_HERSHEY_PLAIN, 1.6, (0, 255, 255), 2)
-                
-                # Display frame
-                cv2.imshow("Robust Finger Counter", frame)
-                
-                # Handle keyboard input
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
-                    
+            with profiling():
+                pipeline.run()
+            print(f"[INFO] {pipeline.report()}")
         except KeyboardInterrupt:
             print("\n[INFO] Application interrupted by user")
         except Exception as e:
@@ -253,13 +288,38 @@ class FingerCountApp:
         """Clean up resources."""
         if self.capture is not None:
             self.capture.release()
-        cv2.destroyAllWindows()
+        if self.recorder is not None:
+            self.recorder.close()
+        if not self.headless:
+            cv2.destroyAllWindows()
         print("[INFO] Application closed")
 
 
+def replay(path):
+    """Count the fingers of a landmark recording without a camera."""
+    reader = LandmarkReader(path)
+    counts = FingerCounter.count_recording(reader)
+    print(f"[INFO] {len(counts)} frames, {np.count_nonzero(reader.stream('hand')[1])} with a hand")
+    for fingers, frames in enumerate(np.bincount(counts, minlength=6)):
+        print(f"[INFO]   {fingers} fingers: {frames} frames")
+
+
 def main():
     """Entry point for the application."""
-    app = FingerCountApp()
+    parser = argparse.ArgumentParser(description="Count raised fingers from the webcam.")
+    parser.add_argument("--record", help="append the hand landmarks to this recording")
+    parser.add_argument("--replay", help="count the fingers of a recording instead of the camera")
+    parser.add_argument("--source", default="0", 
+                        help="camera index, video file, image directory or synthetic[:WxH[:N]]")
+    parser.add_argument("--fps", type=float, default=None, help="pace the source to this frame rate")
+    parser.add_argument("--headless", action="store_true", help="run without a window")
+    args = parser.parse_args()
+
+    if args.replay:
+        replay(args.replay)
+        return
+    app = FingerCountApp(record=args.record, source=args.source, fps=args.fps, 
+                         headless=args.headless)
     app.run()
 
 
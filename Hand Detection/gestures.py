@@ -0,0 +1,115 @@
+"""
+Vectorized finger-state classification.
+
+Every function takes hand landmarks shaped (..., 21, C) with normalized x and
+y in the first two columns, as returned by HandDetector.landmark_array, and
+classifies all hands in one NumPy pass. The leading dimensions are free, so
+a single hand (21, C), the hands of one frame (num_hands, 21, C) or a whole
+recording (frames, hands, 21, C) all work the same way.
+"""
+import numpy as np
+
+# Thumb, Index, Middle, Ring, Pinky
+FINGER_TIPS = np.array([4, 8, 12, 16, 20])
+FINGER_PIPS = np.array([2, 6, 10, 14, 18])  # Joint compared against by the robust rule
+
+WRIST = 0
+THUMB_MCP = 2
+THUMB_IP = 3
+THUMB_TIP = 4
+MIDDLE_MCP = 9
+PINKY_TIP = 20
+
+# Minimum wrist to middle-MCP height for a hand to count as vertical
+VERTICAL_THRESHOLD = 0.1
+
+
+def fingers_up(landmarks):
+    """
+    Simple finger states, the rule used by HandDetector.fingerUp.
+
+    The thumb is up when its tip is left of its IP joint; the other fingers
+    are up when their tip is above the joint below it.
+
+    Args:
+        landmarks: Array of shape (..., 21, C)
+
+    Returns:
+        numpy.ndarray: uint8 array of shape (..., 5), thumb first
+    """
+    landmarks = np.asarray(landmarks)
+    x, y = landmarks[..., 0], landmarks[..., 1]
+    states = np.empty(landmarks.shape[:-2] + (5,), dtype=np.uint8)
+    states[..., 0] = x[..., THUMB_TIP] < x[..., THUMB_IP]
+    states[..., 1:] = y[..., FINGER_TIPS[1:]] < y[..., FINGER_TIPS[1:] - 1]
+    return states
+
+
+def is_vertical(landmarks):
+    """
+    Whether each hand is vertical (fingers pointing up or down).
+
+    Returns:
+        numpy.ndarray: bool array of shape (...)
+    """
+    y = np.asarray(landmarks)[..., 1]
+    return np.abs(y[..., MIDDLE_MCP] - y[..., WRIST]) > VERTICAL_THRESHOLD
+
+
+def is_right_hand(landmarks):
+    """
+    Whether each hand is a right hand in the mirrored view (thumb left of pinky).
+
+    Returns:
+        numpy.ndarray: bool array of shape (...)
+    """
+    x = np.asarray(landmarks)[..., 0]
+    return x[..., THUMB_TIP] < x[..., PINKY_TIP]
+
+
+def robust_fingers_up(landmarks):
+    """
+    Orientation-aware finger states, the rule used by FingerCounter.
+
+    Vertical hands compare fingertips to their PIP joints along y and the
+    thumb sideways along x; horizontal hands compare fingers along x in the
+    direction they point and the thumb along y.
+
+    Args:
+        landmarks: Array of shape (..., 21, C)
+
+    Returns:
+        numpy.ndarray: uint8 array of shape (..., 5), thumb first
+    """
+    landmarks = np.asarray(landmarks)
+    x, y = landmarks[..., 0], landmarks[..., 1]
+    vertical = is_vertical(landmarks)[..., None]
+    right = is_right_hand(landmarks)[..., None]
+
+    states = np.empty(landmarks.shape[:-2] + (5,), dtype=np.uint8)
+
+    # Thumb: sideways when vertical, upwards when horizontal
+    thumb_x, thumb_ip_x = x[..., THUMB_TIP], x[..., THUMB_IP]
+    states[..., 0] = np.where(
+        vertical[..., 0],
+        np.where(right[..., 0], thumb_x < thumb_ip_x, thumb_x > thumb_ip_x),
+        y[..., THUMB_TIP] < y[..., THUMB_MCP])
+
+    # Other four fingers
+    tips, pips = FINGER_TIPS[1:], FINGER_PIPS[1:]
+    tip_x, pip_x = x[..., tips], x[..., pips]
+    states[..., 1:] = np.where(
+        vertical,
+        y[..., tips] < y[..., pips],
+        np.where(right, tip_x > pip_x, tip_x < pip_x))
+    return states
+
+
+def count_fingers(landmarks):
+    """
+    Number of raised fingers per hand using the orientation-aware rule.
+
+    Returns:
+        numpy.ndarray: int array of shape (...)
+    """
+    return robust_fingers_up(landmarks).sum(axis=-1)
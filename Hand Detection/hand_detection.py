@@ -1,29 +1,46 @@
 import cv2
+import sys
+from pathlib import Path
+
+# Modules every demo uses (pipeline, frames, instrumentation, ...) live in Shared/
+SHARED_DIR = str(Path(__file__).resolve().parent.parent / "Shared")
+if SHARED_DIR not in sys.path:
+    sys.path.insert(0, SHARED_DIR)
+
+from frames import FramePool
 from hand_detector import HandDetector
+from instrumentation import PROFILER, profiling, timer
+from pipeline import FramePipeline
 
 capture = cv2.VideoCapture(0)
 hand_detector = HandDetector()
+frames = FramePool()
 
-def main():
-    while True:
-        success, frame = capture.read()
-        
-        if not success:
-            break
-        
-        detect = hand_detector.find_hand(frame)
-        pos = hand_detector.find_position(frame)
-        
-        # Check if positions are detected and print the first hand's landmarks
-        if len(pos) > 0:
-            for hand_id, hand_position in enumerate(pos):
-                print(f"Hand {hand_id}: Landmark ID {hand_position[0]}, x: {hand_position[1]}, y: {hand_position[2]}")
-        
+def process_frame(frame):
+    detect = hand_detector.find_hand(frame)
+    pos = hand_detector.find_position(frame)
+    return detect, pos
+
+def render_frame(frame, result):
+    detect, pos = result
+
+    # Check if positions are detected and print the first hand's landmarks
+    if len(pos) > 0:
+        for hand_id, hand_position in enumerate(pos):
+            print(f"Hand {hand_id}: Landmark ID {hand_position[0]}, x: {hand_position[1]}, y: {hand_position[2]}")
+
+    with timer.stage("display"):
         cv2.imshow("Live Capture", detect)
-        
+
         # Exit if 'q' is pressed
-        if cv2.waitKey(20) & 0xFF == ord('q'):
-            break
+        return cv2.waitKey(20) & 0xFF != ord('q')
+
+def main():
+    # Profilers only follow one thread, so run serially while profiling
+    pipeline = FramePipeline(lambda: frames.read(capture), process_frame, render_frame, 
+                             threaded=not PROFILER, release=frames.release)
+    with profiling():
+        pipeline.run()
 
     capture.release()
     cv2.destroyAllWindows()
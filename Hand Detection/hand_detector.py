@@ -1,5 +1,20 @@
+import time
 import mediapipe as mp
+import numpy as np
 import cv2
+import sys
+from pathlib import Path
+
+# Modules every demo uses (pipeline, frames, instrumentation, ...) live in Shared/
+SHARED_DIR = str(Path(__file__).resolve().parent.parent / "Shared")
+if SHARED_DIR not in sys.path:
+    sys.path.insert(0, SHARED_DIR)
+
+from filters import LandmarkFilterBank
+from frames import RGBConverter
+from gestures import fingers_up
+from hand_tracker import HandTracker
+from instrumentation import timer
 
 class HandDetector():
     """
@@ -13,24 +28,72 @@ class HandDetector():
                                 Ranges from 0 to 1. Defaults to 0.5.
     - track_confidence (float): Minimum confidence value for tracking to be considered successful. 
                                 Ranges from 0 to 1. Defaults to 0.5.
+    - roi_tracking (bool): If True, run MediaPipe only on a padded crop around the hands found
+                           in the previous frame and map the landmarks back to the full frame.
+                           Falls back to the full frame when the hands are lost. Defaults to False.
+    - roi_padding (float): Margin added around the previous hands on each side, as a fraction
+                           of their bounding box size. Crops are searched from scratch, and the
+                           palm detector misses hands that fill most of the crop. Defaults to 0.75.
+    - roi_refresh (int): Run on the full frame every this many frames even while tracking, so
+                         hands entering outside the crop are found. Defaults to 30.
+    - inference_size (int): Longest side of the image given to MediaPipe. Larger frames (or
+                            crops) are downscaled before inference; landmarks stay relative to
+                            the full frame. None keeps the capture resolution. Defaults to None.
+    - smoothing (str): Temporal filter applied to landmark_array and find_position: "one_euro",
+                       "ema" or "kalman" (see filters.py), or None for raw landmarks. Stable
+                       landmarks let detection confidence or resolution be lowered for speed.
+                       Defaults to None.
+    - smoothing_params (dict): Filter parameters overriding filters.LANDMARK_DEFAULTS.
+
+    Hands keep a stable ID while they stay in view (see hand_tracker.py):
+    landmark_array returns them ordered by ID, oldest first, with the IDs in
+    hand_ids, so row 0 stays the same hand however MediaPipe orders its results.
 
     Attributes:
     - FINGER_TIP (list): Indexes of the hand landmarks corresponding to the fingertips.
+    - NUM_LANDMARKS (int): Number of landmarks MediaPipe reports per hand.
     - mp_hands: MediaPipe Hands object for detecting hands.
     - hands: A MediaPipe Hands model instance with the specified configurations.
+    - roi_hands: A second Hands instance that only sees the ROI crops (roi_tracking only).
     - mp_draw: MediaPipe drawing utilities for drawing hand landmarks and connections on the image.
 
     """
+    NUM_LANDMARKS = 21
+
+    # Crops larger than this fraction of the frame area save too little to be worth it
+    MAX_ROI_AREA = 0.6
+    # Crop sides are rounded up to a multiple of this, so the crop keeps its size
+    # (and its conversion buffers) while the hand moves or changes size a little
+    ROI_STEP = 32
+
     def __init__(self, static_mode=False, max_hands=2,
                  model_complexity=1, 
                  detect_confidence=0.5, 
-                 track_confidence=0.5) -> None:
+                 track_confidence=0.5,
+                 roi_tracking=False,
+                 roi_padding=0.75,
+                 roi_refresh=30,
+                 inference_size=None,
+                 smoothing=None,
+                 smoothing_params=None) -> None:
         
         self.static_mode = static_mode
         self.max_hands = max_hands
         self.model_complexity = model_complexity
         self.detect_confidence = detect_confidence
         self.track_confidence = track_confidence
+        self.roi_tracking = roi_tracking
+        self.roi_padding = roi_padding
+        self.roi_refresh = roi_refresh
+        self.inference_size = inference_size
+        self._rgb = RGBConverter()
+        self._crop_rgb = RGBConverter()  # Crops have their own size, so their own buffers
+        self.tracker = HandTracker()
+        self.hand_ids = []  # Track ID of every row of landmark_array
+        self.smoother = None
+        if smoothing:
+            self.smoother = LandmarkFilterBank(smoothing, max_tracks=max_hands, 
+                                               **(smoothing_params or {}))
 
         self.FINGER_TIP = [4, 8, 12, 16, 20]
 
@@ -41,45 +104,181 @@ class HandDetector():
                                          min_detection_confidence=self.detect_confidence,
                                          min_tracking_confidence=self.track_confidence)
 
+        # Crops get their own graph in static image mode: MediaPipe's tracking carries
+        # the previous hand region between calls in image coordinates, and the crop
+        # window moves from frame to frame, so every crop is searched from scratch
+        self.roi_hands = None
+        if self.roi_tracking:
+            self.roi_hands = self.mp_hands.Hands(static_image_mode=True, 
+                                                 max_num_hands=self.max_hands, 
+                                                 model_complexity=self.model_complexity, 
+                                                 min_detection_confidence=self.detect_confidence,
+                                                 min_tracking_confidence=self.track_confidence)
+
         self.mp_draw = mp.solutions.drawing_utils
+        self.results = None
+        self.timestamp = None  # When the current results were computed
+
+        # Reused by landmark_array: x, y, z, visibility for every landmark of every hand
+        self._landmarks = np.zeros((self.max_hands, self.NUM_LANDMARKS, 4), dtype=np.float32)
+        self._tracked = None
+        self._tracked_results = None
+
+        # ROI tracking state: crop (x0, y0, x1, y1) in pixels, or None for the full frame
+        self.roi = None
+        self.roi_frames = 0
+        self.roi_misses = 0
     
+    def process_rgb(self, img_rgb):
+        """Run MediaPipe on an RGB image (full frame, no ROI tracking) and keep the results."""
+        with timer.stage("hand.process"):
+            self.results = self.hands.process(img_rgb)
+        self.timestamp = time.perf_counter()
+        return self.results
+
+    def process(self, image):
+        """Convert a BGR image to RGB and run MediaPipe on it."""
+        with timer.stage("hand.bgr2rgb"):
+            img_rgb = self._rgb.convert(image, self.inference_size)
+        return self.process_rgb(img_rgb)
+
+    def _process_crop(self, crop):
+        """Run the crop graph on a BGR crop; landmarks are relative to the crop."""
+        with timer.stage("hand.bgr2rgb"):
+            img_rgb = self._crop_rgb.convert(crop, self.inference_size)
+        with timer.stage("hand.process"):
+            results = self.roi_hands.process(img_rgb)
+        self.timestamp = time.perf_counter()
+        return results
+
+    def _hands_box(self, hands, width, height):
+        """Padded square around all hands in pixels, shifted inside the frame, or None."""
+        xs = [mark.x for hand in hands for mark in hand.landmark]
+        ys = [mark.y for hand in hands for mark in hand.landmark]
+        x0, x1 = min(xs) * width, max(xs) * width
+        y0, y1 = min(ys) * height, max(ys) * height
+        # A square crop keeps the hand's aspect ratio for the model
+        side = max(x1 - x0, y1 - y0) * (1 + 2 * self.roi_padding)
+        side = min(-(-int(side) // self.ROI_STEP) * self.ROI_STEP, width, height)
+        if side * side > self.MAX_ROI_AREA * width * height:
+            return None
+        # Shifted rather than clipped at the edges, so the crop size stays the same
+        left = min(max(int((x0 + x1 - side) / 2), 0), width - side)
+        top = min(max(int((y0 + y1 - side) / 2), 0), height - side)
+        return (left, top, left + side, top + side)
+
+    def _find_hand_roi(self, image):
+        """Run MediaPipe on the tracked crop, falling back to the full frame."""
+        h, w = image.shape[:2]
+        results = None
+        if self.roi is not None and self.roi_frames < self.roi_refresh:
+            x0, y0, x1, y1 = self.roi
+            with timer.stage("hand.roi"):
+                results = self._process_crop(image[y0:y1, x0:x1])
+            if results.multi_hand_landmarks:
+                # Map crop coordinates back to the full frame
+                sx, sy = (x1 - x0) / w, (y1 - y0) / h
+                for hand in results.multi_hand_landmarks:
+                    for mark in hand.landmark:
+                        mark.x = x0 / w + mark.x * sx
+                        mark.y = y0 / h + mark.y * sy
+                        mark.z *= sx
+                self.roi_frames += 1
+            else:
+                self.roi_misses += 1
+                results = None
+
+        if results is None:
+            # Lost the hands or due for a refresh: search the whole frame
+            results = self.process(image)
+            self.roi_frames = 0
+
+        self.roi = None
+        if results.multi_hand_landmarks:
+            self.roi = self._hands_box(results.multi_hand_landmarks, w, h)
+        return results
+
     def find_hand(self, image, draw=True):
-        img_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        self.results = self.hands.process(img_rgb)
+        if self.roi_tracking:
+            self.results = self._find_hand_roi(image)
+        else:
+            self.results = self.process(image)
         if self.results.multi_hand_landmarks:
             if draw:
-                for hand in self.results.multi_hand_landmarks:
-                    # print(hand)
-                    self.mp_draw.draw_landmarks(image, hand, self.mp_hands.HAND_CONNECTIONS)
+                with timer.stage("hand.draw"):
+                    for hand in self.results.multi_hand_landmarks:
+                        # print(hand)
+                        self.mp_draw.draw_landmarks(image, hand, self.mp_hands.HAND_CONNECTIONS)
         return image
     
+    def handedness(self):
+        """MediaPipe's "Left"/"Right" label for each hand of the results, in MediaPipe's order."""
+        if self.results is None or not getattr(self.results, "multi_handedness", None):
+            return None
+        return [hand.classification[0].label 
+                for hand in self.results.multi_handedness[:self.max_hands]]
+
     def find_position(self, image, hand_no=0):
-        h, w, c = image.shape
         lst_position = []
-        if self.results.multi_hand_landmarks:
-            if hand_no < len(self.results.multi_hand_landmarks):
-                hand = self.results.multi_hand_landmarks[hand_no]
-                for id, mark in enumerate(hand.landmark):
-                    # cx, cy = int(mark.x * w), int(mark.y * h)
-                    lst_position.append([id, mark.x, mark.y])
+        hands = self.landmark_array()
+        if hand_no < len(hands):
+            for id, (x, y) in enumerate(hands[hand_no, :, :2].tolist()):
+                lst_position.append([id, x, y])
         return lst_position
     
-    def fingerUp(self, lst_mark):
-        finger_status = list()
+    def landmark_array(self, image=None, pixel=False):
+        """
+        Return the landmarks of every detected hand as one array.
 
-        # Thumb: Compare landmark 4 and landmark 3 (y-axis)
-        if lst_mark[4][1] < lst_mark[3][1]:
-            finger_status.append(1)
-        else:
-            finger_status.append(0)
-
-        # For the rest of the fingers, compare the fingertip with the previous joint
-        # Starting from index 8, 12, 16, 20
-        for id in self.FINGER_TIP[1:]:
-            # Check if the tip is above the previous joint (y-axis)
-            if lst_mark[id][2] < lst_mark[id - 1][2]:
-                finger_status.append(1)
-            else:
-                finger_status.append(0)
+        Args:
+        - image: Frame passed to find_hand. Only needed when pixel is True.
+        - pixel (bool): If True, scale x and y from [0, 1] to pixel coordinates.
+
+        Returns:
+        - numpy.ndarray: float32 array of shape (num_hands, 21, 4) holding x, y, z and
+          visibility, ordered by track ID (see hand_ids) and smoothed over time if the
+          detector was created with smoothing.
+          It is a view of a buffer that the next call overwrites, so copy it before
+          handing it to another thread or keeping it across frames.
+        """
+        hands = []
+        if self.results is not None and self.results.multi_hand_landmarks:
+            hands = self.results.multi_hand_landmarks[:self.max_hands]
+
+        with timer.stage("hand.landmarks"):
+            for i, hand in enumerate(hands):
+                self._landmarks[i] = [(mark.x, mark.y, mark.z, mark.visibility)
+                                      for mark in hand.landmark]
+        landmarks = self._landmarks[:len(hands)]
+
+        # Track (and smooth) each frame once, however often its landmarks are read
+        if self._tracked_results is not self.results:
+            with timer.stage("hand.track"):
+                ids = self.tracker.update(landmarks, self.handedness())
+                order = np.argsort(ids, kind="stable")
+                self._tracked = landmarks[order]
+                self.hand_ids = [ids[i] for i in order]
+            if self.smoother is not None:
+                with timer.stage("hand.smooth"):
+                    self._tracked = self.smoother(self._tracked, self.timestamp, ids=self.hand_ids)
+            self._tracked_results = self.results
+        landmarks[:] = self._tracked
+
+        if pixel:
+            h, w = image.shape[:2]
+            landmarks[..., :2] *= (w, h)
+        return landmarks
+    
+    def fingerUp(self, lst_mark):
+        """
+        Return 1 for every raised finger and 0 otherwise, thumb first.
 
-        return finger_status
+        Args:
+        - lst_mark: Landmarks of one hand, either the [id, x, y] list returned by
+                    find_position or an array of shape (21, 2+) with x and y in
+                    the first two columns (one row of landmark_array).
+        """
+        if isinstance(lst_mark, list):
+            # find_position rows start with the landmark id
+            lst_mark = np.asarray(lst_mark)[:, 1:]
+        return fingers_up(lst_mark).tolist()
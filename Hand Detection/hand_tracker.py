@@ -0,0 +1,164 @@
+"""
+Stable identities for the hands found in consecutive frames.
+
+MediaPipe lists the hands of a frame in no particular order, and the order
+changes from frame to frame, so "hand 0" can be a different hand every time.
+HandTracker gives each hand an ID that it keeps for as long as it stays in
+view: every frame, the hands are matched to the known tracks by the
+distance between their palm centers (each track's center moved along its
+last velocity), with a penalty when MediaPipe's left/right label disagrees
+with the track's. The assignment is the one with the lowest total cost over
+all hands at once, not a greedy nearest match, so two hands crossing do not
+steal each other's IDs. A track survives a few frames without a match, so a
+hand missed by the detector for a moment comes back with its old ID.
+
+Each track carries a `state` dict for per-hand application data (a pen
+position, a gesture filter, ...), which goes away with the track.
+
+Usage:
+    tracker = HandTracker()
+    ids = tracker.update(detector.landmark_array(), labels)   # one ID per row
+    tracker.tracks[ids[0]].state["pen"] = (x, y)
+"""
+import numpy as np
+
+# Wrist and the five finger base joints: their mean is a stable palm center
+PALM = [0, 1, 5, 9, 13, 17]
+
+
+class Track:
+    """One hand followed over time."""
+
+    def __init__(self, track_id, center, handedness=None):
+        self.id = track_id
+        self.center = center
+        self.velocity = np.zeros(2)   # Center movement per frame
+        self.handedness = handedness  # "Left", "Right" or None
+        self.age = 1                  # Frames since the track started
+        self.missed = 0               # Consecutive frames without a match
+        self.state = {}               # Per-hand application data
+
+    def predicted(self):
+        """Where the palm center should be in the next frame."""
+        return self.center + self.velocity * (self.missed + 1)
+
+
+class HandTracker:
+    """Assign stable IDs to hands across frames."""
+
+    def __init__(self, max_distance=0.2, handedness_penalty=0.1, max_missed=5):
+        """
+        Initialize the tracker.
+
+        Args:
+            max_distance: Largest palm-center jump between frames still
+                          considered the same hand (normalized coordinates)
+            handedness_penalty: Cost added to a match whose left/right label
+                                differs from the track's; a penalty rather than
+                                a veto because MediaPipe's label flickers on
+                                ambiguous poses
+            max_missed: Frames a track survives without a matching hand
+        """
+        self.max_distance = max_distance
+        self.handedness_penalty = handedness_penalty
+        self.max_missed = max_missed
+        self.tracks = {}    # Track ID -> Track, oldest first
+        self.removed = []   # IDs of the tracks dropped by the last update
+        self.next_id = 0
+
+    def reset(self):
+        """Forget every track; IDs keep counting up."""
+        self.removed = list(self.tracks)
+        self.tracks = {}
+
+    def _costs(self, tracks, centers, handedness):
+        """Matching cost of every (track, hand) pair, inf where too far apart."""
+        predicted = np.array([track.predicted() for track in tracks]).reshape(-1, 2)
+        costs = np.linalg.norm(predicted[:, None] - centers[None], axis=-1)
+        costs[costs > self.max_distance] = np.inf
+        if handedness is not None:
+            for i, track in enumerate(tracks):
+                for j, label in enumerate(handedness):
+                    if track.handedness is not None and label is not None and track.handedness != label:
+                        costs[i, j] += self.handedness_penalty
+        return costs
+
+    def _assign(self, costs):
+        """
+        Minimum-cost matching of tracks (rows) to hands (columns).
+
+        An unmatched track or hand costs max_distance, so a pair is only
+        matched when that is cheaper than leaving both unmatched. With the
+        handful of hands a frame holds, trying every matching is exact and
+        cheaper than a general assignment solver.
+
+        Returns:
+            list: Column matched to each row, or None
+        """
+        rows, cols = costs.shape
+        best = [np.inf, None]
+
+        def search(row, used, total, matches):
+            if total >= best[0]:
+                return
+            if row == rows:
+                total += self.max_distance * (cols - len(used))
+                if total < best[0]:
+                    best[0], best[1] = total, list(matches)
+                return
+            for col in range(cols):
+                if col not in used and costs[row, col] < np.inf:
+                    matches.append(col)
+                    search(row + 1, used | {col}, total + costs[row, col], matches)
+                    matches.pop()
+            matches.append(None)
+            search(row + 1, used, total + self.max_distance, matches)
+            matches.pop()
+
+        search(0, frozenset(), 0.0, [])
+        return best[1]
+
+    def update(self, hands, handedness=None):
+        """
+        Match the hands of a new frame to the tracks.
+
+        Args:
+            hands: Landmarks of shape (num_hands, 21, 2+), normalized x and y first
+            handedness: Optional "Left"/"Right" label per hand (None entries allowed)
+
+        Returns:
+            list: Track ID of every row of hands
+        """
+        centers = np.asarray(hands)[:, PALM, :2].mean(axis=1) if len(hands) else np.zeros((0, 2))
+        tracks = list(self.tracks.values())
+        matches = self._assign(self._costs(tracks, centers, handedness)) if tracks else []
+
+        ids = [None] * len(centers)
+        for track, col in zip(tracks, matches):
+            if col is None:
+                track.missed += 1
+                continue
+            track.velocity = (centers[col] - track.center) / (track.missed + 1)
+            track.center = centers[col]
+            track.missed = 0
+            track.age += 1
+            if handedness is not None and handedness[col] is not None:
+                track.handedness = handedness[col]
+            ids[col] = track.id
+
+        for col, center in enumerate(centers):
+            if ids[col] is None:
+                label = handedness[col] if handedness is not None else None
+                self.tracks[self.next_id] = Track(self.next_id, center, label)
+                ids[col] = self.next_id
+                self.next_id += 1
+
+        self.removed = [track.id for track in tracks if track.missed > self.max_missed]
+        for track_id in self.removed:
+            del self.tracks[track_id]
+        return ids
+
+    def state(self, track_id):
+        """Per-hand application data of a track (empty dict for unknown IDs)."""
+        track = self.tracks.get(track_id)
+        return track.state if track is not None else {}
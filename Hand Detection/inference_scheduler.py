@@ -0,0 +1,134 @@
+"""
+Adaptive inference scheduling with constant-velocity landmark prediction.
+
+Running MediaPipe on every captured frame caps the frame rate at the speed
+of inference. InferenceScheduler runs the detector only every few frames
+and predicts the landmarks in between from the velocity measured between
+the last two inferences, so overlays that follow the hand (the Painter
+cursor, the volume line) still move at capture rate.
+
+With `adaptive` enabled the gap between inferences follows the motion of
+the hand: the next inference is scheduled before the predicted landmarks
+can have moved more than `motion_threshold` (a fraction of the frame size),
+between `interval` and `max_interval` frames. A still hand is inferred
+rarely; a fast one on every frame.
+"""
+import time
+
+import numpy as np
+
+from instrumentation import timer
+
+
+class InferenceScheduler:
+    """Run a landmark detector every N frames and extrapolate in between."""
+
+    def __init__(self, detect, interval=1, max_interval=3, motion_threshold=0.03,
+                 adaptive=True, clock=time.perf_counter, track_ids=None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            detect: Callable taking a frame and returning landmarks of shape
+                    (num, N, 4) with x, y, z normalized to [0, 1]
+            interval: Smallest number of frames between inferences
+            max_interval: Largest number of frames between inferences
+                          (the fixed gap when adaptive is False)
+            motion_threshold: Largest predicted landmark displacement, as a
+                              fraction of the frame, allowed between inferences
+            adaptive: Choose the gap from the measured motion
+            clock: Time source in seconds, used to extrapolate by elapsed time
+            track_ids: Optional callable returning the track ID of every row of
+                       the last detection (e.g. lambda: detector.hand_ids);
+                       velocity is only measured between the same tracks.
+                       Without it, rows are assumed to keep their identity.
+        """
+        self.detect = detect
+        self.interval = max(1, interval)
+        self.max_interval = max(self.interval, max_interval)
+        self.motion_threshold = motion_threshold
+        self.adaptive = adaptive
+        self.clock = clock
+        self.track_ids = track_ids
+
+        self.landmarks = None   # Result of the last inference
+        self.ids = None         # Track IDs of the rows of landmarks, if known
+        self.velocity = None    # Per-second change of x, y, z, or None
+        self.timestamp = 0.0
+        self.skip = 0           # Frames left before the next inference
+        self.frames = 0         # Frames since the last inference
+        self.inferences = 0
+        self.predictions = 0
+
+    @property
+    def inference_ratio(self):
+        """Fraction of frames that ran the detector."""
+        total = self.inferences + self.predictions
+        return self.inferences / total if total else 0.0
+
+    def reset(self):
+        """Forget the tracked landmarks so the next frame runs inference."""
+        self.landmarks = None
+        self.ids = None
+        self.velocity = None
+        self.skip = 0
+
+    def next_gap(self, speed):
+        """Number of frames until the next inference for a landmark speed per frame."""
+        if not self.adaptive or speed <= 0:
+            return self.max_interval
+        gap = int(self.motion_threshold / speed)
+        return min(max(gap, self.interval), self.max_interval)
+
+    def infer(self, frame, now):
+        """Run the detector, update the velocity and schedule the next inference."""
+        landmarks = np.array(self.detect(frame), dtype=np.float32)
+        ids = list(self.track_ids()) if self.track_ids is not None else None
+        previous, elapsed = self.landmarks, now - self.timestamp
+
+        speed = 0.0
+        if (previous is not None and previous.shape == landmarks.shape 
+                and ids == self.ids and elapsed > 0):
+            self.velocity = (landmarks[..., :3] - previous[..., :3]) / elapsed
+            if len(landmarks):
+                # Largest landmark displacement per frame at the current frame rate
+                speed = float(np.abs(self.velocity[..., :2]).max()) * elapsed / self.frames
+        else:
+            # Different hands than last time: no reliable velocity, hold still
+            self.velocity = None
+
+        if len(landmarks):
+            self.skip = self.next_gap(speed) - 1
+        else:
+            # Nothing tracked: look for a hand at the base interval
+            self.skip = self.interval - 1
+
+        self.landmarks = landmarks
+        self.ids = ids
+        self.timestamp = now
+        self.frames = 0
+        self.inferences += 1
+        return landmarks.copy()
+
+    def update(self, frame):
+        """
+        Return landmarks for a frame, inferred or predicted.
+
+        Args:
+            frame: Frame to pass to the detector when inference is due
+
+        Returns:
+            numpy.ndarray: Landmarks of shape (num, N, 4); a new array the caller owns
+        """
+        now = self.clock()
+        self.frames += 1
+        if self.landmarks is None or self.skip <= 0:
+            return self.infer(frame, now)
+
+        with timer.stage("scheduler.predict"):
+            landmarks = self.landmarks.copy()
+            if self.velocity is not None:
+                landmarks[..., :3] += self.velocity * (now - self.timestamp)
+        self.skip -= 1
+        self.predictions += 1
+        return landmarks
@@ -0,0 +1,394 @@
+"""
+System volume backends and the background worker that drives them.
+
+Changing the system volume costs a process spawn (amixer, osascript) or an
+IPC round trip, which is far too slow for the video loop to wait on every
+frame. VolumeWorker takes target volumes without blocking, keeps only the
+newest one (latest wins), skips targets within a deadband of the volume it
+last applied, and applies the rest on its own thread.
+
+Backends keep their connection to the mixer open where the platform allows:
+
+- PycawBackend:     the Windows endpoint volume COM interface
+- PulseBackend:     a pulsectl client on the PulseAudio / PipeWire socket
+- AmixerBackend:    one long-lived `amixer -s` process reading commands on stdin
+- OsascriptBackend: one osascript call per change (macOS has no session mode)
+- MockBackend:      an in-memory mixer for benchmarks and machines without audio
+
+Backends are registered by name in BACKENDS. Nothing is probed at import:
+available() only looks for a module or an executable on the PATH, and only
+for the backends a lookup actually considers. The VOLUME_BACKEND environment
+variable (or the backend argument of create_backend) picks one by name;
+"auto" tries the platform's backends in registration order:
+
+    VOLUME_BACKEND=mock VOLUME_MOCK_LATENCY=5 python volume_controller.py --source clip.mp4 --headless
+"""
+import collections
+import importlib.util
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Modules every demo uses (pipeline, frames, instrumentation, ...) live in Shared/
+SHARED_DIR = str(Path(__file__).resolve().parent.parent / "Shared")
+if SHARED_DIR not in sys.path:
+    sys.path.insert(0, SHARED_DIR)
+
+from instrumentation import timer
+
+# "[42%]" in the output of `amixer sget`
+AMIXER_VOLUME = re.compile(r"\[(\d+)%\]")
+
+
+# Backend name -> class, in order of preference
+BACKENDS = {}
+
+
+def register_backend(backend_class):
+    """Class decorator adding a backend to BACKENDS under its name."""
+    BACKENDS[backend_class.name] = backend_class
+    return backend_class
+
+
+class VolumeBackend:
+    """Interface of a system volume backend; constructors raise if it cannot connect."""
+
+    name = "none"
+    platforms = ()      # platform.system() names "auto" selects it on
+    requirement = ""    # Shown when available() is False
+
+    @classmethod
+    def available(cls):
+        """Cheap check (no process, no import) that the backend can work here."""
+        return True
+
+    def set(self, percent):
+        """Set the output volume, 0-100."""
+        raise NotImplementedError
+
+    def get(self):
+        """Current output volume, 0-100, or None if it cannot be read."""
+        return None
+
+    def close(self):
+        """Release the mixer connection."""
+
+
+@register_backend
+class PycawBackend(VolumeBackend):
+    """Windows master volume through pycaw."""
+
+    name = "pycaw"
+    platforms = ("Windows",)
+    requirement = "pycaw not installed. Install with: pip install pycaw comtypes"
+
+    @classmethod
+    def available(cls):
+        return importlib.util.find_spec("pycaw") is not None
+
+    def __init__(self):
+        from comtypes import CLSCTX_ALL
+        from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
+
+        devices = AudioUtilities.GetSpeakers()
+        interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
+        self.interface = interface.QueryInterface(IAudioEndpointVolume)
+        # Levels are in dB between these bounds
+        self.min_level, self.max_level = self.interface.GetVolumeRange()[:2]
+
+    def set(self, percent):
+        level = np.interp(percent, [0, 100], [self.min_level, self.max_level])
+        self.interface.SetMasterVolumeLevel(level, None)
+
+    def get(self):
+        level = self.interface.GetMasterVolumeLevel()
+        return float(np.interp(level, [self.min_level, self.max_level], [0, 100]))
+
+
+@register_backend
+class PulseBackend(VolumeBackend):
+    """Default sink volume over a persistent PulseAudio / PipeWire connection."""
+
+    name = "pulse"
+    platforms = ("Linux",)
+    requirement = "pulsectl not installed. Install with: pip install pulsectl"
+
+    @classmethod
+    def available(cls):
+        return importlib.util.find_spec("pulsectl") is not None
+
+    def __init__(self):
+        import pulsectl
+
+        self.pulse = pulsectl.Pulse("hand-volume-control")
+        self.sink_name = self.pulse.server_info().default_sink_name
+
+    def _sink(self):
+        return self.pulse.get_sink_by_name(self.sink_name)
+
+    def set(self, percent):
+        self.pulse.volume_set_all_chans(self._sink(), percent / 100.0)
+
+    def get(self):
+        return self.pulse.volume_get_all_chans(self._sink()) * 100.0
+
+    def close(self):
+        self.pulse.close()
+
+
+@register_backend
+class AmixerBackend(VolumeBackend):
+    """ALSA mixer through one `amixer -s` session instead of a process per change."""
+
+    name = "amixer"
+    platforms = ("Linux",)
+    requirement = "amixer not found. Install with: sudo apt install alsa-utils"
+
+    @classmethod
+    def available(cls):
+        return shutil.which("amixer") is not None
+
+    def __init__(self, device="pulse", control="Master"):
+        self.device = device
+        self.control = control
+        self.process = None
+        self._start()
+
+    def _start(self):
+        """Start the session; amixer applies each stdin line as a command."""
+        self.process = subprocess.Popen(["amixer", "-D", self.device, "-q", "-s"],
+                                        stdin=subprocess.PIPE,
+                                        stdout=subprocess.DEVNULL,
+                                        stderr=subprocess.DEVNULL,
+                                        text=True)
+
+    def set(self, percent):
+        if self.process.poll() is not None:
+            # The session died (e.g. the sound server restarted): start a new one
+            self._start()
+        self.process.stdin.write(f"sset {self.control} {int(percent)}%\n")
+        self.process.stdin.flush()
+
+    def get(self):
+        # Reads are rare, and a session's output has no end-of-reply marker
+        result = subprocess.run(["amixer", "-D", self.device, "sget", self.control],
+                                capture_output=True, text=True)
+        match = AMIXER_VOLUME.search(result.stdout)
+        return float(match.group(1)) if match else None
+
+    def close(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.stdin.close()
+            try:
+                self.process.wait(timeout=1.0)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+@register_backend
+class OsascriptBackend(VolumeBackend):
+    """macOS output volume through osascript."""
+
+    name = "osascript"
+    platforms = ("Darwin",)
+    requirement = "osascript not found"
+
+    @classmethod
+    def available(cls):
+        return shutil.which("osascript") is not None
+
+    def set(self, percent):
+        subprocess.run(["osascript", "-e", f"set volume output volume {int(percent)}"],
+                       capture_output=True)
+
+    def get(self):
+        result = subprocess.run(["osascript", "-e", "output volume of (get volume settings)"],
+                                capture_output=True, text=True)
+        return float(result.stdout.strip())
+
+
+@register_backend
+class MockBackend(VolumeBackend):
+    """In-memory mixer that records what it was asked to do."""
+
+    name = "mock"
+
+    def __init__(self, volume=50.0, latency=None):
+        """
+        Initialize the mixer.
+
+        Args:
+            volume: Initial volume
+            latency: Seconds each set() blocks, to mimic a real mixer; defaults
+                     to VOLUME_MOCK_LATENCY (milliseconds) or 0
+        """
+        if latency is None:
+            latency = float(os.environ.get("VOLUME_MOCK_LATENCY", 0)) / 1000.0
+        self.volume = float(volume)
+        self.latency = latency
+        self.sets = 0
+
+    def set(self, percent):
+        if self.latency:
+            time.sleep(self.latency)
+        self.volume = float(percent)
+        self.sets += 1
+
+    def get(self):
+        return self.volume
+
+
+def create_backend(name=None, system=None):
+    """
+    Open a volume backend.
+
+    Args:
+        name: Backend name from BACKENDS, or "auto" for the first one that works
+              on this platform; defaults to VOLUME_BACKEND or "auto"
+        system: platform.system() name, defaults to the running platform
+
+    Returns:
+        VolumeBackend, or None if no backend is available
+    """
+    name = name or os.environ.get("VOLUME_BACKEND", "auto")
+    system = system or platform.system()
+    if name == "auto":
+        candidates = [cls for cls in BACKENDS.values() if system in cls.platforms]
+        if not candidates:
+            print(f"[WARNING] Platform '{system}' not fully supported")
+            print("[INFO] Volume display will work, but volume control may not")
+            return None
+    elif name in BACKENDS:
+        candidates = [BACKENDS[name]]
+    else:
+        print(f"[ERROR] Unknown volume backend '{name}', choose from {sorted(BACKENDS)} or auto")
+        return None
+
+    for backend_class in candidates:
+        if not backend_class.available():
+            print(f"[WARNING] {backend_class.name} volume backend unavailable: {backend_class.requirement}")
+            continue
+        try:
+            backend = backend_class()
+        except Exception as e:
+            print(f"[WARNING] {backend_class.name} volume backend failed to start: {e}")
+            continue
+        print(f"[INFO] {system} volume control initialized ({backend.name})")
+        return backend
+    print(f"[ERROR] No volume backend available on {system}")
+    return None
+
+
+class VolumeWorker:
+    """Apply the newest requested volume on a background thread."""
+
+    def __init__(self, backend, deadband=1.0, window=1000):
+        """
+        Start the worker.
+
+        Args:
+            backend: VolumeBackend to drive
+            deadband: Requests closer than this (in percent) to the last applied
+                      volume are skipped; 0 and 100 are always reached exactly
+            window: Number of recent set() calls the latency figures cover
+        """
+        self.backend = backend
+        self.deadband = deadband
+        self.target = None      # Newest request not yet taken by the thread
+        self.current = None     # Last volume applied
+        self.requests = 0
+        self.coalesced = 0      # Requests replaced by a newer one before being applied
+        self.skipped = 0        # Requests within the deadband
+        self.applied = 0
+        self.set_calls = 0      # Calls into the backend, failed ones included
+        self.failures = 0
+        self.latencies = collections.deque(maxlen=window)   # Seconds per set() call
+        self._condition = threading.Condition()
+        self._backend_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="volume", daemon=True)
+        self._thread.start()
+
+    def request(self, percent):
+        """Ask for a volume without waiting for it to be applied."""
+        with self._condition:
+            if self.target is not None:
+                self.coalesced += 1
+            self.target = float(percent)
+            self.requests += 1
+            self._condition.notify()
+
+    def _needs_update(self, target):
+        if self.current is None:
+            return True
+        if target in (0.0, 100.0):
+            return target != self.current
+        return abs(target - self.current) >= self.deadband
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self.target is None and not self._closed:
+                    self._condition.wait()
+                if self.target is None:
+                    return
+                target, self.target = self.target, None
+
+            if not self._needs_update(target):
+                self.skipped += 1
+                continue
+            start = time.perf_counter()
+            try:
+                with self._backend_lock, timer.stage("volume.set"):
+                    self.backend.set(target)
+                self.current = target
+                self.applied += 1
+            except Exception as e:
+                self.failures += 1
+                print(f"[ERROR] Failed to set volume: {e}")
+            finally:
+                self.set_calls += 1
+                self.latencies.append(time.perf_counter() - start)
+
+    def get(self):
+        """Read the volume from the backend (serialized with the writes)."""
+        with self._backend_lock:
+            return self.backend.get()
+
+    def stats(self):
+        """Request and set-call counters plus set() latency percentiles."""
+        stats = {"backend": self.backend.name, "requests": self.requests,
+                 "coalesced": self.coalesced, "skipped": self.skipped,
+                 "set_calls": self.set_calls, "failures": self.failures}
+        if self.latencies:
+            ms = np.fromiter(self.latencies, dtype=np.float64) * 1000.0
+            p50, p95 = np.percentile(ms, [50, 95])
+            stats.update(set_p50_ms=round(float(p50), 3), set_p95_ms=round(float(p95), 3),
+                         set_max_ms=round(float(ms.max()), 3))
+        return stats
+
+    def report(self):
+        """Format the statistics as one line."""
+        s = self.stats()
+        line = (f"[STATS] volume ({s['backend']}): {s['requests']} requests, "
+                f"{s['coalesced']} coalesced, {s['skipped']} in deadband, "
+                f"{s['set_calls']} set calls ({s['failures']} failed)")
+        if "set_p50_ms" in s:
+            line += f", set p50 {s['set_p50_ms']:.2f} p95 {s['set_p95_ms']:.2f} ms"
+        return line
+
+    def close(self):
+        """Apply the last pending request, stop the thread and close the backend."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join(timeout=2.0)
+        self.backend.close()
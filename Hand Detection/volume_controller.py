@@ -1,14 +1,27 @@
 """
 Cross-platform Hand Gesture Volume Controller
-Supports both Windows (pycaw) and Linux (amixer)
+Supports Windows (pycaw), Linux (PulseAudio/PipeWire or amixer) and macOS (osascript)
 """
+import argparse
 import cv2
 import time
-import math
 import platform
-import subprocess
 import numpy as np
+import sys
+from pathlib import Path
+
+# Modules every demo uses (pipeline, frames, instrumentation, ...) live in Shared/
+SHARED_DIR = str(Path(__file__).resolve().parent.parent / "Shared")
+if SHARED_DIR not in sys.path:
+    sys.path.insert(0, SHARED_DIR)
+
+from filters import OneEuroFilter
+from frames import FramePool, is_live_source, open_source
 from hand_detector import HandDetector
+from inference_scheduler import InferenceScheduler
+from instrumentation import PROFILER, profiling, timer
+from pipeline import FramePipeline
+from volume_backends import BACKENDS, VolumeWorker, create_backend
 
 
 class VolumeController:
@@ -18,119 +31,29 @@ class VolumeController:
     THUMB_TIP = 4
     INDEX_FINGER_TIP = 8
     
-    # Distance range for volume control
-    MIN_VOL_DISTANCE = 19
-    MAX_VOL_DISTANCE = 122
-    
-    def __init__(self):
-        """Initialize the volume controller."""
-        self.platform = platform.system()
-        self.volume_interface = None
-        self.min_volume = 0
-        self.max_volume = 100
-        
-        # Initialize platform-specific volume control
-        self._initialize_volume_control()
+    def __init__(self, deadband=1.0, backend=None):
+        """
+        Initialize the volume controller.
         
-    def _initialize_volume_control(self):
-        """Initialize volume control based on platform."""
-        if self.platform == "Windows":
-            self._initialize_windows()
-        elif self.platform == "Linux":
-            self._initialize_linux()
-        elif self.platform == "Darwin":  # macOS
-            self._initialize_macos()
-        else:
-            print(f"[WARNING] Platform '{self.platform}' not fully supported")
-            print("[INFO] Volume display will work, but volume control may not")
-    
-    def _initialize_windows(self):
-        """Initialize Windows volume control using pycaw."""
-        try:
-            from comtypes import CLSCTX_ALL
-            from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
-            
-            devices = AudioUtilities.GetSpeakers()
-            interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
-            self.volume_interface = interface.QueryInterface(IAudioEndpointVolume)
-            
-            vol_range = self.volume_interface.GetVolumeRange()
-            self.min_volume = vol_range[0]
-            self.max_volume = vol_range[1]
-            
-            print(f"[INFO] Windows volume control initialized")
-            print(f"[INFO] Volume range: {vol_range}")
-        except ImportError:
-            print("[ERROR] pycaw not installed. Install with: pip install pycaw comtypes")
-            self.volume_interface = None
-        except Exception as e:
-            print(f"[ERROR] Failed to initialize Windows volume control: {e}")
-            self.volume_interface = None
-    
-    def _initialize_linux(self):
-        """Initialize Linux volume control using amixer."""
-        try:
-            # Test if amixer is available
-            result = subprocess.run(['which', 'amixer'], 
-                                   capture_output=True, 
-                                   text=True)
-            if result.returncode == 0:
-                print("[INFO] Linux volume control initialized (amixer)")
-                self.volume_interface = "amixer"
-            else:
-                print("[ERROR] amixer not found. Install with: sudo apt install alsa-utils")
-                self.volume_interface = None
-        except Exception as e:
-            print(f"[ERROR] Failed to initialize Linux volume control: {e}")
-            self.volume_interface = None
-    
-    def _initialize_macos(self):
-        """Initialize macOS volume control using osascript."""
-        try:
-            # Test if osascript is available
-            result = subprocess.run(['which', 'osascript'], 
-                                   capture_output=True, 
-                                   text=True)
-            if result.returncode == 0:
-                print("[INFO] macOS volume control initialized (osascript)")
-                self.volume_interface = "osascript"
-            else:
-                print("[ERROR] osascript not found")
-                self.volume_interface = None
-        except Exception as e:
-            print(f"[ERROR] Failed to initialize macOS volume control: {e}")
-            self.volume_interface = None
+        Args:
+            deadband: Smallest volume change (in percent) worth applying
+            backend: Volume backend name (see volume_backends.BACKENDS), e.g.
+                     "mock"; defaults to VOLUME_BACKEND or the platform's default
+        """
+        self.platform = platform.system()
+        self.backend = create_backend(backend, self.platform)
+        # Volume changes are applied off the video thread, newest request wins
+        self.worker = VolumeWorker(self.backend, deadband) if self.backend else None
     
     def set_volume(self, volume_percent):
         """
-        Set system volume.
+        Request a new system volume; returns without waiting for the mixer.
         
         Args:
             volume_percent: Volume level (0-100)
         """
-        if self.volume_interface is None:
-            return
-        
-        try:
-            if self.platform == "Windows":
-                # Map percentage to Windows volume range
-                vol_level = np.interp(volume_percent, [0, 100], 
-                                     [self.min_volume, self.max_volume])
-                self.volume_interface.SetMasterVolumeLevel(vol_level, None)
-                
-            elif self.platform == "Linux":
-                # Use amixer to set volume
-                subprocess.run(['amixer', '-D', 'pulse', 'sset', 'Master', 
-                              f'{int(volume_percent)}%'], 
-                             capture_output=True)
-                
-            elif self.platform == "Darwin":  # macOS
-                # Use osascript to set volume
-                subprocess.run(['osascript', '-e', 
-                              f'set volume output volume {int(volume_percent)}'],
-                             capture_output=True)
-        except Exception as e:
-            print(f"[ERROR] Failed to set volume: {e}")
+        if self.worker is not None:
+            self.worker.request(volume_percent)
     
     def get_volume(self):
         """
@@ -139,38 +62,132 @@ class VolumeController:
         Returns:
             float: Current volume percentage (0-100)
         """
-        try:
-            if self.platform == "Windows" and self.volume_interface:
-                vol_level = self.volume_interface.GetMasterVolumeLevel()
-                return np.interp(vol_level, [self.min_volume, self.max_volume], [0, 100])
-                
-            elif self.platform == "Linux":
-                result = subprocess.run(['amixer', '-D', 'pulse', 'sget', 'Master'],
-                                      capture_output=True, text=True)
-                # Parse output to get volume percentage
-                import re
-                match = re.search(r'\[(\d+)%\]', result.stdout)
-                if match:
-                    return float(match.group(1))
-                    
-            elif self.platform == "Darwin":
-                result = subprocess.run(['osascript', '-e', 'output volume of (get volume settings)'],
-                                      capture_output=True, text=True)
-                return float(result.stdout.strip())
-        except Exception as e:
-            print(f"[ERROR] Failed to get volume: {e}")
+        if self.worker is not None:
+            try:
+                volume = self.worker.get()
+                if volume is not None:
+                    return volume
+            except Exception as e:
+                print(f"[ERROR] Failed to get volume: {e}")
         
         return 50  # Default fallback
+    
+    def close(self):
+        """Apply the last requested volume, close the mixer and print its statistics."""
+        if self.worker is not None:
+            self.worker.close()
+            print(self.worker.report())
+            self.worker = None
+
+
+class PinchVolume:
+    """
+    Control-signal stage turning a thumb-index pinch into a stable volume.
+    
+    The pinch distance is divided by the wrist to middle-finger-MCP length, so
+    the same gesture gives the same volume near or far from the camera. The
+    mapped volume is smoothed with a one-euro filter, and a new volume is only
+    emitted once the smoothed value leaves a hysteresis band around the last
+    one, so landmark jitter no longer turns into a stream of mixer writes.
+    """
+    
+    WRIST = 0
+    THUMB_TIP = 4
+    INDEX_FINGER_TIP = 8
+    MIDDLE_FINGER_MCP = 9
+    
+    def __init__(self, min_ratio=0.15, max_ratio=1.1, hysteresis=3.0, 
+                 min_cutoff=1.0, beta=0.05):
+        """
+        Initialize the control stage.
+        
+        Args:
+            min_ratio: Pinch / hand-size ratio mapped to 0% (fingers touching)
+            max_ratio: Ratio mapped to 100% (fingers spread)
+            hysteresis: Smallest change (in percent) that is emitted
+            min_cutoff, beta: One-euro filter parameters (see filters.OneEuroFilter)
+        """
+        self.min_ratio = min_ratio
+        self.max_ratio = max_ratio
+        self.hysteresis = hysteresis
+        self.filter = OneEuroFilter(min_cutoff=min_cutoff, beta=beta)
+        self.volume = None  # Last emitted volume
+    
+    def ratio(self, hand):
+        """
+        Pinch distance relative to the hand size.
+        
+        Args:
+            hand: Landmarks of one hand, shape (21, 2+), in pixels (x and y
+                  need the same scale)
+        """
+        points = hand[[self.WRIST, self.MIDDLE_FINGER_MCP, 
+                       self.THUMB_TIP, self.INDEX_FINGER_TIP], :2]
+        palm = np.hypot(*(points[1] - points[0]))
+        pinch = np.hypot(*(points[3] - points[2]))
+        return float(pinch / palm) if palm > 0 else 0.0
+    
+    def update(self, hand, timestamp):
+        """
+        Feed the hand of a new frame.
+        
+        Args:
+            hand: Landmarks of one hand, shape (21, 2+), in pixels
+            timestamp: Frame time in seconds
+            
+        Returns:
+            tuple: (volume, changed); changed is True when volume is new and
+            should be sent to the mixer
+        """
+        target = np.interp(self.ratio(hand), [self.min_ratio, self.max_ratio], [0, 100])
+        smoothed = self.filter(target, timestamp)
+        # Snap to the ends so 0% and 100% stay reachable through the band
+        if smoothed < self.hysteresis / 2:
+            smoothed = 0.0
+        elif smoothed > 100 - self.hysteresis / 2:
+            smoothed = 100.0
+        
+        if self.volume is None or abs(smoothed - self.volume) >= self.hysteresis \
+                or (smoothed in (0.0, 100.0) and smoothed != self.volume):
+            self.volume = round(smoothed)
+            return self.volume, True
+        return self.volume, False
+    
+    def reset(self):
+        """Forget the filter state when the hand is lost; the last volume stays."""
+        self.filter.reset()
 
 
 class VolumeControlApp:
     """Hand gesture volume control application."""
     
-    def __init__(self):
-        """Initialize the application."""
-        self.controller = VolumeController()
+    def __init__(self, threaded=True, max_interval=3, source=0, fps=None, headless=False, 
+                 volume_backend=None):
+        """
+        Initialize the application.
+        
+        Args:
+            threaded: Run capture, inference and rendering on separate threads
+            max_interval: Largest number of frames between hand detections; the
+                          landmarks are predicted in between (1 detects every frame)
+            source: Camera index, video file, image directory or "synthetic"
+                    (see frames.open_source)
+            fps: Pace the source to this frame rate, or None for as fast as it delivers
+            headless: Skip the window and keyboard, e.g. to benchmark on recorded input
+            volume_backend: Volume backend name, e.g. "mock" (default: platform default)
+        """
+        self.threaded = threaded
+        self.source = source
+        self.fps = fps
+        self.headless = headless
+        self.max_interval = max_interval
+        self.controller = VolumeController(backend=volume_backend)
+        self.pinch = PinchVolume()
+        self.control_id = None  # Track ID of the hand controlling the volume
         self.detector = None
+        self.scheduler = None
         self.capture = None
+        self.frames = FramePool()
         self.prev_time = 0
         
     def draw_ui(self, frame, x1, y1, x2, y2, volume_percent, fps):
@@ -209,70 +226,105 @@ class VolumeControlApp:
         cv2.putText(frame, platform_text, (10, 70),
                    cv2.FONT_HERSHEY_PLAIN, 1.0, (200, 200, 200), 1)
     
+    def read_frame(self):
+        """Capture stage: read and mirror the next camera frame."""
+        # Read into a recycled buffer; the pipeline releases it after rendering
+        success, frame = self.frames.read(self.capture)
+        if not success:
+            print("[WARNING] Failed to capture frame")
+            return False, None
+        
+        # Flip frame for mirror effect
+        with timer.stage("flip"):
+            cv2.flip(frame, 1, dst=frame)
+            return True, frame
+    
+    def detect_hands(self, frame):
+        """Run the hand detector and return normalized landmarks."""
+        self.detector.find_hand(frame, draw=False)
+        return self.detector.landmark_array()
+    
+    def process_frame(self, frame):
+        """Inference stage: detect or predict the hands and return them with their track IDs."""
+        # The scheduler returns a new array, so it is safe to hand to the render thread.
+        # Predicted frames keep the rows of the last detection, so its IDs still apply.
+        hands = self.scheduler.update(frame)
+        h, w = frame.shape[:2]
+        hands[..., :2] *= (w, h)
+        return hands, list(self.detector.hand_ids)
+    
+    def render_frame(self, frame, result):
+        """
+        Render stage: update the volume from the landmarks and show the frame.
+        
+        The hand that has been in view the longest (row 0, the oldest track)
+        controls the volume, so a second hand entering the frame cannot take over.
+        
+        Returns:
+            bool: False when the user asked to quit
+        """
+        hands, ids = result
+        if len(hands) != 0:
+            if ids[0] != self.control_id:
+                # Another hand took over: don't carry the old hand's filter state over
+                self.pinch.reset()
+                self.control_id = ids[0]
+            
+            # Get finger positions in pixels
+            tips = hands[0, [self.controller.THUMB_TIP, 
+                             self.controller.INDEX_FINGER_TIP], :2].astype(int)
+            (x1, y1), (x2, y2) = tips.tolist()
+            
+            # Pinch relative to hand size -> smoothed volume, only sent when it changes
+            volume_percent, changed = self.pinch.update(hands[0], time.perf_counter())
+            if changed:
+                self.controller.set_volume(volume_percent)
+            
+            # Calculate FPS
+            current_time = time.time()
+            fps = 1 / (current_time - self.prev_time) if self.prev_time > 0 else 0
+            self.prev_time = current_time
+            
+            # Draw UI
+            self.draw_ui(frame, x1, y1, x2, y2, volume_percent, fps)
+        else:
+            self.pinch.reset()
+        
+        # Display frame
+        if self.headless:
+            return True
+        with timer.stage("display"):
+            cv2.imshow("Hand Gesture Volume Control", frame)
+            
+            # Handle keyboard input
+            return cv2.waitKey(1) & 0xFF != ord('q')
+    
     def run(self):
         """Main application loop."""
-        # Initialize camera
-        self.capture = cv2.VideoCapture(0)
+        # Initialize camera (or any other frame source)
+        self.capture = open_source(self.source, fps=self.fps)
         if not self.capture.isOpened():
-            print("[ERROR] Failed to open camera")
+            print(f"[ERROR] Failed to open source: {self.source}")
             return
         
         # Initialize hand detector
         self.detector = HandDetector(detect_confidence=0.7, track_confidence=0.5)
+        self.scheduler = InferenceScheduler(self.detect_hands, max_interval=self.max_interval,
+                                            track_ids=lambda: self.detector.hand_ids)
         
         print("[INFO] Starting Volume Controller...")
         print("[INFO] Press 'q' to quit")
         print("[INFO] Pinch thumb and index finger to control volume")
         
+        # Profilers only follow one thread, so run serially while profiling
+        pipeline = FramePipeline(self.read_frame, self.process_frame, self.render_frame, 
+                                 threaded=self.threaded and not PROFILER, 
+                                 release=self.frames.release, 
+                                 lossless=self.fps is None and not is_live_source(self.source))
         try:
-            while True:
-                success, frame = self.capture.read()
-                if not success:
-                    print("[WARNING] Failed to capture frame")
-                    break
-                
-                # Flip frame for mirror effect
-                frame = cv2.flip(frame, 1)
-                
-                # Detect hand
-                self.detector.find_hand(frame, draw=False)
-                landmarks = self.detector.find_position(frame)
-                
-                if len(landmarks) != 0:
-                    # Get finger positions
-                    h, w, c = frame.shape
-                    x1 = int(landmarks[self.controller.THUMB_TIP][1] * w)
-                    y1 = int(landmarks[self.controller.THUMB_TIP][2] * h)
-                    x2 = int(landmarks[self.controller.INDEX_FINGER_TIP][1] * w)
-                    y2 = int(landmarks[self.controller.INDEX_FINGER_TIP][2] * h)
-                    
-                    # Calculate distance between fingers
-                    distance = int(math.hypot(x2 - x1, y2 - y1))
-                    
-                    # Map distance to volume
-                    volume_percent = np.interp(distance, 
-                                              [self.controller.MIN_VOL_DISTANCE, 
-                                               self.controller.MAX_VOL_DISTANCE], 
-                                              [0, 100])
-                    
-                    # Set system volume
-                    self.controller.set_volume(volume_percent)
-                    
-                    # Calculate FPS
-                    current_time = time.time()
-                    fps = 1 / (current_time - self.prev_time) if self.prev_time > 0 else 0
-                    self.prev_time = current_time
-                    
-                    # Draw UI
-                    self.draw_ui(frame, x1, y1, x2, y2, volume_percent, fps)
-                
-                # Display frame
-                cv2.imshow("Hand Gesture Volume Control", frame)
-                
-                # Handle keyboard input
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
-                    
+            with profiling():
+                pipeline.run()
+            print(f"[INFO] {pipeline.report()}")
         except KeyboardInterrupt:
             print("\n[INFO] Application interrupted by user")
         except Exception as e:
@@ -284,13 +336,25 @@ class VolumeControlApp:
         """Clean up resources."""
         if self.capture is not None:
             self.capture.release()
-        cv2.destroyAllWindows()
+        self.controller.close()
+        if not self.headless:
+            cv2.destroyAllWindows()
         print("[INFO] Application closed")
 
 
 def main():
     """Entry point for the application."""
-    app = VolumeControlApp()
+    parser = argparse.ArgumentParser(description="Control the system volume with a pinch gesture.")
+    parser.add_argument("--source", default="0", 
+                        help="camera index, video file, image directory or synthetic[:WxH[:N]]")
+    parser.add_argument("--fps", type=float, default=None, help="pace the source to this frame rate")
+    parser.add_argument("--headless", action="store_true", help="run without a window")
+    parser.add_argument("--volume-backend", default=None, 
+                        help=f"one of {', '.join(BACKENDS)} or auto (default: VOLUME_BACKEND or auto)")
+    args = parser.parse_args()
+    
+    app = VolumeControlApp(source=args.source, fps=args.fps, headless=args.headless, 
+                           volume_backend=args.volume_backend)
     app.run()
 
 
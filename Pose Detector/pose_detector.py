@@ -1,11 +1,28 @@
 import cv2
 import mediapipe as mp
+import numpy as np
 import time
+import sys
+from pathlib import Path
+
+# Modules every demo uses (pipeline, frames, instrumentation, ...) live in Shared/
+SHARED_DIR = str(Path(__file__).resolve().parent.parent / "Shared")
+if SHARED_DIR not in sys.path:
+    sys.path.insert(0, SHARED_DIR)
+
+from frame_cache import FrameCache
+from frames import FramePool, RGBConverter
+from instrumentation import PROFILER, profiling, timer
+from pipeline import FramePipeline
 
 class PoseDetector():
+    # MediaPipe Pose tracks a single person with 33 landmarks
+    NUM_LANDMARKS = 33
+
     def __init__(self, mode=False, complexity=1, smooth_landmarks=True,  
                  enable_segmentation=False, smooth_segmentation=True, 
-                 detection_confidence=0.5, tracking_confidence=0.5) -> None:
+                 detection_confidence=0.5, tracking_confidence=0.5, cache=None, 
+                 inference_size=None) -> None:
         self.mode = mode
         self.complexity = complexity
         self.smooth_landmarks = smooth_landmarks
@@ -13,6 +30,9 @@ class PoseDetector():
         self.smooth_segmentations = smooth_segmentation
         self.detection_confidence = detection_confidence
         self.tracking_confidence = tracking_confidence
+        # Longest side of the image given to MediaPipe; landmarks stay in full-frame space
+        self.inference_size = inference_size
+        self._rgb = RGBConverter()  # Reused RGB buffer for process()
 
         self.mp_pose = mp.solutions.pose
         self.mp_draw = mp.solutions.drawing_utils
@@ -24,34 +44,79 @@ class PoseDetector():
                                   min_detection_confidence=self.detection_confidence, 
                                   min_tracking_confidence=self.tracking_confidence
                                   )
+        self.results = None
+        # Optional FrameCache that skips inference while the scene is unchanged
+        self.cache = cache
+
+        # Reused by landmark_array: x, y, z, visibility for every landmark
+        self._landmarks = np.zeros((1, self.NUM_LANDMARKS, 4), dtype=np.float32)
         
         
+    def process_rgb(self, img_rgb):
+        with timer.stage("pose.process"):
+            self.results = self.poses.process(img_rgb)
+        return self.results
+
+    def process(self, image):
+        with timer.stage("pose.bgr2rgb"):
+            img_rgb = self._rgb.convert(image, self.inference_size)
+        return self.process_rgb(img_rgb)
+
     def findPose(self, image, draw=True, position_mark=False):
-        img_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        results = self.poses.process(img_rgb)
+        if self.cache is not None:
+            results = self.results = self.cache.get(image, lambda: self.process(image))
+        else:
+            results = self.results = self.process(image)
         lst_mark_position = list()
         if results.pose_landmarks:
             if draw:
-                self.mp_draw.draw_landmarks(image, results.pose_landmarks, 
-                                            self.mp_pose.POSE_CONNECTIONS)
+                with timer.stage("pose.draw"):
+                    self.mp_draw.draw_landmarks(image, results.pose_landmarks, 
+                                                self.mp_pose.POSE_CONNECTIONS)
         
             if position_mark:
-                for id, mark in enumerate(results.pose_landmarks.landmark):
-                    h, w, c = image.shape
-                    cx, cy = int(mark.x * w), int(mark.y * h)
-                    lst_mark_position.append([id, cx, cy])
+                with timer.stage("pose.landmark_list"):
+                    for id, mark in enumerate(results.pose_landmarks.landmark):
+                        h, w, c = image.shape
+                        cx, cy = int(mark.x * w), int(mark.y * h)
+                        lst_mark_position.append([id, cx, cy])
         return lst_mark_position
 
+    def landmark_array(self, image=None, pixel=False):
+        """
+        Return the landmarks found by the last findPose call as one array.
+
+        Args:
+            image: Frame passed to findPose. Only needed when pixel is True.
+            pixel: If True, scale x and y from [0, 1] to pixel coordinates.
+
+        Returns:
+            numpy.ndarray: float32 array of shape (num_poses, 33, 4) holding x, y, z and
+            visibility, with num_poses 0 or 1. It is a view of a buffer the next call
+            overwrites, so copy it to keep it across frames.
+        """
+        if self.results is None or not self.results.pose_landmarks:
+            return self._landmarks[:0]
+
+        with timer.stage("pose.landmarks"):
+            self._landmarks[0] = [(mark.x, mark.y, mark.z, mark.visibility)
+                                  for mark in self.results.pose_landmarks.landmark]
+        landmarks = self._landmarks[:1]
+
+        if pixel:
+            h, w = image.shape[:2]
+            landmarks[..., :2] *= (w, h)
+        return landmarks
+
 def main():
     capture = cv2.VideoCapture(0)
+    frames = FramePool()
     prev_time = 0 
-    pose_detector = PoseDetector()
-    while True:
-        success, frame = capture.read()
-        if not success:
-            break
-            
-        lst = pose_detector.findPose(frame)
+    pose_detector = PoseDetector(cache=FrameCache.from_env())
+
+    def render_frame(frame, lst):
+        nonlocal prev_time
+
         if len(lst) != 0:
             print(lst[3])
         
@@ -62,10 +127,19 @@ def main():
         cv2.putText(frame, text=str(int(frame_rate)), org=(10, 30), 
                     fontFace=cv2.FONT_HERSHEY_PLAIN, fontScale=1.3, 
                     color=(255, 255, 0), thickness=1)
-        cv2.imshow("Video", frame)
-        if cv2.waitKey(1) & 0xFF == ord("q"):
-            break
+        with timer.stage("display"):
+            cv2.imshow("Video", frame)
+            return cv2.waitKey(1) & 0xFF != ord("q")
+
+    # Run the pose model on the inference thread while the next frame is captured
+    # (serially when profiling, since the profilers only follow one thread)
+    pipeline = FramePipeline(lambda: frames.read(capture), pose_detector.findPose, render_frame, 
+                             threaded=not PROFILER, release=frames.release)
+    with profiling():
+        pipeline.run()
 
+    if pose_detector.cache is not None:
+        print(pose_detector.cache.report())
     capture.release()
     cv2.destroyAllWindows()
 
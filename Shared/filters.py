@@ -0,0 +1,276 @@
+"""
+Temporal filters for noisy per-frame measurements.
+
+Landmarks and the values derived from them (pinch distance, cursor
+position) jitter by a few pixels from frame to frame even when the hand is
+still. The filters here smooth such signals over time and work elementwise,
+so the same object filters a scalar or a whole landmark array in one NumPy
+pass.
+
+- OneEuroFilter (Casiez et al., CHI 2012): a low-pass filter whose cutoff
+  rises with the speed of the signal, so slow movements are smoothed heavily
+  (no jitter) and fast ones barely (no lag). The default for landmarks.
+- EMAFilter: plain exponential moving average, the cheapest option.
+- KalmanFilter: constant-velocity Kalman filter per value; it follows
+  steady motion without lag and can extrapolate.
+
+LandmarkFilterBank runs one of them over the landmark arrays the detectors
+return, shape (num, landmarks, 4), keeping separate state for every track
+(a hand or face followed over time) while filtering all tracks in a single
+vectorized call per frame.
+"""
+import math
+
+import numpy as np
+
+
+def smoothing_factor(cutoff, dt):
+    """Exponential smoothing weight of a low-pass filter with this cutoff (Hz) over dt seconds."""
+    r = 2 * math.pi * cutoff * dt
+    return r / (r + 1)
+
+
+class OneEuroFilter:
+    """Speed-adaptive low-pass filter over a scalar or an array of values."""
+
+    def __init__(self, min_cutoff=1.0, beta=0.0, d_cutoff=1.0):
+        """
+        Initialize the filter.
+
+        Args:
+            min_cutoff: Cutoff frequency (Hz) while the signal is still; lower
+                        means less jitter but more lag on slow moves
+            beta: How fast the cutoff grows with speed (per signal unit/s);
+                  higher means less lag on fast moves
+            d_cutoff: Cutoff frequency (Hz) of the speed estimate
+        """
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self, rows=None):
+        """
+        Forget the signal, e.g. when the tracked object is lost.
+
+        Args:
+            rows: Indexes along the first axis to restart on the next call,
+                  or None to forget everything
+        """
+        if rows is None:
+            self.value = None
+            self.speed = None
+            self.timestamp = None
+            self.fresh = []
+        else:
+            self.fresh.extend(rows)
+
+    def _restart(self, value):
+        """Start the rows marked by reset(rows) from the new measurement."""
+        if self.fresh:
+            self.value[self.fresh] = value[self.fresh]
+            self.speed[self.fresh] = 0
+            self.fresh = []
+
+    def __call__(self, value, timestamp):
+        """
+        Filter a new measurement.
+
+        Args:
+            value: Scalar or array (same shape on every call until reset)
+            timestamp: Measurement time in seconds
+
+        Returns:
+            Filtered value, a float for scalar input and a new array otherwise
+        """
+        value = np.asarray(value, dtype=np.float64)
+        if self.value is None or value.shape != self.value.shape:
+            self.value = value.copy()
+            self.speed = np.zeros_like(self.value)
+            self.fresh = []     # Every row starts from this measurement already
+        else:
+            dt = timestamp - self.timestamp
+            if dt > 0:
+                speed = (value - self.value) / dt
+                self.speed += smoothing_factor(self.d_cutoff, dt) * (speed - self.speed)
+                cutoff = self.min_cutoff + self.beta * np.abs(self.speed)
+                r = 2 * math.pi * cutoff * dt
+                self.value += r / (r + 1) * (value - self.value)
+            self._restart(value)
+        self.timestamp = timestamp
+        return float(self.value) if self.value.ndim == 0 else self.value.copy()
+
+
+class EMAFilter(OneEuroFilter):
+    """Exponential moving average over a scalar or an array of values."""
+
+    def __init__(self, alpha=0.5):
+        """
+        Initialize the filter.
+
+        Args:
+            alpha: Weight of the newest measurement (1 disables smoothing)
+        """
+        self.alpha = alpha
+        self.reset()
+
+    def __call__(self, value, timestamp):
+        value = np.asarray(value, dtype=np.float64)
+        if self.value is None or value.shape != self.value.shape:
+            self.value = value.copy()
+            self.speed = np.zeros_like(self.value)
+            self.fresh = []     # Every row starts from this measurement already
+        else:
+            self.value += self.alpha * (value - self.value)
+            self._restart(value)
+        self.timestamp = timestamp
+        return float(self.value) if self.value.ndim == 0 else self.value.copy()
+
+
+class KalmanFilter(OneEuroFilter):
+    """
+    Constant-velocity Kalman filter run independently on every value.
+
+    The state of each value is its position and speed; the 2x2 covariance is
+    kept as three arrays (p00, p01, p11), so a whole landmark array is one set
+    of elementwise NumPy operations.
+    """
+
+    def __init__(self, process_noise=1.0, measurement_noise=1e-5):
+        """
+        Initialize the filter.
+
+        Args:
+            process_noise: Variance of the unmodeled acceleration per second
+                           (signal units^2 / s^3); higher follows turns faster
+            measurement_noise: Variance of one measurement (signal units^2);
+                               the default suits normalized landmarks
+        """
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.reset()
+
+    def _restart(self, value):
+        if self.fresh:
+            self.covariance[:, self.fresh] = 0
+            self.covariance[0, self.fresh] = self.measurement_noise
+        super()._restart(value)
+
+    def __call__(self, value, timestamp):
+        value = np.asarray(value, dtype=np.float64)
+        if self.value is None or value.shape != self.value.shape:
+            self.value = value.copy()
+            self.speed = np.zeros_like(self.value)
+            self.fresh = []     # Every row starts from this measurement already
+            # p00, p01, p11 stacked on a leading axis
+            self.covariance = np.zeros((3,) + self.value.shape)
+            self.covariance[0] = self.measurement_noise
+        else:
+            dt = timestamp - self.timestamp
+            if dt > 0:
+                p00, p01, p11 = self.covariance
+                q = self.process_noise
+                # Predict: move by the speed, grow the uncertainty
+                self.value += self.speed * dt
+                p00 += dt * (2 * p01 + dt * p11) + q * dt ** 3 / 3
+                p01 += dt * p11 + q * dt ** 2 / 2
+                p11 += q * dt
+                # Correct with the measurement
+                gain_value = p00 / (p00 + self.measurement_noise)
+                gain_speed = p01 / (p00 + self.measurement_noise)
+                residual = value - self.value
+                self.value += gain_value * residual
+                self.speed += gain_speed * residual
+                p11 -= gain_speed * p01
+                p01 *= 1 - gain_value
+                p00 *= 1 - gain_value
+            self._restart(value)
+        self.timestamp = timestamp
+        return float(self.value) if self.value.ndim == 0 else self.value.copy()
+
+
+# Filter name -> class, for LandmarkFilterBank and the detectors' smoothing argument
+FILTERS = {
+    "one_euro": OneEuroFilter,
+    "ema": EMAFilter,
+    "kalman": KalmanFilter,
+}
+
+# Defaults tuned for landmarks normalized to [0, 1] at camera frame rates
+LANDMARK_DEFAULTS = {
+    "one_euro": {"min_cutoff": 1.0, "beta": 50.0},
+    "ema": {"alpha": 0.5},
+    "kalman": {"process_noise": 0.1, "measurement_noise": 1e-5},
+}
+
+
+class LandmarkFilterBank:
+    """Per-track temporal smoothing of detector landmark arrays."""
+
+    def __init__(self, kind="one_euro", max_tracks=2, columns=3, **params):
+        """
+        Initialize the bank.
+
+        Args:
+            kind: "one_euro", "ema" or "kalman"
+            max_tracks: Most tracks filtered at once (e.g. the detector's max_hands)
+            columns: Leading columns to filter; 3 smooths x, y and z and passes
+                     visibility through unchanged
+            **params: Filter parameters overriding LANDMARK_DEFAULTS[kind]
+        """
+        if kind not in FILTERS:
+            raise ValueError(f"Unknown filter '{kind}', choose from {sorted(FILTERS)}")
+        self.kind = kind
+        self.max_tracks = max_tracks
+        self.columns = columns
+        self.filter = FILTERS[kind](**{**LANDMARK_DEFAULTS[kind], **params})
+        self.track_ids = [None] * max_tracks   # Track id held by each slot
+        self.inputs = None                      # Last measurement of every slot
+
+    def reset(self):
+        """Forget every track."""
+        self.filter.reset()
+        self.track_ids = [None] * self.max_tracks
+        self.inputs = None
+
+    def __call__(self, landmarks, timestamp, ids=None):
+        """
+        Smooth the landmarks of one frame.
+
+        Args:
+            landmarks: Array of shape (num, points, C) with C >= columns, e.g.
+                       the output of landmark_array()
+            timestamp: Frame time in seconds
+            ids: Track id of every row (hashable); rows with the same id on
+                 consecutive frames are filtered together. Defaults to the row
+                 index, which is only stable while the detector keeps its order.
+
+        Returns:
+            numpy.ndarray: New array of the same shape and dtype; tracks seen for
+            the first time (or again after being lost) start unsmoothed
+        """
+        ids = list(range(len(landmarks)) if ids is None else ids)[:self.max_tracks]
+        shape = (self.max_tracks,) + landmarks.shape[1:2] + (self.columns,)
+        if self.inputs is None or self.inputs.shape != shape:
+            self.reset()
+            self.inputs = np.zeros(shape)
+
+        # Free the slots of tracks that are gone, then place every row in a slot
+        self.track_ids = [track if track in ids else None for track in self.track_ids]
+        slots, fresh = [], []
+        for track in ids:
+            if track not in self.track_ids:
+                slot = self.track_ids.index(None)
+                self.track_ids[slot] = track
+                fresh.append(slot)
+            slots.append(self.track_ids.index(track))
+
+        self.inputs[slots] = landmarks[:len(slots), :, :self.columns]
+        if fresh:
+            self.filter.reset(fresh)
+        # Every slot is filtered in one call; idle slots just hold their last value
+        smoothed = self.filter(self.inputs, timestamp)
+
+        output = landmarks.copy()
+        output[:len(slots), :, :self.columns] = smoothed[slots]
+        return output
@@ -0,0 +1,110 @@
+"""
+Reuse detector results while the scene does not change.
+
+A camera pointed at an empty hallway, or a video with duplicated frames,
+makes the detectors run full inference on frames that are practically
+identical. FrameCache sits in front of MediaPipe's process(): every frame is
+shrunk to a small grayscale thumbnail (area-averaged, so sensor noise mostly
+cancels out) and compared with the thumbnail of the frame the cached results
+were computed on. If no thumbnail cell changed by more than `threshold` gray
+levels, the cached results are returned instead of running inference.
+
+MediaPipe results use coordinates normalized to [0, 1], so reused results
+are rescaled to the current frame by the code that reads them. Results are
+never reused for more than `max_age` frames in a row, which bounds how stale
+they can get when a change stays just below the threshold.
+
+Environment variables (read by FrameCache.from_env, used by the demo mains):
+    DETECTOR_CACHE            Set to enable the cache
+    DETECTOR_CACHE_THRESHOLD  Gray levels a thumbnail cell may change (default 8)
+    DETECTOR_CACHE_MAX_AGE    Frames a result may be reused for (default 30)
+"""
+import os
+
+import cv2
+import numpy as np
+
+
+class FrameCache:
+    """Cache of the last detector results, keyed on a frame thumbnail."""
+
+    def __init__(self, threshold=8.0, max_age=30, thumbnail_size=(64, 48)):
+        """
+        Initialize the cache.
+
+        Args:
+            threshold: Largest change of a thumbnail cell, in gray levels, that
+                       still counts as the same scene
+            max_age: Number of consecutive frames the results may be reused for
+            thumbnail_size: (width, height) of the comparison thumbnail
+        """
+        self.threshold = threshold
+        self.max_age = max_age
+        self.thumbnail_size = thumbnail_size
+
+        self.reference = None   # Thumbnail of the frame the results came from
+        self.shape = None
+        self.results = None
+        self.age = 0
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        """Create a cache configured from DETECTOR_CACHE*, or None if it is not set."""
+        if not os.environ.get("DETECTOR_CACHE"):
+            return None
+        return cls(threshold=float(os.environ.get("DETECTOR_CACHE_THRESHOLD", 8.0)),
+                   max_age=int(os.environ.get("DETECTOR_CACHE_MAX_AGE", 30)))
+
+    @property
+    def hit_rate(self):
+        """Fraction of lookups answered from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def thumbnail(self, image):
+        """Downsample a BGR frame to a small float32 grayscale thumbnail."""
+        small = cv2.resize(image, self.thumbnail_size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.float32)
+
+    def difference(self, thumbnail):
+        """Largest per-cell change between a thumbnail and the reference."""
+        return float(np.max(np.abs(thumbnail - self.reference)))
+
+    def get(self, image, compute):
+        """
+        Return the results for a frame, running `compute` only if the scene changed.
+
+        Args:
+            image: BGR frame
+            compute: Callable returning fresh results for the frame
+
+        Returns:
+            The cached or freshly computed results
+        """
+        thumbnail = self.thumbnail(image)
+        if (self.reference is not None and image.shape == self.shape
+                and self.age < self.max_age
+                and self.difference(thumbnail) <= self.threshold):
+            self.age += 1
+            self.hits += 1
+            return self.results
+
+        self.misses += 1
+        self.results = compute()
+        self.reference = thumbnail
+        self.shape = image.shape
+        self.age = 0
+        return self.results
+
+    def clear(self):
+        """Forget the cached results so the next frame runs inference."""
+        self.reference = None
+        self.results = None
+        self.age = 0
+
+    def report(self):
+        """One-line summary of the hit/miss counters."""
+        return (f"[INFO] Result cache: {self.hits} hits, {self.misses} misses "
+                f"({self.hit_rate:.0%} of frames reused)")
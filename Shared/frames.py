@@ -0,0 +1,361 @@
+"""
+Frame helpers shared by the detectors and the apps.
+
+RGBConverter turns a captured BGR frame into the RGB image MediaPipe is run
+on. With a maximum inference size it downscales first, so the color
+conversion only touches the pixels the model will actually see: preparing
+a 1080p frame at 480 px on its long side takes about a quarter of the time
+of converting it at full resolution. MediaPipe reports landmarks normalized
+to [0, 1], so results computed on the small image map straight back onto
+the full-resolution frame the apps draw on.
+
+FramePool and RGBConverter keep the per-frame hot path free of allocations:
+captured frames are read into recycled buffers (and mirrored in place), and the
+RGB copy each detector hands to MediaPipe is written into a buffer that
+lives as long as the detector.
+
+open_source opens the frames an app runs on: a webcam, a video file, an
+image sequence or a synthetic generator, all behind the cv2.VideoCapture
+interface (read, get, isOpened, release) and optionally paced to a fixed
+frame rate, so the apps can be run and profiled headless on identical input.
+"""
+import glob
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+def inference_shape(width, height, max_side):
+    """
+    Size a frame is scaled to for inference.
+
+    Args:
+        width: Frame width in pixels
+        height: Frame height in pixels
+        max_side: Longest side allowed, or None to keep the frame size
+
+    Returns:
+        tuple: (width, height), never larger than the frame
+    """
+    if not max_side or max(width, height) <= max_side:
+        return width, height
+    scale = max_side / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+class FramePool:
+    """
+    Recycled frame buffers for a capture loop.
+
+    Frames are taken with acquire (or read) and handed back with release once
+    every stage is done with them, e.g. by passing release to FramePipeline.
+    A buffer is only reused after it was released, so a frame that is still
+    being rendered is never overwritten, and once as many buffers exist as
+    frames are in flight no new ones are allocated.
+    """
+
+    def __init__(self, capacity=8):
+        """
+        Initialize an empty pool.
+
+        Args:
+            capacity: Most released buffers kept; extra ones are left to the GC
+        """
+        self.capacity = capacity
+        self.free = []
+        self.allocations = 0
+        self.reuses = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, shape=None, dtype=np.uint8):
+        """
+        Take a free buffer.
+
+        Args:
+            shape: Required shape, or None to accept any free buffer
+            dtype: Required dtype when shape is given
+
+        Returns:
+            numpy array, or None if shape is None and the pool is empty
+            (cv2 read functions then allocate the frame themselves)
+        """
+        with self._lock:
+            for i in range(len(self.free) - 1, -1, -1):
+                buffer = self.free[i]
+                if shape is None or (buffer.shape == tuple(shape) and buffer.dtype == dtype):
+                    self.reuses += 1
+                    return self.free.pop(i)
+        if shape is None:
+            return None
+        self.allocations += 1
+        return np.empty(shape, dtype=dtype)
+
+    def release(self, frame):
+        """Return a frame to the pool once nothing uses it anymore."""
+        if frame is None:
+            return
+        with self._lock:
+            if len(self.free) < self.capacity:
+                self.free.append(frame)
+
+    def read(self, capture):
+        """
+        Read the next frame of a cv2.VideoCapture into a pooled buffer.
+
+        Args:
+            capture: Opened cv2.VideoCapture (or anything with read(image))
+
+        Returns:
+            tuple: (success, frame) like VideoCapture.read
+        """
+        buffer = self.acquire()
+        success, frame = capture.read(buffer)
+        if not success:
+            self.release(buffer)
+            return False, None
+        if frame is not buffer:
+            # First frame, or the capture size changed: the reader allocated
+            self.allocations += 1
+        return True, frame
+
+
+class RGBConverter:
+    """
+    BGR to RGB conversion into buffers reused from one call to the next.
+
+    The buffers are only reallocated when the image size changes, so a
+    converter should see one stream of same-sized images (one per detector,
+    and a separate one for crops).
+    """
+
+    def __init__(self):
+        self.resized = None
+        self.rgb = None
+        self.allocations = 0    # Buffers allocated because the size changed
+
+    def convert(self, image, max_side=None):
+        """
+        Convert a BGR frame to RGB, downscaling it first if it exceeds max_side.
+
+        OpenCV has no single call that resizes and converts, so the frame is
+        resized in BGR and only the small result is converted, which leaves a
+        single full-resolution pass. Bilinear interpolation is used because area
+        interpolation costs more than the color conversion it saves, and
+        MediaPipe rescales its input with bilinear sampling anyway.
+
+        Args:
+            image: BGR frame (a crop view is fine)
+            max_side: Longest side of the image given to the model, or None
+
+        Returns:
+            numpy array: RGB image, overwritten by the next call. MediaPipe
+            copies its input, so it is safe to pass straight to process().
+        """
+        height, width = image.shape[:2]
+        size = inference_shape(width, height, max_side)
+        if size != (width, height):
+            if self.resized is None or self.resized.shape[1::-1] != size:
+                self.resized = np.empty((size[1], size[0], 3), dtype=np.uint8)
+                self.allocations += 1
+            image = cv2.resize(image, size, dst=self.resized, interpolation=cv2.INTER_LINEAR)
+        if self.rgb is None or self.rgb.shape != image.shape:
+            self.rgb = np.empty(image.shape, dtype=np.uint8)
+            self.allocations += 1
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=self.rgb)
+
+
+class ImageSequence:
+    """A sorted list of image files read like a cv2.VideoCapture."""
+
+    EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+    def __init__(self, paths, loop=False):
+        """
+        Initialize the sequence.
+
+        Args:
+            paths: Directory, glob pattern or list of image files
+            loop: Start over after the last image instead of ending
+        """
+        if isinstance(paths, str):
+            if os.path.isdir(paths):
+                paths = [os.path.join(paths, name) for name in os.listdir(paths)
+                         if name.lower().endswith(self.EXTENSIONS)]
+            else:
+                paths = glob.glob(paths)
+        self.paths = sorted(paths)
+        self.loop = loop
+        self.position = 0
+        # Size of the first image, reported through get() like a camera would
+        first = cv2.imread(self.paths[0]) if self.paths else None
+        self.shape = first.shape if first is not None else None
+
+    def isOpened(self):
+        return self.shape is not None
+
+    def read(self, image=None):
+        """Return (success, frame), decoding into image when its shape matches."""
+        if self.position >= len(self.paths):
+            if not self.loop or not self.paths:
+                return False, None
+            self.position = 0
+        frame = cv2.imread(self.paths[self.position])
+        self.position += 1
+        if frame is None:
+            return False, None
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.shape[1] if self.shape else 0
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.shape[0] if self.shape else 0
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return len(self.paths)
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return self.position
+        return 0
+
+    def release(self):
+        self.paths = []
+
+
+class SyntheticSource:
+    """Generated frames read like a cv2.VideoCapture; the same every run."""
+
+    def __init__(self, width=640, height=480, frames=300, draw=None):
+        """
+        Initialize the generator.
+
+        Args:
+            width: Frame width in pixels
+            height: Frame height in pixels
+            frames: Number of frames before the source ends, or None for no end
+            draw: Optional callable (frame, index) painting frame in place;
+                  defaults to a disc sweeping over a gradient
+        """
+        self.width = width
+        self.height = height
+        self.frames = frames
+        self.draw = draw or self.draw_default
+        self.position = 0
+        # Rendered once; each frame starts as a copy of it
+        ramp = np.linspace(40, 120, width, dtype=np.float32)
+        self.background = np.empty((height, width, 3), dtype=np.uint8)
+        self.background[:] = ramp.astype(np.uint8)[None, :, None]
+
+    def draw_default(self, frame, index):
+        """Move a disc along a Lissajous path so every frame differs."""
+        x = int((0.5 + 0.4 * np.sin(index * 0.05)) * self.width)
+        y = int((0.5 + 0.4 * np.sin(index * 0.07)) * self.height)
+        cv2.circle(frame, (x, y), max(4, self.height // 12), (60, 160, 230), cv2.FILLED)
+
+    def isOpened(self):
+        return True
+
+    def read(self, image=None):
+        """Return (success, frame), writing into image when its shape matches."""
+        if self.frames is not None and self.position >= self.frames:
+            return False, None
+        if image is None or image.shape != self.background.shape:
+            image = np.empty_like(self.background)
+        np.copyto(image, self.background)
+        self.draw(image, self.position)
+        self.position += 1
+        return True, image
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.height
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return self.frames or 0
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return self.position
+        return 0
+
+    def release(self):
+        self.position = self.frames or 0
+
+
+class PacedSource:
+    """Deliver the frames of another source at a fixed rate."""
+
+    def __init__(self, source, fps):
+        """
+        Initialize the pacer.
+
+        Args:
+            source: Anything with the cv2.VideoCapture interface
+            fps: Frames per second to deliver; reads sleep until their slot
+        """
+        self.source = source
+        self.period = 1.0 / fps
+        self.next_time = None
+
+    def isOpened(self):
+        return self.source.isOpened()
+
+    def read(self, image=None):
+        now = time.perf_counter()
+        if self.next_time is None:
+            self.next_time = now
+        elif self.next_time > now:
+            time.sleep(self.next_time - now)
+        # Schedule from the slot, not from now, so the average rate holds,
+        # but never bank time while the consumer was slower than the rate
+        self.next_time = max(self.next_time, now - self.period) + self.period
+        return self.source.read(image)
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return 1.0 / self.period
+        return self.source.get(prop)
+
+    def release(self):
+        self.source.release()
+
+
+def is_live_source(source):
+    """Whether a source spec is a camera or network stream rather than recorded input."""
+    if isinstance(source, int) or (isinstance(source, str) and source.isdigit()):
+        return True
+    return isinstance(source, str) and "://" in source
+
+
+def open_source(source=0, fps=None, loop=False):
+    """
+    Open the frames an app runs on.
+
+    Args:
+        source: Camera index (int or digit string), video file, image
+                directory or glob, or "synthetic" / "synthetic:WxH" /
+                "synthetic:WxH:N" for N generated frames
+        fps: Pace reads to this frame rate; None reads as fast as the source
+             delivers (a camera is paced by the device anyway)
+        loop: Restart image sequences after the last image
+
+    Returns:
+        Object with the cv2.VideoCapture interface; check isOpened()
+    """
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    if isinstance(source, str) and source.startswith("synthetic"):
+        parts = source.split(":")[1:]
+        width, height = map(int, parts[0].split("x")) if parts else (640, 480)
+        frames = int(parts[1]) if len(parts) > 1 else 300
+        capture = SyntheticSource(width, height, None if loop else frames)
+    elif isinstance(source, str) and (os.path.isdir(source) or glob.has_magic(source)):
+        capture = ImageSequence(source, loop=loop)
+    else:
+        capture = cv2.VideoCapture(source)
+    if fps:
+        capture = PacedSource(capture, fps)
+    return capture
@@ -0,0 +1,222 @@
+"""
+Opt-in per-stage timing and profiling hooks.
+
+The detectors, the pipeline and the apps wrap their hot-path stages
+(color conversion, MediaPipe process(), landmark extraction, drawing, text
+rendering, imshow) in `timer.stage(name)`. The shared `timer` is disabled
+unless the DETECTOR_STATS environment variable is set, in which case a
+disabled stage costs one attribute lookup and an empty context manager.
+
+Environment variables:
+    DETECTOR_STATS           "stdout" or a file path to append reports to
+    DETECTOR_STATS_INTERVAL  Seconds between reports (default 5)
+    DETECTOR_PROFILER        "cprofile" or "pyinstrument" to profile the run
+    DETECTOR_PROFILE_OUTPUT  File for the profile report (default stdout)
+
+Example:
+    DETECTOR_STATS=stdout python finger_count.py
+"""
+import atexit
+import collections
+import contextlib
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+
+class _Stage:
+    """Context manager timing one run of a stage."""
+
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.timer.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class StageTimer:
+    """Rolling per-stage latency statistics with periodic reporting."""
+
+    def __init__(self, enabled=False, window=300, interval=5.0, output=None):
+        """
+        Initialize the timer.
+
+        Args:
+            enabled: Record timings; when False every stage is a no-op
+            window: Number of recent samples kept per stage
+            interval: Seconds between periodic reports
+            output: "stdout", a file path, or None for no periodic reports
+        """
+        self.enabled = enabled
+        self.window = window
+        self.interval = interval
+        self.output = output
+        self.samples = {}
+        self.counts = collections.Counter()
+        self._lock = threading.Lock()
+        self._null = contextlib.nullcontext()
+        self._reporter = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_env(cls):
+        """Create a timer configured from the DETECTOR_STATS variables."""
+        output = os.environ.get("DETECTOR_STATS")
+        interval = float(os.environ.get("DETECTOR_STATS_INTERVAL", 5.0))
+        timer = cls(enabled=bool(output), interval=interval, output=output)
+        if output:
+            timer.start_reporting()
+        return timer
+
+    def stage(self, name):
+        """Return a context manager that times the enclosed block as `name`."""
+        if not self.enabled:
+            return self._null
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        """Add one duration in seconds to a stage."""
+        # Stages are recorded from the capture, inference and render threads at once
+        with self._lock:
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples.setdefault(name, collections.deque(maxlen=self.window))
+            samples.append(seconds)
+            self.counts[name] += 1
+
+    def reset(self):
+        """Forget every recorded sample."""
+        with self._lock:
+            self.samples.clear()
+            self.counts.clear()
+
+    def summary(self):
+        """
+        Latency statistics of the samples in the rolling window.
+
+        Returns:
+            dict: stage name -> count, mean and percentile latencies in ms
+        """
+        stats = {}
+        for name, samples in list(self.samples.items()):
+            if not samples:
+                continue
+            ms = np.fromiter(samples, dtype=np.float64) * 1000.0
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            stats[name] = {
+                "count": self.counts[name],
+                "mean_ms": round(float(ms.mean()), 3),
+                "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3),
+                "p99_ms": round(float(p99), 3),
+                "max_ms": round(float(ms.max()), 3),
+            }
+        return stats
+
+    def report(self):
+        """Format the summary as a table sorted by mean latency."""
+        stats = self.summary()
+        lines = [f"[STATS] {time.strftime('%H:%M:%S')} last {self.window} samples per stage"]
+        for name, s in sorted(stats.items(), key=lambda item: -item[1]["mean_ms"]):
+            lines.append(f"  {name:<22} mean {s['mean_ms']:8.2f}  p50 {s['p50_ms']:8.2f}  "
+                         f"p95 {s['p95_ms']:8.2f}  p99 {s['p99_ms']:8.2f} ms  (n={s['count']})")
+        return "\n".join(lines)
+
+    def dump(self):
+        """Write a report to the configured output."""
+        if not self.samples or self.output is None:
+            return
+        text = self.report()
+        if self.output == "stdout":
+            print(text, flush=True)
+        else:
+            with open(self.output, "a") as output:
+                output.write(text + "\n")
+
+    def start_reporting(self):
+        """Dump a report every `interval` seconds and once more at exit."""
+        if self._reporter is not None:
+            return
+
+        def report_loop():
+            while not self._stop.wait(self.interval):
+                self.dump()
+
+        self._reporter = threading.Thread(target=report_loop, name="stats-reporter", daemon=True)
+        self._reporter.start()
+        atexit.register(self.dump)
+
+
+# Shared by every module in the process
+timer = StageTimer.from_env()
+
+PROFILER = os.environ.get("DETECTOR_PROFILER", "").lower()
+
+
+@contextlib.contextmanager
+def profiling(kind=None, output=None):
+    """
+    Profile the enclosed block with cProfile or pyinstrument.
+
+    Both profilers only follow the thread they were started on, so callers
+    should run their pipeline serially while profiling.
+
+    Args:
+        kind: "cprofile", "pyinstrument", or None to read DETECTOR_PROFILER
+        output: Report file, or None to read DETECTOR_PROFILE_OUTPUT (stdout if unset)
+    """
+    kind = (kind or PROFILER or "").lower()
+    output = output or os.environ.get("DETECTOR_PROFILE_OUTPUT")
+    if not kind:
+        yield
+        return
+
+    if kind == "cprofile":
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            stream = open(output, "w") if output else sys.stdout
+            pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(40)
+            if output:
+                stream.close()
+                print(f"[INFO] cProfile report written to {output}")
+    elif kind == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("[ERROR] pyinstrument not installed. Install with: pip install pyinstrument")
+            yield
+            return
+
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            if output:
+                with open(output, "w") as stream:
+                    stream.write(profiler.output_text(unicode=True))
+                print(f"[INFO] pyinstrument report written to {output}")
+            else:
+                print(profiler.output_text(unicode=True))
+    else:
+        print(f"[WARNING] Unknown profiler '{kind}', use 'cprofile' or 'pyinstrument'")
+        yield
@@ -0,0 +1,255 @@
+"""
+Threaded capture / inference / render pipeline shared by the demo apps.
+
+A frame goes through three stages connected by bounded queues:
+
+- capture:   background thread that reads frames from the source
+- inference: background thread that runs the detector on the newest frame
+- render:    the caller's thread, which draws the result and shows the window
+             (OpenCV GUI calls have to stay on the thread that owns the window)
+
+Every queue drops its unconsumed item when a new one arrives ("latest frame
+wins"), so a slow stage never builds up a backlog of stale frames and the
+frame rate settles at the speed of the slowest stage instead of the sum of
+all three. With lossless=True the queues block the producer instead, so
+every frame of a recorded source is processed, in order, at the speed of the
+slowest stage (identical input every run for benchmarks).
+
+With a `release` callback (such as FramePool.release) every frame is handed
+back exactly once, after it was rendered or when a queue dropped it, so the
+capture stage can recycle frame buffers instead of allocating new ones.
+"""
+import queue
+import threading
+import time
+
+from instrumentation import timer
+
+# Marker pushed through the queues once the source is exhausted
+_END_OF_STREAM = object()
+
+
+class LatestQueue:
+    """Bounded single-producer queue that replaces the oldest item when full."""
+
+    def __init__(self, maxsize=1, on_drop=None):
+        """
+        Initialize the queue.
+
+        Args:
+            maxsize: Number of items kept before the oldest one is dropped
+            on_drop: Optional callable receiving every dropped item
+        """
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.on_drop = on_drop
+        self.dropped = 0
+
+    def put(self, item, block=False, timeout=None):
+        """
+        Add an item, dropping the oldest unconsumed one if the queue is full.
+
+        With block=True, wait for room instead of dropping and raise
+        queue.Full after timeout seconds.
+        """
+        if block:
+            self._queue.put(item, timeout=timeout)
+            return
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    dropped = self._queue.get_nowait()
+                    self.dropped += 1
+                    if self.on_drop is not None:
+                        self.on_drop(dropped)
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """Remove and return the oldest item, raising queue.Empty on timeout."""
+        return self._queue.get(timeout=timeout)
+
+    def empty(self):
+        """Whether no item is waiting."""
+        return self._queue.empty()
+
+
+class FramePipeline:
+    """Run a read -> process -> render loop with each stage on its own thread."""
+
+    def __init__(self, read, process, render, queue_size=1, threaded=True, release=None, 
+                 lossless=False):
+        """
+        Initialize the pipeline.
+
+        Args:
+            read: Callable returning (success, frame), like VideoCapture.read
+            process: Callable taking a frame and returning the inference result
+            render: Callable taking (frame, result); returns False to stop
+            queue_size: Capacity of the queues between stages
+            threaded: If False, run all three stages serially on the caller's thread
+            release: Optional callable receiving every frame once no stage needs it
+            lossless: Make a stage wait for the next one instead of dropping frames
+                      (for recorded input; live cameras should drop)
+        """
+        self.read = read
+        self.process = process
+        self.render = render
+        self.threaded = threaded
+        self.lossless = lossless
+        self.release = release or (lambda frame: None)
+
+        self.frames_queue = LatestQueue(queue_size, on_drop=self._release_dropped)
+        self.results_queue = LatestQueue(queue_size, on_drop=self._release_dropped)
+        self.stop_event = threading.Event()
+        self.error = None
+
+        self.captured = 0
+        self.processed = 0
+        self.rendered = 0
+        self.elapsed = 0.0
+
+    @property
+    def dropped(self):
+        """Number of frames discarded between stages."""
+        return self.frames_queue.dropped + self.results_queue.dropped
+
+    def _put(self, items, item, block):
+        """
+        Queue an item, waiting for room while block is set until stopped.
+
+        Returns:
+            bool: False if the pipeline stopped before the item was queued
+        """
+        if not block:
+            items.put(item)
+            return True
+        while not self.stop_event.is_set():
+            try:
+                items.put(item, block=True, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _release_dropped(self, item):
+        """Release the frame of a dropped frame or (frame, result) pair."""
+        if item is _END_OF_STREAM:
+            return
+        self.release(item[0] if isinstance(item, tuple) else item)
+
+    def stop(self):
+        """Ask all stages to finish after their current frame."""
+        self.stop_event.set()
+
+    def report(self):
+        """One-line summary of the last run: frames, wall time, FPS and drops."""
+        fps = self.rendered / self.elapsed if self.elapsed > 0 else 0.0
+        return (f"{self.rendered} frames in {self.elapsed:.2f}s ({fps:.1f} FPS), "
+                f"{self.captured} captured, {self.dropped} dropped")
+
+    def run(self):
+        """Run the pipeline until the source ends or render returns False."""
+        start = time.perf_counter()
+        try:
+            self._run()
+        finally:
+            self.elapsed = time.perf_counter() - start
+
+    def _run(self):
+        """Run the stages serially or on their threads."""
+        self.stop_event.clear()
+        if not self.threaded:
+            self._run_serial()
+            return
+
+        workers = [
+            threading.Thread(target=self._capture_loop, name="capture", daemon=True),
+            threading.Thread(target=self._inference_loop, name="inference", daemon=True),
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            self._render_loop()
+        finally:
+            self.stop()
+            for worker in workers:
+                worker.join(timeout=1.0)
+
+        if self.error is not None:
+            raise self.error
+
+    def _run_serial(self):
+        """Run the three stages one after another on the current thread."""
+        while not self.stop_event.is_set():
+            with timer.stage("pipeline.capture"):
+                success, frame = self.read()
+            if not success:
+                break
+            self.captured += 1
+            with timer.stage("pipeline.inference"):
+                result = self.process(frame)
+            self.processed += 1
+            self.rendered += 1
+            with timer.stage("pipeline.render"):
+                keep_running = self.render(frame, result)
+            self.release(frame)
+            if keep_running is False:
+                break
+
+    def _capture_loop(self):
+        """Capture stage: read frames until the source ends or we are stopped."""
+        try:
+            while not self.stop_event.is_set():
+                with timer.stage("pipeline.capture"):
+                    success, frame = self.read()
+                if not success:
+                    break
+                self.captured += 1
+                if not self._put(self.frames_queue, frame, self.lossless):
+                    self.release(frame)
+        except Exception as e:
+            self.error = e
+        finally:
+            # Wait for room so the end marker never replaces the last frame
+            self._put(self.frames_queue, _END_OF_STREAM, block=True)
+
+    def _inference_loop(self):
+        """Inference stage: process the newest captured frame."""
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    frame = self.frames_queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if frame is _END_OF_STREAM:
+                    break
+                with timer.stage("pipeline.inference"):
+                    result = self.process(frame)
+                self.processed += 1
+                if not self._put(self.results_queue, (frame, result), self.lossless):
+                    self.release(frame)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._put(self.results_queue, _END_OF_STREAM, block=True)
+
+    def _render_loop(self):
+        """Render stage: draw and display the newest processed frame."""
+        while not self.stop_event.is_set():
+            try:
+                item = self.results_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _END_OF_STREAM:
+                break
+            frame, result = item
+            self.rendered += 1
+            with timer.stage("pipeline.render"):
+                keep_running = self.render(frame, result)
+            self.release(frame)
+            if keep_running is False:
+                break
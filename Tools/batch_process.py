@@ -0,0 +1,142 @@
+"""
+Headless batch landmark extraction.
+
+Runs one detector over video files and image directories with drawing
+disabled, streams the landmarks of every frame to a JSON Lines file and
+reports the processing speed. No window is opened and there is no waitKey
+throttling, so archives are processed as fast as the CPU allows.
+
+Usage:
+    python batch_process.py hand clip.mp4 frames_dir/ --output landmarks/
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import cv2
+from detectors import DETECTORS, create_detector
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp"}
+
+
+def iter_frames(path):
+    """
+    Yield the frames of a video file or of the images in a directory.
+
+    Args:
+        path: Video file or directory of images (read in name order)
+    """
+    path = Path(path)
+    if path.is_dir():
+        for image_path in sorted(path.iterdir()):
+            if image_path.suffix.lower() not in IMAGE_EXTENSIONS:
+                continue
+            frame = cv2.imread(str(image_path))
+            if frame is None:
+                print(f"[WARNING] Failed to read image: {image_path}")
+                continue
+            yield frame
+        return
+
+    capture = cv2.VideoCapture(str(path))
+    if not capture.isOpened():
+        print(f"[ERROR] Failed to open video: {path}")
+        return
+    try:
+        while True:
+            success, frame = capture.read()
+            if not success:
+                break
+            yield frame
+    finally:
+        capture.release()
+
+
+def process_source(detect, source, output_path, max_frames=None):
+    """
+    Run a detector over one source and stream its landmarks to disk.
+
+    Args:
+        detect: Function mapping a BGR frame to a list of landmarks
+        source: Video file or image directory
+        output_path: JSON Lines file receiving one record per frame
+        max_frames: Stop after this many frames (None for all)
+
+    Returns:
+        tuple: (frames processed, seconds spent)
+    """
+    frames = 0
+    start_time = time.perf_counter()
+    with open(output_path, "w") as output:
+        for frame_no, frame in enumerate(iter_frames(source)):
+            if max_frames is not None and frame_no >= max_frames:
+                break
+            record = {"frame": frame_no, "landmarks": detect(frame)}
+            output.write(json.dumps(record) + "\n")
+            frames += 1
+    return frames, time.perf_counter() - start_time
+
+
+def output_paths(output_dir, sources, detector):
+    """
+    Name the output file of every source after the source.
+
+    Sources sharing a name (a/clip.mp4 and b/clip.mp4) get their position in
+    the list appended, so no output overwrites another.
+
+    Args:
+        output_dir: Directory receiving the JSON Lines files
+        sources: Video files or image directories, in command line order
+        detector: Detector name, part of every file name
+
+    Returns:
+        list: One output Path per source
+    """
+    stems = [Path(source).stem for source in sources]
+    used = set(stems)
+    names = []
+    for index, stem in enumerate(stems):
+        if stems.count(stem) > 1:
+            suffix = index
+            while f"{stem}-{suffix}" in used:
+                suffix += len(stems)
+            stem = f"{stem}-{suffix}"
+            used.add(stem)
+        names.append(output_dir / f"{stem}.{detector}.jsonl")
+    return names
+
+
+def main():
+    """Entry point for the batch processor."""
+    parser = argparse.ArgumentParser(description="Extract landmarks from videos without a display.")
+    parser.add_argument("detector", choices=sorted(DETECTORS), help="detector to run")
+    parser.add_argument("sources", nargs="+", help="video files or image directories")
+    parser.add_argument("-o", "--output", default="landmarks", help="output directory")
+    parser.add_argument("--static", action="store_true",
+                        help="treat frames as unrelated images (recommended for image directories)")
+    parser.add_argument("--max-frames", type=int, default=None, help="frames to process per source")
+    parser.add_argument("--inference-size", type=int, default=None,
+                        help="longest side of the image given to the model, e.g. 480")
+    args = parser.parse_args()
+
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    total_frames, total_time = 0, 0.0
+    for source, output_path in zip(args.sources, output_paths(output_dir, args.sources, args.detector)):
+        # Fresh detector per source so tracking state does not leak between videos
+        detect = create_detector(args.detector, static_mode=args.static, 
+                                 inference_size=args.inference_size)
+        frames, elapsed = process_source(detect, source, output_path, args.max_frames)
+        fps = frames / elapsed if elapsed > 0 else 0
+        print(f"[INFO] {source}: {frames} frames in {elapsed:.2f}s ({fps:.1f} FPS) -> {output_path}")
+        total_frames += frames
+        total_time += elapsed
+
+    if total_time > 0:
+        print(f"[INFO] Total: {total_frames} frames at {total_frames / total_time:.1f} FPS")
+
+
+if __name__ == "__main__":
+    main()
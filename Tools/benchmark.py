@@ -0,0 +1,307 @@
+"""
+Benchmark suite for the detectors and the Painter compositing path.
+
+Replays the same frames through every case and reports per-stage latency
+percentiles (p50/p95/p99), throughput and peak resident memory. Frames come
+from a local video file, or from a seeded synthetic generator when no video
+is given, and are decoded up front so decoding does not count against any
+stage. Every case runs in its own process, so its peak memory is its own
+rather than the highest of the cases before it. Results can be written as
+JSON to track regressions across releases.
+
+Usage:
+    python benchmark.py --video fixture.mp4 --frames 300 --json results.json
+    python benchmark.py --cases hand pose --width 1280 --height 720
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import sys
+import time
+
+import cv2
+import mediapipe as mp
+import numpy as np
+from detectors import ROOT_DIR, FaceDetector, FaceMesh, HandDetector, PoseDetector
+from inference_scheduler import InferenceScheduler
+from instrumentation import timer
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.append(str(ROOT_DIR / "Hand Detection" / "Painter"))
+
+
+def synthetic_frames(count, width, height, seed=0):
+    """
+    Generate reproducible frames: a noisy background with moving shapes.
+
+    Args:
+        count: Number of frames
+        width: Frame width
+        height: Frame height
+        seed: Random seed, so every run sees identical input
+    """
+    rng = np.random.default_rng(seed)
+    background = rng.integers(40, 200, size=(height, width, 3), dtype=np.uint8)
+    background = cv2.GaussianBlur(background, (0, 0), 9)
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        x = int(width * (0.2 + 0.6 * (i % 60) / 60))
+        cv2.circle(frame, (x, height // 2), height // 6, (60, 140, 220), cv2.FILLED)
+        cv2.rectangle(frame, (width - x, height // 4), (width - x + 60, height // 4 + 90),
+                      (30, 200, 90), cv2.FILLED)
+        frames.append(frame)
+    return frames
+
+
+def load_video(path, count, width=None, height=None):
+    """Decode up to count frames of a video, resized if a size is given."""
+    capture = cv2.VideoCapture(str(path))
+    frames = []
+    while len(frames) < count:
+        success, frame = capture.read()
+        if not success:
+            break
+        if width and height:
+            frame = cv2.resize(frame, (width, height))
+        frames.append(frame)
+    capture.release()
+    if not frames:
+        raise SystemExit(f"[ERROR] No frames could be read from {path}")
+    return frames
+
+
+def load_frames(options):
+    """
+    Decode or generate the benchmark frames.
+
+    Args:
+        options: dict with video, frames, warmup, width, height and seed
+
+    Returns:
+        tuple: (list of frames, fixture description)
+    """
+    total = options["frames"] + options["warmup"]
+    if options["video"]:
+        frames = load_video(options["video"], total, options["width"], options["height"])
+        fixture = {"video": options["video"]}
+    else:
+        frames = synthetic_frames(total, options["width"] or 640, options["height"] or 480,
+                                  options["seed"])
+        fixture = {"synthetic": True, "seed": options["seed"]}
+    fixture.update({"frames": len(frames), "width": frames[0].shape[1], "height": frames[0].shape[0]})
+    return frames, fixture
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    divisor = 1024 * 1024 if platform.system() == "Darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+def summarize(samples):
+    """Latency statistics in milliseconds for a list of durations in seconds."""
+    ms = np.asarray(samples) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "count": int(ms.size),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def run_case(stages, frames, warmup):
+    """
+    Time every stage of a case on every frame.
+
+    Args:
+        stages: List of (name, function) called in order with a copy of each frame
+        frames: Frames to replay
+        warmup: Leading frames run but left out of the statistics
+
+    Returns:
+        dict: Per-stage latency statistics, the finer breakdown recorded by the
+        instrumentation hooks inside the detectors, throughput and peak RSS
+    """
+    samples = {name: [] for name, _ in stages}
+    timed_frames = 0
+    total_time = 0.0
+
+    for i, source in enumerate(frames):
+        frame = source.copy()
+        frame_time = 0.0
+        for name, stage in stages:
+            start = time.perf_counter()
+            stage(frame)
+            elapsed = time.perf_counter() - start
+            if i >= warmup:
+                samples[name].append(elapsed)
+            frame_time += elapsed
+        if i >= warmup:
+            timed_frames += 1
+            total_time += frame_time
+        if i + 1 == warmup:
+            timer.reset()
+
+    return {
+        "stages": {name: summarize(values) for name, values in samples.items() if values},
+        "breakdown": timer.summary(),
+        "frames": timed_frames,
+        "fps": round(timed_frames / total_time, 2) if total_time > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _case_process(name, options):
+    """Run one case in a fresh worker process and return its results."""
+    frames, _ = load_frames(options)
+    # Record the hooks inside the detectors; the window holds every timed frame
+    timer.enabled = True
+    timer.window = max(timer.window, options["frames"])
+    timer.reset()
+    return run_case(CASES[name](), frames, options["warmup"])
+
+
+def face_case():
+    """FaceDetector inference with drawing disabled."""
+    detector = FaceDetector()
+    return [("process", lambda frame: detector.face_detection(frame, draw=False))]
+
+
+def mesh_case():
+    """FaceMesh inference and landmark array extraction."""
+    detector = FaceMesh()
+    return [("process", lambda frame: detector.draw_mesh(frame, draw=False)),
+            ("landmarks", lambda frame: detector.landmark_array(frame, pixel=True))]
+
+
+def pose_case():
+    """PoseDetector inference and landmark array extraction."""
+    detector = PoseDetector()
+    return [("process", lambda frame: detector.findPose(frame, draw=False)),
+            ("landmarks", lambda frame: detector.landmark_array(frame, pixel=True))]
+
+
+def hand_case():
+    """HandDetector inference and landmark array extraction."""
+    detector = HandDetector()
+    return [("process", lambda frame: detector.find_hand(frame, draw=False)),
+            ("landmarks", lambda frame: detector.landmark_array(frame, pixel=True))]
+
+
+def hand_roi_case():
+    """HandDetector with ROI tracking: inference on a crop around the previous hands."""
+    detector = HandDetector(roi_tracking=True)
+    return [("process", lambda frame: detector.find_hand(frame, draw=False)),
+            ("landmarks", lambda frame: detector.landmark_array(frame, pixel=True))]
+
+
+def hand_scheduled_case():
+    """HandDetector behind the adaptive InferenceScheduler (predicted frames included)."""
+    detector = HandDetector()
+
+    def detect(frame):
+        detector.find_hand(frame, draw=False)
+        return detector.landmark_array()
+
+    scheduler = InferenceScheduler(detect, track_ids=lambda: detector.hand_ids)
+    return [("update", scheduler.update)]
+
+
+def painter_case():
+    """Painter canvas compositing and UI text rendering."""
+    from painter import PainterApp
+
+    app = PainterApp()
+    app.load_fonts()
+    composited = {}
+
+    def composite(frame):
+        if app.canvas is None or app.canvas.canvas.shape != frame.shape:
+            h, w = frame.shape[:2]
+            app.setup_canvas(w, h)
+            # A fixed scribble so the mask and blend have ink to work on
+            for i in range(0, w - 40, 40):
+                app.handle_drawing(20 + i, h // 2 + (60 if (i // 40) % 2 else -60))
+            app.end_strokes()
+        composited["frame"] = app.merge_canvas(frame)
+
+    def ui(frame):
+        app.draw_ui(composited["frame"], 30.0, "DRAWING")
+
+    return [("composite", composite), ("ui", ui)]
+
+
+CASES = {
+    "face": face_case,
+    "mesh": mesh_case,
+    "pose": pose_case,
+    "hand": hand_case,
+    "hand_roi": hand_roi_case,
+    "hand_scheduled": hand_scheduled_case,
+    "painter": painter_case,
+}
+
+
+def main():
+    """Entry point for the benchmark suite."""
+    parser = argparse.ArgumentParser(description="Benchmark the detectors on fixed input.")
+    parser.add_argument("--video", help="fixture video (default: synthetic frames)")
+    parser.add_argument("--frames", type=int, default=200, help="frames per case")
+    parser.add_argument("--warmup", type=int, default=10, help="untimed leading frames")
+    parser.add_argument("--width", type=int, help="frame width (synthetic default 640)")
+    parser.add_argument("--height", type=int, help="frame height (synthetic default 480)")
+    parser.add_argument("--seed", type=int, default=0, help="synthetic frame seed")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES),
+                        help="cases to run")
+    parser.add_argument("--json", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    options = {key: getattr(args, key) for key in ("video", "frames", "warmup", "width", "height", "seed")}
+    _, fixture = load_frames(options)
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "opencv": cv2.__version__,
+            "mediapipe": mp.__version__,
+            "numpy": np.__version__,
+        },
+        "fixture": fixture,
+        "warmup": args.warmup,
+        "cases": {},
+    }
+
+    # A fresh process per case: ru_maxrss never goes down within a process
+    context = multiprocessing.get_context("spawn")
+    for name in args.cases:
+        print(f"[INFO] Running {name}...")
+        with context.Pool(1) as pool:
+            report["cases"][name] = result = pool.apply(_case_process, (name, options))
+        for stage, stats in result["stages"].items():
+            print(f"  {stage:<10} p50 {stats['p50_ms']:8.2f} ms   p95 {stats['p95_ms']:8.2f} ms   "
+                  f"p99 {stats['p99_ms']:8.2f} ms")
+        print(f"  {'total':<10} {result['fps']} FPS, peak RSS {result['peak_rss_mb']} MB")
+
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(report, output, indent=2)
+        print(f"[INFO] Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
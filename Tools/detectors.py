@@ -0,0 +1,89 @@
+"""
+Detector registry for the command-line tools.
+
+The detectors live in their own demo directories, which are not Python
+packages, so this module puts those directories and Shared/ (pipeline,
+frames, instrumentation, ...) on sys.path before importing them. Every
+entry returns a function that maps a BGR frame to JSON-serializable
+landmarks with drawing disabled.
+"""
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+for directory in ("Shared", "Face Detection", "Hand Detection", "Pose Detector"):
+    path = str(ROOT_DIR / directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from face_detector import FaceDetector
+from face_mesh import FaceMesh
+from hand_detector import HandDetector
+from pose_detector import PoseDetector
+
+
+def create_face(static_mode=False, inference_size=None):
+    """Face boxes as [id, [x, y, w, h], score] in pixels."""
+    detector = FaceDetector(inference_size=inference_size)
+
+    def detect(frame):
+        return [[id, list(bbox), float(score[0])]
+                for id, bbox, score in detector.face_detection(frame, draw=False)]
+    return detect
+
+
+def create_mesh(static_mode=False, inference_size=None):
+    """Face mesh landmarks as [face_id, id, x, y] in pixels."""
+    detector = FaceMesh(static_image_mode=static_mode, inference_size=inference_size)
+
+    def detect(frame):
+        return detector.draw_mesh(frame, draw=False)
+    return detect
+
+
+def create_pose(static_mode=False, inference_size=None):
+    """Pose landmarks as [id, x, y] in pixels."""
+    detector = PoseDetector(mode=static_mode, inference_size=inference_size)
+
+    def detect(frame):
+        return detector.findPose(frame, draw=False, position_mark=True)
+    return detect
+
+
+def create_hand(static_mode=False, inference_size=None):
+    """Hand landmarks as [hand_no, id, x, y] with x, y normalized to [0, 1]."""
+    detector = HandDetector(static_mode=static_mode, inference_size=inference_size)
+
+    def detect(frame):
+        detector.find_hand(frame, draw=False)
+        hands = detector.results.multi_hand_landmarks or []
+        return [[hand_no] + mark
+                for hand_no in range(len(hands))
+                for mark in detector.find_position(frame, hand_no)]
+    return detect
+
+
+DETECTORS = {
+    "face": create_face,
+    "mesh": create_mesh,
+    "pose": create_pose,
+    "hand": create_hand,
+}
+
+
+def create_detector(name, static_mode=False, inference_size=None):
+    """
+    Create a detector by name.
+
+    Args:
+        name: One of the keys of DETECTORS
+        static_mode: Treat every frame as an unrelated image (no tracking)
+        inference_size: Longest side of the image given to the model, or None
+                        for the frame size (coordinates stay in frame space)
+
+    Returns:
+        callable: Function mapping a BGR frame to a list of landmarks
+    """
+    if name not in DETECTORS:
+        raise ValueError(f"Unknown detector '{name}', choose from {sorted(DETECTORS)}")
+    return DETECTORS[name](static_mode=static_mode, inference_size=inference_size)
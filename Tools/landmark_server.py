@@ -0,0 +1,383 @@
+"""
+Publish detector landmarks to many subscribers over TCP or WebSocket.
+
+The server runs an asyncio loop on a background thread. The inference loop
+calls publish() from its own thread; the landmarks are encoded there into
+one compact binary packet and handed to the loop without waiting for any
+network I/O. Every subscriber has a single pending-packet slot: if it has
+not finished receiving the previous packet when a new one arrives, the old
+one is replaced (coalesced). TCP connections keep their buffers to a few
+packets (the asyncio write buffer and the kernel send buffer), so a slow
+client gets fresh landmarks rather than a backlog; clients should keep
+their receive buffer small too, as read_packets does. A subscriber whose
+socket stays blocked for longer than `max_stall` seconds is disconnected.
+A slow consumer therefore only ever misses frames; it never delays
+inference or the other subscribers.
+
+Packet layout (little endian), a 24-byte header followed by the landmarks:
+
+    magic      4s   b"LMK1"
+    detector   u8   index into DETECTOR_IDS
+    dtype      u8   0 = float16, 1 = float32
+    count      u16  number of hands / faces / poses
+    points     u16  landmarks per item
+    reserved   u16
+    frame      u32  frame index
+    timestamp  f64  capture time in seconds
+    data            count * points * 4 values: x, y, z, visibility
+
+Raw TCP subscribers receive every packet prefixed with its u32 length;
+WebSocket subscribers receive one binary message per packet. WebSocket
+support needs `pip install websockets`.
+
+Usage:
+    python landmark_server.py serve hand --source 0 --tcp 8765 --ws 8766
+    python landmark_server.py listen --port 8765
+"""
+import argparse
+import asyncio
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+DETECTOR_IDS = ["face", "mesh", "pose", "hand"]
+
+HEADER = struct.Struct("<4sBBHHHId")
+MAGIC = b"LMK1"
+DTYPES = [np.dtype("<f2"), np.dtype("<f4")]
+LENGTH = struct.Struct("<I")
+# Kernel socket buffers of TCP connections where TCP_NOTSENT_LOWAT is missing
+# (server side) and of read_packets (client side); the kernel doubles them
+SEND_BUFFER = 4096
+RECEIVE_BUFFER = 2048
+
+
+def encode_packet(detector, frame_index, timestamp, landmarks, dtype=np.float16):
+    """
+    Encode the landmarks of one frame.
+
+    Args:
+        detector: Detector name from DETECTOR_IDS
+        frame_index: Frame counter of the source
+        timestamp: Capture time in seconds
+        landmarks: Array of shape (count, points, 4)
+        dtype: np.float16 (compact, about 1e-3 precision) or np.float32
+
+    Returns:
+        bytes: The packet
+    """
+    dtype_id = DTYPES.index(np.dtype(dtype).newbyteorder("<"))
+    landmarks = np.asarray(landmarks, dtype=DTYPES[dtype_id])
+    count, points = landmarks.shape[:2] if landmarks.ndim == 3 else (0, 0)
+    header = HEADER.pack(MAGIC, DETECTOR_IDS.index(detector), dtype_id, count, points, 0,
+                         frame_index & 0xFFFFFFFF, timestamp)
+    return header + landmarks.tobytes()
+
+
+def decode_packet(packet):
+    """
+    Decode a packet made by encode_packet.
+
+    Returns:
+        dict: detector, frame, timestamp and landmarks (float32 array)
+    """
+    magic, detector, dtype_id, count, points, _, frame, timestamp = HEADER.unpack_from(packet)
+    if magic != MAGIC:
+        raise ValueError("Not a landmark packet")
+    data = np.frombuffer(packet, dtype=DTYPES[dtype_id], count=count * points * 4,
+                         offset=HEADER.size)
+    return {
+        "detector": DETECTOR_IDS[detector],
+        "frame": frame,
+        "timestamp": timestamp,
+        "landmarks": data.reshape(count, points, 4).astype(np.float32),
+    }
+
+
+class _Subscriber:
+    """Connected client with a single coalescing packet slot."""
+
+    def __init__(self, name, send, close):
+        self.name = name
+        self.send = send      # async callable taking a packet
+        self.close = close    # callable closing the connection
+        self.pending = None
+        self.ready = asyncio.Event()
+        self.task = None
+        self.sent = 0
+        self.coalesced = 0
+
+    def offer(self, packet):
+        """Replace the pending packet; never blocks."""
+        if self.pending is not None:
+            self.coalesced += 1
+        self.pending = packet
+        self.ready.set()
+
+
+class LandmarkServer:
+    """Asyncio server broadcasting landmark packets to TCP and WebSocket clients."""
+
+    def __init__(self, host="0.0.0.0", tcp_port=8765, ws_port=None, max_stall=2.0,
+                 dtype=np.float16):
+        """
+        Initialize the server.
+
+        Args:
+            host: Interface to listen on
+            tcp_port: Port for length-prefixed raw TCP, or None
+            ws_port: Port for WebSocket, or None (needs the websockets package)
+            max_stall: Seconds a subscriber may block a send before it is dropped
+            dtype: np.float16 or np.float32 for the landmark values
+        """
+        self.host = host
+        self.tcp_port = tcp_port
+        self.ws_port = ws_port
+        self.max_stall = max_stall
+        self.dtype = dtype
+
+        self.subscribers = set()
+        self.published = 0
+        self.disconnected = 0
+        self.loop = None
+        self._thread = None
+        self._started = threading.Event()
+        self._servers = []
+
+    # Called from any thread
+
+    def start(self):
+        """Start the event loop and the listeners on a background thread."""
+        self._thread = threading.Thread(target=self._run_loop, name="landmark-server", daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    def stop(self):
+        """Close every connection and stop the loop."""
+        if self.loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout=5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+        self.loop = None
+
+    def publish(self, detector, frame_index, landmarks, timestamp=None):
+        """
+        Send the landmarks of a frame to every subscriber without blocking.
+
+        Args:
+            detector: Detector name from DETECTOR_IDS
+            frame_index: Frame counter of the source
+            landmarks: Array of shape (count, points, 4)
+            timestamp: Capture time in seconds, defaults to now
+        """
+        if self.loop is None:
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        packet = encode_packet(detector, frame_index, timestamp, landmarks, self.dtype)
+        self.published += 1
+        self.loop.call_soon_threadsafe(self._broadcast, packet)
+
+    # Event loop side
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._listen())
+        finally:
+            self._started.set()
+        self.loop.run_forever()
+        self.loop.close()
+
+    async def _listen(self):
+        if self.tcp_port is not None:
+            try:
+                server = await asyncio.start_server(self._handle_tcp, self.host, self.tcp_port)
+            except OSError as e:
+                print(f"[ERROR] Failed to listen on TCP port {self.tcp_port}: {e}")
+            else:
+                self._servers.append(server)
+                print(f"[INFO] Landmark server on tcp://{self.host}:{self.tcp_port}")
+        if self.ws_port is not None:
+            try:
+                import websockets
+            except ImportError:
+                print("[ERROR] websockets not installed. Install with: pip install websockets")
+                return
+            try:
+                server = await websockets.serve(self._handle_ws, self.host, self.ws_port)
+            except OSError as e:
+                print(f"[ERROR] Failed to listen on WebSocket port {self.ws_port}: {e}")
+            else:
+                self._servers.append(server)
+                print(f"[INFO] Landmark server on ws://{self.host}:{self.ws_port}")
+
+    async def _shutdown(self):
+        for server in self._servers:
+            server.close()
+        self._servers = []
+        # Wake every sender with no packet so it returns and closes its connection
+        tasks = []
+        for subscriber in self.subscribers:
+            subscriber.pending = None
+            subscriber.ready.set()
+            tasks.append(subscriber.task)
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _broadcast(self, packet):
+        for subscriber in self.subscribers:
+            subscriber.offer(packet)
+
+    async def _serve(self, subscriber):
+        """Send the newest packet to one subscriber until it disconnects or stalls."""
+        subscriber.task = asyncio.current_task()
+        self.subscribers.add(subscriber)
+        print(f"[INFO] Subscriber connected: {subscriber.name}")
+        try:
+            while True:
+                await subscriber.ready.wait()
+                subscriber.ready.clear()
+                packet, subscriber.pending = subscriber.pending, None
+                if packet is None:
+                    break  # Server shutting down
+                await asyncio.wait_for(subscriber.send(packet), timeout=self.max_stall)
+                subscriber.sent += 1
+        except asyncio.TimeoutError:
+            print(f"[WARNING] Dropping stalled subscriber: {subscriber.name}")
+        except (ConnectionError, OSError):
+            pass
+        except Exception as e:
+            # websockets raises its own ConnectionClosed types
+            if type(e).__name__ not in ("ConnectionClosed", "ConnectionClosedOK",
+                                        "ConnectionClosedError"):
+                raise
+        finally:
+            self.subscribers.discard(subscriber)
+            self.disconnected += 1
+            subscriber.close()
+            print(f"[INFO] Subscriber disconnected: {subscriber.name} "
+                  f"({subscriber.sent} sent, {subscriber.coalesced} coalesced)")
+
+    async def _handle_tcp(self, reader, writer):
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # Keep the kernel from queueing stale packets either: a send is
+            # refused while anything sent earlier is still waiting to go out
+            if hasattr(socket, "TCP_NOTSENT_LOWAT"):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NOTSENT_LOWAT, 1)
+            else:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER)
+        # drain() would only wait once 64 KiB (hundreds of packets) are buffered;
+        # make it wait until the last packet reached the socket so the slot coalesces
+        writer.transport.set_write_buffer_limits(high=0)
+
+        async def send(packet):
+            writer.write(LENGTH.pack(len(packet)) + packet)
+            await writer.drain()
+
+        peer = writer.get_extra_info("peername")
+        await self._serve(_Subscriber(f"tcp {peer}", send, writer.close))
+
+    async def _handle_ws(self, websocket, path=None):
+        def close():
+            asyncio.ensure_future(websocket.close())
+
+        await self._serve(_Subscriber(f"ws {websocket.remote_address}", websocket.send, close))
+
+
+def read_packets(host, port):
+    """Yield decoded packets from a raw TCP landmark server (blocking client)."""
+    family, kind, protocol, _, address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0]
+    with socket.socket(family, kind, protocol) as connection:
+        # A large receive buffer would queue stale packets on this side instead;
+        # it has to be set before connecting to limit the advertised window
+        connection.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)
+        connection.connect(address)
+        stream = connection.makefile("rb")
+        while True:
+            size = stream.read(LENGTH.size)
+            if len(size) < LENGTH.size:
+                return
+            packet = stream.read(LENGTH.unpack(size)[0])
+            yield decode_packet(packet)
+
+
+def serve(args):
+    """Run a detector on a source and publish every frame."""
+    # Imported here so clients of this module do not need MediaPipe;
+    # multi_detector puts the detector directories (and Shared/) on sys.path
+    import cv2
+    from multi_detector import MODELS
+    from frames import FramePool
+
+    detector = MODELS[args.detector](inference_size=args.inference_size)
+    source = int(args.source) if args.source.isdigit() else args.source
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        print(f"[ERROR] Failed to open source: {args.source}")
+        return
+
+    server = LandmarkServer(args.host, args.tcp, args.ws,
+                            dtype=np.float32 if args.float32 else np.float16)
+    server.start()
+    frames = FramePool()
+    frame_index = 0
+    try:
+        while True:
+            success, frame = frames.read(capture)
+            if not success:
+                break
+            timestamp = time.time()
+            detector.process(frame)
+            server.publish(args.detector, frame_index, detector.landmark_array(), timestamp)
+            frames.release(frame)
+            frame_index += 1
+    except KeyboardInterrupt:
+        print("\n[INFO] Interrupted by user")
+    finally:
+        capture.release()
+        server.stop()
+    print(f"[INFO] Published {server.published} frames")
+
+
+def listen(args):
+    """Print the packets received from a TCP landmark server."""
+    for packet in read_packets(args.host, args.port):
+        landmarks = packet["landmarks"]
+        latency = (time.time() - packet["timestamp"]) * 1000
+        print(f"{packet['detector']} frame {packet['frame']}: {len(landmarks)} found, "
+              f"latency {latency:.1f} ms")
+
+
+def main():
+    """Entry point with serve and listen subcommands."""
+    parser = argparse.ArgumentParser(description="Stream detector landmarks over the network.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="run a detector and publish its landmarks")
+    serve_parser.add_argument("detector", choices=DETECTOR_IDS, help="detector to run")
+    serve_parser.add_argument("--source", default="0", help="device index, video file or URL")
+    serve_parser.add_argument("--host", default="0.0.0.0", help="interface to listen on")
+    serve_parser.add_argument("--tcp", type=int, default=8765, help="raw TCP port")
+    serve_parser.add_argument("--ws", type=int, default=None, help="WebSocket port")
+    serve_parser.add_argument("--float32", action="store_true", help="send float32 instead of float16")
+    serve_parser.add_argument("--inference-size", type=int, default=None,
+                              help="longest side of the image given to the model, e.g. 480")
+    serve_parser.set_defaults(run=serve)
+
+    listen_parser = commands.add_parser("listen", help="print packets from a TCP server")
+    listen_parser.add_argument("--host", default="127.0.0.1", help="server address")
+    listen_parser.add_argument("--port", type=int, default=8765, help="server TCP port")
+    listen_parser.set_defaults(run=listen)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
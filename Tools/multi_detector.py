@@ -0,0 +1,162 @@
+"""
+Run several detectors on the same frame with one shared RGB conversion.
+
+Every detector follows the same small protocol (DetectorProtocol): process()
+takes a BGR frame, process_rgb() takes an already converted RGB image, and
+landmark_array() returns the last results as a float32 array of shape
+(num, landmarks, 4). MultiDetector converts each frame to RGB once, marks
+the buffer read-only, and hands that same buffer to every model. MediaPipe
+releases the GIL while its graph runs, so with threaded=True the models run
+concurrently and a frame costs about as much as the slowest model instead
+of the sum of all of them.
+
+Usage:
+    python multi_detector.py clip.mp4 --models hand face pose
+    python multi_detector.py clip.mp4 --models hand mesh --serial --inference-size 480
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Protocol
+
+from batch_process import iter_frames
+from detectors import FaceDetector, FaceMesh, HandDetector, PoseDetector
+from frames import RGBConverter
+
+MODELS = {
+    "face": FaceDetector,
+    "mesh": FaceMesh,
+    "pose": PoseDetector,
+    "hand": HandDetector,
+}
+
+
+class DetectorProtocol(Protocol):
+    """Interface shared by FaceDetector, FaceMesh, PoseDetector and HandDetector."""
+
+    results: object
+
+    def process(self, image):
+        """Run the model on a BGR frame and keep the results."""
+
+    def process_rgb(self, img_rgb):
+        """Run the model on an RGB image (read-only is fine) and keep the results."""
+
+    def landmark_array(self, image=None, pixel=False):
+        """Last results as a float32 array of shape (num, landmarks, 4)."""
+
+
+class MultiDetector:
+    """Composite detector that converts once and dispatches to every model."""
+
+    def __init__(self, detectors, threaded=True, inference_size=None):
+        """
+        Initialize the composite.
+
+        Args:
+            detectors: Mapping of name -> detector following DetectorProtocol
+            threaded: Run the models concurrently on a thread pool
+            inference_size: Longest side of the shared RGB image, or None for the
+                            frame size (coordinates stay in frame space either way)
+        """
+        self.detectors = dict(detectors)
+        self.threaded = threaded and len(self.detectors) > 1
+        self.inference_size = inference_size
+        self._rgb = RGBConverter()
+        self._executor = None
+        if self.threaded:
+            self._executor = ThreadPoolExecutor(max_workers=len(self.detectors),
+                                                thread_name_prefix="detector")
+
+    @classmethod
+    def from_names(cls, names, threaded=True, inference_size=None, **kwargs):
+        """Create a composite of freshly constructed detectors, e.g. ["hand", "pose"]."""
+        unknown = set(names) - set(MODELS)
+        if unknown:
+            raise ValueError(f"Unknown detectors {sorted(unknown)}, choose from {sorted(MODELS)}")
+        return cls({name: MODELS[name](**kwargs) for name in names},
+                   threaded=threaded, inference_size=inference_size)
+
+    def process(self, image):
+        """
+        Run every model on a BGR frame.
+
+        Returns:
+            dict: name -> MediaPipe results of that model
+        """
+        img_rgb = self._rgb.convert(image, self.inference_size)
+        # Shared between threads: nobody may write to it
+        img_rgb.flags.writeable = False
+        try:
+            if not self.threaded:
+                return {name: detector.process_rgb(img_rgb)
+                        for name, detector in self.detectors.items()}
+            futures = {name: self._executor.submit(detector.process_rgb, img_rgb)
+                       for name, detector in self.detectors.items()}
+            return {name: future.result() for name, future in futures.items()}
+        finally:
+            img_rgb.flags.writeable = True
+
+    def landmark_arrays(self, image=None, pixel=False):
+        """
+        Landmarks of the last processed frame for every model.
+
+        Returns:
+            dict: name -> float32 array of shape (num, landmarks, 4), copied so it
+            stays valid after the next frame
+        """
+        return {name: detector.landmark_array(image, pixel=pixel).copy()
+                for name, detector in self.detectors.items()}
+
+    def __call__(self, image, pixel=False):
+        """Process a frame and return the landmarks of every model."""
+        self.process(image)
+        return self.landmark_arrays(image, pixel=pixel)
+
+    def close(self):
+        """Stop the worker threads."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+        return False
+
+
+def main():
+    """Run several detectors over a video and report the throughput."""
+    parser = argparse.ArgumentParser(description="Run several detectors on every frame.")
+    parser.add_argument("source", help="video file or image directory")
+    parser.add_argument("--models", nargs="+", choices=sorted(MODELS), default=["hand", "face", "pose"])
+    parser.add_argument("--serial", action="store_true", help="run the models one after another")
+    parser.add_argument("--inference-size", type=int, default=None,
+                        help="longest side of the shared RGB image, e.g. 480")
+    parser.add_argument("--max-frames", type=int, default=None, help="frames to process")
+    args = parser.parse_args()
+
+    with MultiDetector.from_names(args.models, threaded=not args.serial,
+                                  inference_size=args.inference_size) as detector:
+        found = dict.fromkeys(args.models, 0)
+        frames = 0
+        start = time.perf_counter()
+        for frame in iter_frames(args.source):
+            if args.max_frames is not None and frames >= args.max_frames:
+                break
+            for name, landmarks in detector(frame).items():
+                found[name] += len(landmarks)
+            frames += 1
+        elapsed = time.perf_counter() - start
+
+    fps = frames / elapsed if elapsed > 0 else 0
+    mode = "serial" if args.serial else "threaded"
+    print(f"[INFO] {frames} frames in {elapsed:.2f}s ({fps:.1f} FPS, {mode})")
+    for name, count in found.items():
+        print(f"[INFO]   {name}: {count} detections")
+
+
+if __name__ == "__main__":
+    main()
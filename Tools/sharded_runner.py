@@ -0,0 +1,163 @@
+"""
+Multi-process sharded landmark extraction.
+
+A single MediaPipe graph uses only a fraction of a many-core machine, so
+this runner splits each video into frame ranges and hands them to a pool of
+worker processes. Every worker owns its own detector instance, and the
+per-frame results are merged back in frame order before being written out
+in the same JSON Lines format as batch_process.py.
+
+Usage:
+    python sharded_runner.py pose a.mp4 b.mp4 --workers 32 --static
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from pathlib import Path
+
+import cv2
+from batch_process import output_paths
+from detectors import DETECTORS, create_detector
+
+# Per-process detector state, set up by _init_worker
+_worker = {}
+
+
+def count_frames(video):
+    """Return the number of frames in a video, decoding it if the header is missing."""
+    capture = cv2.VideoCapture(str(video))
+    total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    if total <= 0:
+        total = 0
+        while capture.grab():
+            total += 1
+    capture.release()
+    return total
+
+
+def split_ranges(total, chunk_frames):
+    """
+    Split [0, total) into consecutive (start, stop) ranges.
+
+    Args:
+        total: Number of frames
+        chunk_frames: Frames per range (the last range may be shorter)
+    """
+    return [(start, min(start + chunk_frames, total))
+            for start in range(0, total, chunk_frames)]
+
+
+def _init_worker(detector_name, static_mode, inference_size=None):
+    """Create the detector owned by this worker process."""
+    # One OpenCV thread per process; the pool already uses every core
+    cv2.setNumThreads(1)
+    _worker["name"] = detector_name
+    _worker["static_mode"] = static_mode
+    _worker["inference_size"] = inference_size
+    _worker["detect"] = create_detector(detector_name, static_mode=static_mode,
+                                        inference_size=inference_size)
+
+
+def _process_range(task):
+    """
+    Detect landmarks for one frame range of a video.
+
+    Returns:
+        tuple: (task, list of landmarks, one entry per frame in the range)
+    """
+    video, start, stop = task
+    if not _worker["static_mode"]:
+        # Ranges handled by one worker are not contiguous, so drop any
+        # tracking state left over from the previous range
+        _worker["detect"] = create_detector(_worker["name"], static_mode=False,
+                                            inference_size=_worker["inference_size"])
+    detect = _worker["detect"]
+
+    capture = cv2.VideoCapture(str(video))
+    capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+    landmarks = []
+    for _ in range(start, stop):
+        success, frame = capture.read()
+        if not success:
+            break
+        landmarks.append(detect(frame))
+    capture.release()
+    return task, landmarks
+
+
+def run_sharded(detector_name, videos, workers=None, chunk_frames=300, static_mode=False,
+                inference_size=None):
+    """
+    Run a detector over videos in parallel and yield results in frame order.
+
+    Args:
+        detector_name: One of the keys of DETECTORS
+        videos: List of video paths
+        workers: Number of worker processes (defaults to the CPU count)
+        chunk_frames: Frames per work item
+        static_mode: Treat every frame as an unrelated image (no tracking)
+        inference_size: Longest side of the image given to the model, or None
+                        for the capture resolution
+
+    Yields:
+        tuple: (video, frame number, landmarks)
+    """
+    tasks = [(video, start, stop)
+             for video in videos
+             for start, stop in split_ranges(count_frames(video), chunk_frames)]
+
+    # spawn gives every worker a clean interpreter on all platforms
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers or os.cpu_count(), initializer=_init_worker,
+                      initargs=(detector_name, static_mode, inference_size)) as pool:
+        # imap returns results in task order, which is frame order
+        for (video, start, _), landmarks in pool.imap(_process_range, tasks):
+            for offset, frame_landmarks in enumerate(landmarks):
+                yield video, start + offset, frame_landmarks
+
+
+def main():
+    """Entry point for the sharded runner."""
+    parser = argparse.ArgumentParser(description="Extract landmarks from videos on all CPU cores.")
+    parser.add_argument("detector", choices=sorted(DETECTORS), help="detector to run")
+    parser.add_argument("videos", nargs="+", help="video files")
+    parser.add_argument("-o", "--output", default="landmarks", help="output directory")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes")
+    parser.add_argument("--chunk-frames", type=int, default=300, help="frames per work item")
+    parser.add_argument("--static", action="store_true",
+                        help="treat frames as unrelated images (no temporal tracking)")
+    parser.add_argument("--inference-size", type=int, default=None,
+                        help="longest side of the image given to the model, e.g. 480")
+    args = parser.parse_args()
+
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Results are keyed by video path, so a video listed twice is processed once
+    videos = list(dict.fromkeys(args.videos))
+    paths = dict(zip(videos, output_paths(output_dir, videos, args.detector)))
+    outputs = {}
+    frames = 0
+    start_time = time.perf_counter()
+    try:
+        for video, frame_no, landmarks in run_sharded(args.detector, videos, args.workers,
+                                                      args.chunk_frames, args.static,
+                                                      args.inference_size):
+            if video not in outputs:
+                outputs[video] = open(paths[video], "w")
+            record = {"frame": frame_no, "landmarks": landmarks}
+            outputs[video].write(json.dumps(record) + "\n")
+            frames += 1
+    finally:
+        for output in outputs.values():
+            output.close()
+
+    elapsed = time.perf_counter() - start_time
+    fps = frames / elapsed if elapsed > 0 else 0
+    print(f"[INFO] {frames} frames from {len(videos)} videos in {elapsed:.2f}s ({fps:.1f} FPS)")
+
+
+if __name__ == "__main__":
+    main()
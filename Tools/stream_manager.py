@@ -0,0 +1,329 @@
+"""
+Serve many camera or video streams from one process.
+
+Each stream gets a capture thread and its own detector instance (MediaPipe
+graphs keep per-stream tracking state and are not thread-safe), while
+inference for all streams runs on a fixed pool of worker threads, so CPU
+use is bounded by the pool size rather than by the number of cameras.
+
+Backpressure is per stream: a stream holds at most its newest unprocessed
+frame, and a frame that arrives before the previous one was picked up
+replaces it and is counted as dropped (files read with realtime=False
+instead wait for the workers, so every frame is processed). A stream is
+never processed by two workers at once, and ready streams are served
+round-robin, so a slow or high-FPS camera cannot starve the others.
+
+Usage:
+    python stream_manager.py hand 0 1 lobby.mp4 rtsp://10.0.0.5/stream --workers 2
+    python stream_manager.py pose a.mp4 b.mp4 c.mp4 --workers 3 --duration 60
+"""
+import argparse
+import collections
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+from detectors import DETECTORS, create_detector
+from pipeline import LatestQueue
+
+
+class Stream:
+    """One source with its own detector, latest-frame slot and statistics."""
+
+    def __init__(self, name, source, detect, realtime=True, window=120):
+        """
+        Initialize a stream.
+
+        Args:
+            name: Label used in reports and callbacks
+            source: Device index, file path or URL accepted by cv2.VideoCapture
+            detect: Callable mapping a BGR frame to landmarks (one per stream)
+            realtime: Pace file sources at their frame rate; when False, files
+                      are read as fast as the workers take frames, none dropped
+            window: Number of recent frames the FPS and latency figures cover
+        """
+        self.name = name
+        self.source = source
+        self.detect = detect
+        self.realtime = realtime
+
+        self.frames = LatestQueue(1)
+        self.lock = threading.Lock()
+        self.scheduled = False  # In the ready queue or being processed
+        self.finished = False   # Source exhausted or failed
+        self.error = None
+
+        self.captured = 0
+        self.processed = 0
+        self.latencies = collections.deque(maxlen=window)   # Capture -> result, seconds
+        self.timestamps = collections.deque(maxlen=window)  # Completion times
+
+    @property
+    def dropped(self):
+        """Frames replaced by a newer one before a worker picked them up."""
+        return self.frames.dropped
+
+    def stats(self):
+        """FPS, latency percentiles and frame counters of the stream."""
+        fps = 0.0
+        if len(self.timestamps) > 1:
+            span = self.timestamps[-1] - self.timestamps[0]
+            fps = (len(self.timestamps) - 1) / span if span > 0 else 0.0
+        stats = {"captured": self.captured, "processed": self.processed,
+                 "dropped": self.dropped, "fps": round(fps, 2)}
+        if self.latencies:
+            ms = np.fromiter(self.latencies, dtype=np.float64) * 1000.0
+            p50, p95 = np.percentile(ms, [50, 95])
+            stats.update(latency_p50_ms=round(float(p50), 2), latency_p95_ms=round(float(p95), 2))
+        return stats
+
+
+class StreamManager:
+    """Capture N streams and run their detectors on a bounded worker pool."""
+
+    def __init__(self, workers=2, on_result=None):
+        """
+        Initialize the manager.
+
+        Args:
+            workers: Number of inference threads shared by all streams
+            on_result: Optional callable (stream, frame_index, frame, landmarks)
+                       called on a worker thread for every processed frame
+        """
+        self.workers = workers
+        self.on_result = on_result
+        self.streams = []
+        self.ready = queue.Queue()
+        self.stop_event = threading.Event()
+        self._threads = []
+
+    def add_stream(self, source, detect, name=None, realtime=True):
+        """
+        Register a source before start().
+
+        Args:
+            source: Device index, file path or URL
+            detect: Detector callable owned by this stream
+            name: Label, defaults to the source
+            realtime: Pace file sources at their native frame rate; when False,
+                      read them as fast as the workers keep up without drops
+
+        Returns:
+            Stream: The new stream
+        """
+        name = name or str(source)
+        if any(stream.name == name for stream in self.streams):
+            # Stats are keyed by name, so the same source opened twice needs a suffix
+            name = f"{name}#{len(self.streams)}"
+        stream = Stream(name, source, detect, realtime=realtime)
+        self.streams.append(stream)
+        return stream
+
+    def start(self):
+        """Open every source and start the capture and worker threads."""
+        self.stop_event.clear()
+        for stream in self.streams:
+            thread = threading.Thread(target=self._capture_loop, args=(stream,),
+                                      name=f"capture-{stream.name}", daemon=True)
+            self._threads.append(thread)
+        for i in range(self.workers):
+            self._threads.append(threading.Thread(target=self._worker_loop,
+                                                  name=f"worker-{i}", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Stop all threads and wait for them."""
+        self.stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
+
+    @property
+    def finished(self):
+        """True once every source is exhausted and its last frame was processed."""
+        for stream in self.streams:
+            # Same lock as _release, so a frame cannot slip between the two checks
+            with stream.lock:
+                if not stream.finished or stream.scheduled or not stream.frames.empty():
+                    return False
+        return True
+
+    def _schedule(self, stream):
+        """Put a stream in the ready queue unless it is already there or running."""
+        with stream.lock:
+            if stream.scheduled:
+                return
+            stream.scheduled = True
+        self.ready.put(stream)
+
+    def _release(self, stream):
+        """
+        Clear a stream's scheduled flag after a worker is done with it, or requeue
+        it at the back if a frame is waiting (round-robin).
+
+        The empty check and the flag update happen under the lock _schedule takes,
+        so a frame put meanwhile is either seen here or schedules the stream itself.
+        """
+        with stream.lock:
+            if stream.frames.empty():
+                stream.scheduled = False
+                return
+        self.ready.put(stream)
+
+    def _put(self, stream, item, block):
+        """
+        Hand a frame to a stream's slot, waiting for room while block is set until stopped.
+
+        Returns:
+            bool: False if the manager stopped before the frame was queued
+        """
+        if not block:
+            stream.frames.put(item)
+            return True
+        while not self.stop_event.is_set():
+            try:
+                stream.frames.put(item, block=True, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _capture_loop(self, stream):
+        """Read a source as fast as it delivers, keeping only the newest frame."""
+        source = int(stream.source) if str(stream.source).isdigit() else stream.source
+        capture = cv2.VideoCapture(source)
+        try:
+            if not capture.isOpened():
+                stream.error = f"Failed to open source: {stream.source}"
+                print(f"[ERROR] {stream.error}")
+                return
+
+            # Files are paced at their frame rate so they behave like cameras
+            fps = capture.get(cv2.CAP_PROP_FPS)
+            is_file = not isinstance(source, int) and "://" not in str(source)
+            period = 1.0 / fps if stream.realtime and is_file and fps > 0 else 0.0
+            # Unpaced files wait for the workers instead of overwriting frames
+            lossless = is_file and not stream.realtime
+            next_time = time.perf_counter()
+
+            while not self.stop_event.is_set():
+                success, frame = capture.read()
+                if not success:
+                    break
+                if not self._put(stream, (stream.captured, time.perf_counter(), frame), lossless):
+                    break
+                stream.captured += 1
+                self._schedule(stream)
+                if period:
+                    next_time += period
+                    delay = next_time - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+        except Exception as e:
+            stream.error = str(e)
+            print(f"[ERROR] Stream {stream.name}: {e}")
+        finally:
+            capture.release()
+            stream.finished = True
+
+    def _worker_loop(self):
+        """Process the newest frame of ready streams, one stream at a time each."""
+        while not self.stop_event.is_set():
+            try:
+                stream = self.ready.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            try:
+                index, captured_at, frame = stream.frames.get(timeout=0)
+            except queue.Empty:
+                self._release(stream)
+                continue
+
+            try:
+                landmarks = stream.detect(frame)
+            except Exception as e:
+                stream.error = str(e)
+                print(f"[ERROR] Stream {stream.name}: {e}")
+                landmarks = None
+            done = time.perf_counter()
+            stream.processed += 1
+            stream.latencies.append(done - captured_at)
+            stream.timestamps.append(done)
+            if self.on_result is not None and landmarks is not None:
+                self.on_result(stream, index, frame, landmarks)
+
+            # Requeue at the back if a newer frame arrived meanwhile
+            self._release(stream)
+
+    def stats(self):
+        """
+        Per-stream and total statistics.
+
+        Returns:
+            dict: stream name -> stats, plus "total" with the summed FPS and counters
+        """
+        stats = {stream.name: stream.stats() for stream in self.streams}
+        stats["total"] = {
+            "fps": round(sum(s["fps"] for s in stats.values()), 2),
+            "captured": sum(s["captured"] for s in stats.values()),
+            "processed": sum(s["processed"] for s in stats.values()),
+            "dropped": sum(s["dropped"] for s in stats.values()),
+        }
+        return stats
+
+    def report(self):
+        """Format the statistics as a table."""
+        lines = [f"[STATS] {time.strftime('%H:%M:%S')} {len(self.streams)} streams, "
+                 f"{self.workers} workers"]
+        for name, s in self.stats().items():
+            latency = ""
+            if "latency_p50_ms" in s:
+                latency = f"  latency p50 {s['latency_p50_ms']:7.1f}  p95 {s['latency_p95_ms']:7.1f} ms"
+            lines.append(f"  {name:<24} {s['fps']:6.1f} FPS  processed {s['processed']:6d}  "
+                         f"dropped {s['dropped']:6d}{latency}")
+        return "\n".join(lines)
+
+
+def main():
+    """Serve several sources with one detector type and print periodic reports."""
+    parser = argparse.ArgumentParser(description="Run a detector on several streams at once.")
+    parser.add_argument("detector", choices=sorted(DETECTORS), help="detector to run")
+    parser.add_argument("sources", nargs="+", help="device indices, video files or stream URLs")
+    parser.add_argument("--workers", type=int, default=2, help="inference threads shared by all streams")
+    parser.add_argument("--duration", type=float, default=None,
+                        help="seconds to run (default: until every source ends)")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between reports")
+    parser.add_argument("--asap", action="store_true",
+                        help="read files as fast as the workers keep up, without dropping frames")
+    parser.add_argument("--inference-size", type=int, default=None,
+                        help="longest side of the image given to the model, e.g. 480")
+    args = parser.parse_args()
+
+    manager = StreamManager(workers=args.workers)
+    for source in args.sources:
+        manager.add_stream(source, create_detector(args.detector, inference_size=args.inference_size),
+                           realtime=not args.asap)
+
+    manager.start()
+    start = time.perf_counter()
+    next_report = start + args.interval
+    try:
+        while not manager.finished:
+            if args.duration is not None and time.perf_counter() - start >= args.duration:
+                break
+            time.sleep(0.05)
+            if time.perf_counter() >= next_report:
+                print(manager.report(), flush=True)
+                next_report += args.interval
+    except KeyboardInterrupt:
+        print("\n[INFO] Interrupted by user")
+    finally:
+        manager.stop()
+    print(manager.report())
+
+
+if __name__ == "__main__":
+    main()
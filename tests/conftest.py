@@ -0,0 +1,9 @@
+"""Put the app directories on sys.path the way the apps and Tools/ do."""
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+for directory in ("Shared", "Hand Detection", "Tools"):
+    path = str(ROOT_DIR / directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,16 @@
+from pathlib import Path
+
+from batch_process import output_paths
+
+
+def test_unique_names_are_kept():
+    paths = output_paths(Path("out"), ["a/clip.mp4", "frames_dir/"], "hand")
+    assert paths == [Path("out/clip.hand.jsonl"), Path("out/frames_dir.hand.jsonl")]
+
+
+def test_sources_with_the_same_name_get_distinct_outputs():
+    sources = ["a/clip.mp4", "b/clip.mp4", "clip-1.mp4"]
+    paths = output_paths(Path("out"), sources, "pose")
+    assert len(set(paths)) == len(sources)
+    assert paths[0] == Path("out/clip-0.pose.jsonl")
+    assert paths[2] == Path("out/clip-1.pose.jsonl")
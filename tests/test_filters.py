@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from filters import FILTERS, LandmarkFilterBank
+
+
+@pytest.fixture
+def landmarks():
+    return np.random.default_rng(0).random((1, 21, 4)).astype(np.float32)
+
+
+@pytest.mark.parametrize("kind", sorted(FILTERS))
+def test_first_frame_of_new_track_is_raw(kind, landmarks):
+    bank = LandmarkFilterBank(kind)
+    np.testing.assert_array_equal(bank(landmarks, 0.0, ids=["new"]), landmarks)
+
+
+@pytest.mark.parametrize("kind", sorted(FILTERS))
+def test_second_frame_of_new_track_is_filtered(kind, landmarks):
+    bank = LandmarkFilterBank(kind)
+    bank(landmarks, 0.0, ids=["new"])
+    moved = landmarks + np.float32(0.01)
+
+    smoothed = bank(moved, 1 / 30, ids=["new"])
+
+    assert not np.allclose(smoothed[..., :3], moved[..., :3])
+    # Smoothing moves the value toward the measurement, never past it
+    assert np.all(smoothed[..., :3] >= landmarks[..., :3] - 1e-6)
+    assert np.all(smoothed[..., :3] <= moved[..., :3] + 1e-6)
+    # Visibility is passed through
+    np.testing.assert_array_equal(smoothed[..., 3], moved[..., 3])
+
+
+@pytest.mark.parametrize("kind", sorted(FILTERS))
+def test_second_frame_of_track_in_reused_slot_is_filtered(kind, landmarks):
+    bank = LandmarkFilterBank(kind, max_tracks=1)
+    bank(landmarks + np.float32(0.5), 0.0, ids=["old"])
+    # "old" is lost and "new" takes over its slot, starting from its own measurement
+    first = bank(landmarks, 1 / 30, ids=["new"])
+    np.testing.assert_allclose(first[..., :3], landmarks[..., :3], atol=1e-6)
+
+    moved = landmarks + np.float32(0.01)
+    smoothed = bank(moved, 2 / 30, ids=["new"])
+
+    assert not np.allclose(smoothed[..., :3], moved[..., :3])
@@ -0,0 +1,47 @@
+import numpy as np
+
+from inference_scheduler import InferenceScheduler
+
+
+class FakeDetector:
+    """Returns scripted (landmarks, track IDs) pairs, one per inference."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.hand_ids = []
+
+    def __call__(self, frame):
+        landmarks, self.hand_ids = self.script.pop(0)
+        return landmarks
+
+
+def hand(x):
+    landmarks = np.zeros((1, 21, 4), dtype=np.float32)
+    landmarks[..., 0] = x
+    return landmarks
+
+
+def make_scheduler(detector, clock):
+    return InferenceScheduler(detector, interval=1, max_interval=1, adaptive=False,
+                              clock=lambda: clock[0], track_ids=lambda: detector.hand_ids)
+
+
+def test_velocity_between_inferences_of_the_same_track():
+    clock = [0.0]
+    detector = FakeDetector([(hand(0.1), [3]), (hand(0.2), [3])])
+    scheduler = make_scheduler(detector, clock)
+    scheduler.update(None)
+    clock[0] = 0.1
+    scheduler.update(None)
+    np.testing.assert_allclose(scheduler.velocity[..., 0], 1.0, rtol=1e-5)
+
+
+def test_no_velocity_when_one_hand_replaces_another():
+    clock = [0.0]
+    detector = FakeDetector([(hand(0.1), [3]), (hand(0.6), [4])])
+    scheduler = make_scheduler(detector, clock)
+    scheduler.update(None)
+    clock[0] = 0.1
+    scheduler.update(None)
+    assert scheduler.velocity is None
+    assert scheduler.ids == [4]
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from landmark_recording import LandmarkReader, LandmarkRecorder
+
+STREAMS = {"hand": (2, 21)}
+
+
+def record(path, frames, metadata):
+    with LandmarkRecorder(path, STREAMS, metadata=metadata) as recorder:
+        for i in range(frames):
+            recorder.write(i, i / 30, hand=np.zeros((1, 21, 4), dtype=np.float32))
+
+
+def test_append_with_the_same_metadata(tmp_path):
+    path = str(tmp_path / "session.lmk")
+    record(path, 2, {"width": 640, "height": 480})
+    record(path, 3, {"width": 640, "height": 480})
+    reader = LandmarkReader(path)
+    assert len(reader) == 5
+    assert reader.metadata == {"width": 640, "height": 480}
+
+
+def test_append_with_different_metadata_raises(tmp_path):
+    path = str(tmp_path / "session.lmk")
+    record(path, 2, {"width": 640, "height": 480})
+    with pytest.raises(ValueError, match="different metadata"):
+        record(path, 1, {"width": 1280, "height": 720})
+    assert len(LandmarkReader(path)) == 2